@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import time
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.dependencies.models import Dependant
+from fastapi.dependencies.utils import solve_dependencies
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute, run_endpoint_function, serialize_response
+from pydantic import BaseModel, Field
+from sqlmodel import Session
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Match
+
+from app.core import admission as _admission
+from app.core.config import settings
+from app.core.db import get_session
+from app.core.fastjson import FastJSONResponse
+from app.models import User
+from app.api.auth import get_current_user_session
+from app.api.diet import router as diet_router, auth_user, rls_session, _restore_rls
+
+router = APIRouter()
+
+# Streams can't be embedded in a JSON envelope
+_UNBATCHABLE = {"generate_plan_stream"}
+_PREFIX = "/api/v1"
+
+# ------------------------------------------------------------------------------
+# /batch: several diet API calls in one round trip, sharing the caller's
+# session, auth and RLS context. Sub-requests run in order on that one
+# connection (Postgres runs one statement per connection at a time); each
+# still goes through its route's own parameter validation and serialization.
+# ------------------------------------------------------------------------------
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str = Field(..., description="Diet API path with query string, e.g. /meals?start=2025-01-06")
+    body: Optional[Any] = None
+    headers: Dict[str, str] = {}
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+
+def _find_route(method: str, path: str) -> Tuple[Optional[APIRoute], Dict[str, Any], bool]:
+    """(route, path_params, method_allowed) for a path on the diet router."""
+    scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+    partial: Optional[APIRoute] = None
+    for route in diet_router.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        match, child = route.matches(scope)
+        if match == Match.FULL:
+            return route, child.get("path_params", {}), True
+        if match == Match.PARTIAL and partial is None:
+            partial = route
+    return partial, {}, partial is None
+
+def _shared_cache(dependant: Dependant, values: Dict[Any, Any], cache: Dict[Any, Any]) -> Dict[Any, Any]:
+    """Pre-solve the session/auth dependencies so sub-requests reuse the batch's."""
+    for dep in dependant.dependencies:
+        if dep.call in values:
+            cache[dep.cache_key] = values[dep.call]
+        _shared_cache(dep, values, cache)
+    return cache
+
+def _sub_request(outer: Request, sub: BatchSubRequest, path: str, query: str, path_params: Dict[str, Any]) -> Request:
+    headers = [(k, v) for k, v in outer.scope["headers"] if k not in (b"content-length", b"if-none-match", b"content-type")]
+    headers += [(k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in sub.headers.items()]
+    scope = {
+        **outer.scope,
+        "method": sub.method.upper(),
+        "path": _PREFIX + path,
+        "raw_path": (_PREFIX + path).encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "path_params": path_params,
+    }
+    return Request(scope)
+
+def _payload(resp: Response) -> Any:
+    if resp.status_code == 304 or not resp.body:
+        return None
+    if (resp.media_type or "").endswith("json"):
+        return orjson.Fragment(resp.body)  # already-encoded JSON, embedded as-is
+    return resp.body.decode("utf-8", "replace")
+
+async def _run_one(outer: Request, sub: BatchSubRequest, shared: Dict[Any, Any], session: Session, user: User) -> Dict[str, Any]:
+    parts = urlsplit(sub.path)
+    path = parts.path[len(_PREFIX):] if parts.path.startswith(_PREFIX + "/") else parts.path
+    method = sub.method.upper()
+    route, path_params, allowed = _find_route(method, path)
+    if route is None:
+        return {"status": 404, "body": {"detail": "Not Found"}}
+    if not allowed:
+        return {"status": 405, "body": {"detail": "Method Not Allowed"}}
+    if route.endpoint.__name__ in _UNBATCHABLE:
+        return {"status": 400, "body": {"detail": "Streaming endpoints cannot be batched"}}
+    if (method, _PREFIX + path) in _admission.ROUTE_CLASSES:
+        # Admission control only sees the outer /batch path; these must go through it directly
+        return {"status": 400, "body": {"detail": f"{method} {_PREFIX + path} is admission-controlled and cannot be batched"}}
+
+    request = _sub_request(outer, sub, path, parts.query, path_params)
+    async with AsyncExitStack() as stack:
+        solved = await solve_dependencies(
+            request=request,
+            dependant=route.dependant,
+            body=sub.body,
+            dependency_cache=_shared_cache(route.dependant, shared, {}),
+            async_exit_stack=stack,
+            embed_body_fields=route._embed_body_fields,
+        )
+        if solved.errors:
+            return {"status": 422, "body": {"detail": jsonable_encoder(solved.errors)}}
+        try:
+            raw = await run_endpoint_function(dependant=route.dependant, values=solved.values, is_coroutine=False)
+        except HTTPException as exc:
+            return {"status": exc.status_code, "body": {"detail": exc.detail}}
+        except Exception:
+            # keep the shared transaction usable for the remaining sub-requests
+            session.rollback()
+            _restore_rls(session, user.id)
+            return {"status": 500, "body": {"detail": "Internal Server Error"}}
+
+    if isinstance(raw, StreamingResponse):
+        return {"status": 400, "body": {"detail": "Streaming endpoints cannot be batched"}}
+    if isinstance(raw, Response):
+        resp = raw
+    else:
+        content = await serialize_response(field=route.response_field, response_content=raw, is_coroutine=False)
+        resp = FastJSONResponse(content, status_code=solved.response.status_code or route.status_code or 200)
+        resp.headers.update(solved.response.headers)
+    out: Dict[str, Any] = {"status": resp.status_code, "body": _payload(resp)}
+    if "etag" in resp.headers:
+        out["headers"] = {"etag": resp.headers["etag"]}
+    return out
+
+@router.post("/batch")
+async def batch(
+    req: BatchRequest,
+    request: Request,
+    *,
+    session: Session = Depends(rls_session),
+    user: User = Depends(auth_user),
+):
+    if len(req.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_REQUESTS} sub-requests per batch")
+    shared = {get_session: session, rls_session: session, get_current_user_session: user, auth_user: user}
+    t0 = time.perf_counter()
+    responses = []
+    for i, sub in enumerate(req.requests):
+        res = await _run_one(request, sub, shared, session, user)
+        responses.append({"id": sub.id if sub.id is not None else str(i), **res})
+    return FastJSONResponse({
+        "responses": responses,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+    })
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Header, Response
+from fastapi.responses import StreamingResponse
 from typing import Optional, List, Dict, Any
 from contextlib import contextmanager
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import date, datetime, timedelta, time
 import json
 import re
+from types import SimpleNamespace
 
 from pydantic import BaseModel
 
@@ -14,9 +18,21 @@ from sqlmodel import Session, select
 from sqlalchemy import text, func, inspect as sqla_inspect
 from sqlalchemy.exc import OperationalError
 
-from app.core.db import get_session
+from app.core.db import get_session, engine
 from app.core.config import settings
 from app.core import llm as _llm
+from app.core import progression as _progression
+from app.core import idempotency as _idem
+from app.core import volume as _volume
+from app.core import catalog as _catalog
+from app.core import basket as _basket
+from app.core import units as _units
+from app.core import versions as _versions
+from app.core import price_history as _price_history
+from app.core import fastjson as _fastjson
+from app.core import today as _today
+from app.core import events as _events
+from app.core import timing as _timing
 # Auth removed in LAN mode
 from app.models import (
     User, Intake, Meal, MealItem, WorkoutSession, WorkoutExercise,
@@ -75,18 +91,25 @@ def _set_rls(session: Session, uid: int) -> None:
     try:
         if session.info.get("_rls_uid") == uid and session.info.get("_rls_depth", 0) > 0:
             return
-        conn = session.connection()  # pin the connection
-        conn.execute(text("select set_config('app.user_id', :val, false)").bindparams(val=str(uid)))
+        with _timing.measure("rls"):
+            conn = session.connection()  # pin the connection
+            conn.execute(text("select set_config('app.user_id', :val, false)").bindparams(val=str(uid)))
         session.info["_rls_uid"] = uid
     except OperationalError:
         pass
     except Exception:
         pass
 
+def _restore_rls(session: Session, uid: int) -> None:
+    """Re-apply RLS after a rollback (which may release the pinned connection)."""
+    session.info.pop("_rls_uid", None)
+    _set_rls(session, uid)
+
 def _reset_rls(session: Session) -> None:
     try:
-        conn = session.connection()
-        conn.execute(text("reset app.user_id"))
+        with _timing.measure("rls"):
+            conn = session.connection()
+            conn.execute(text("reset app.user_id"))
     except OperationalError:
         pass
     except Exception:
@@ -160,6 +183,9 @@ def _prefer_store_from_intake(intake: Optional[Intake]) -> Optional[str]:
     return None
 
 def _price_map_for_item(name: str) -> Dict[str, float]:
+    m = _catalog.get_catalog().resolve(name)
+    if m is not None:
+        return m.price_map()
     n = _normalize_name(name)
     return _PRICE_BOOK.get(n, _DEFAULT_PRICE)
 
@@ -204,16 +230,36 @@ def _meal_window_filters(start: Optional[date], end: Optional[date]) -> List[Any
         if end:   filters.append(func.date(Meal.eaten_at) <= end)    # type: ignore[attr-defined]
     return filters
 
+# ---- Conditional GET: weak ETags from per-user version counters (app.core.versions)
+_REVALIDATE = "private, no-cache"
+
+def _etag_or_304(session: Session, user_id: int, scope: str, if_none_match: Optional[str]) -> tuple[str, Optional[Response]]:
+    """Current ETag for ``scope`` and, when the client already has it, a ready 304.
+    Call before running the list query so an unchanged resource costs one lookup."""
+    tag = _versions.etag(user_id, scope, _versions.get(session, user_id, scope), settings.VERSION)
+    if _versions.etag_matches(if_none_match, tag):
+        return tag, Response(status_code=304, headers={"ETag": tag, "Cache-Control": _REVALIDATE})
+    return tag, None
+
+def _validators(tag: str) -> Dict[str, str]:
+    return {"ETag": tag, "Cache-Control": _REVALIDATE}
+
 # ------------------------------------------------------------------------------
 # Intake endpoints
 # ------------------------------------------------------------------------------
 @router.get("/intake")
 def get_intake(
+    response: Response,
     *,
     session: Session = Depends(rls_session),
     user: User = Depends(auth_user),
+    if_none_match: Optional[str] = Header(None),
 ):
     with _rls(session, user.id):
+        tag, not_modified = _etag_or_304(session, user.id, _versions.INTAKE, if_none_match)
+        if not_modified:
+            return not_modified
+        response.headers.update(_validators(tag))
         q = select(Intake).where(Intake.user_id == user.id)
         if hasattr(Intake, 'created_at'):
             q = q.order_by(getattr(Intake, 'created_at').desc())  # type: ignore[attr-defined]
@@ -235,6 +281,9 @@ def upsert_intake(
         data = payload.model_dump(exclude_unset=True)
         for fld, val in data.items():
             _safe_set(intake, fld, val)
+        _versions.bump(session, user.id, _versions.INTAKE)
+        # preferred store comes from intake notes, so cached grocery previews depend on it
+        _versions.bump(session, user.id, _versions.GROCERIES)
         session.commit()
         session.refresh(intake)
         return intake
@@ -257,128 +306,132 @@ def rationalize_intake(
 ):
     with _rls(session, user.id):
         intake = session.exec(select(Intake).where(Intake.user_id == user.id)).first()
-        notes = (
-            (getattr(intake, "food_notes", "") or "")
-            + " "
-            + (getattr(intake, "workout_notes", "") or "")
-            + " "
-            + (getattr(intake, "goals", "") or "")
-        )
-        notes_l = (notes or "").lower()
-
-        low_carb = any(k in notes_l for k in ("keto", "low carb", "lower carb"))
-        if_2 = any(k in notes_l for k in ("if 2/day", "2-meal", "two meals", "16:8"))
-        aggressive = any(k in notes_l for k in ("rapid", "aggressive", "very fast"))
-        warns: List[str] = []
+        return _rationalize(intake)
+
+def _rationalize(intake: Optional[Intake]) -> RationalizeOut:
+    """Diet label, meals/day, meal times and macro/calorie targets from an intake row."""
+    notes = (
+        (getattr(intake, "food_notes", "") or "")
+        + " "
+        + (getattr(intake, "workout_notes", "") or "")
+        + " "
+        + (getattr(intake, "goals", "") or "")
+    )
+    notes_l = (notes or "").lower()
+
+    low_carb = any(k in notes_l for k in ("keto", "low carb", "lower carb"))
+    if_2 = any(k in notes_l for k in ("if 2/day", "2-meal", "two meals", "16:8"))
+    aggressive = any(k in notes_l for k in ("rapid", "aggressive", "very fast"))
+    warns: List[str] = []
+
+    # Prefer explicit meals_per_day field when available; else parse notes; else heuristic
+    mpd_explicit: Optional[int] = None
+    try:
+        if intake and getattr(intake, 'meals_per_day', None):
+            mpd_explicit = int(getattr(intake, 'meals_per_day'))
+    except Exception:
+        mpd_explicit = None
+    if mpd_explicit is None:
+        m = re.search(r"(\d+)\s*(?:-\s*(\d+))?\s*meals?\s*(?:/\s*day)?", notes_l)
+        if m:
+            a = int(m.group(1))
+            b = int(m.group(2)) if m.group(2) else None
+            mpd_explicit = max(a, b) if b else a
+            mpd_explicit = max(1, min(8, mpd_explicit))
+
+    label = "lower‑carb; IF 16:8 (2/day)" if (low_carb or if_2) else "balanced; 3/day"
+    mpd = mpd_explicit if mpd_explicit else (2 if (low_carb or if_2) else 3)
+
+    def _times_for_mpd(n: int) -> List[str]:
+        if n == 1:
+            return ["12:00"]
+        if n == 2:
+            return ["12:00", "18:00"]
+        if n == 3:
+            return ["08:00", "12:00", "18:00"]
+        start_minutes = 8 * 60
+        end_minutes = 20 * 60
+        span = end_minutes - start_minutes
+        step = span // (n - 1)
+        vals = [start_minutes + i * step for i in range(n)]
+        return [f"{v//60:02d}:{v%60:02d}" for v in vals]
+
+    times = _times_for_mpd(mpd)
+    protein = 140 if low_carb else 110
+    carb = 120 if low_carb else 200
+
+    # Compute calorie target from intake using Mifflin-St Jeor + activity and goal rate
+    def _loss_per_week(text: str) -> float | None:
+        t = (text or '').lower()
+        m = re.search(r"(\\d+(?:\\.\\d+)?)\\s*(lb|pounds?)\\s*(?:per\\s*week|/\\s*week)", t)
+        if m:
+            try:
+                return float(m.group(1))
+            except Exception:
+                return None
+        m2 = re.search(r"lose\\s+(\\d+(?:\\.\\d+)?)\\s*(lb|pounds?)\\s*(?:in|over)\\s+(\\d+)\\s*(weeks?|wks?)", t)
+        if m2:
+            try:
+                total = float(m2.group(1)); weeks = float(m2.group(3))
+                if weeks > 0:
+                    return total / weeks
+            except Exception:
+                return None
+        return None
 
-        # Prefer explicit meals_per_day field when available; else parse notes; else heuristic
-        mpd_explicit: Optional[int] = None
+    def _calorie_target_from_intake(intake_obj) -> Optional[int]:
         try:
-            if intake and getattr(intake, 'meals_per_day', None):
-                mpd_explicit = int(getattr(intake, 'meals_per_day'))
-        except Exception:
-            mpd_explicit = None
-        if mpd_explicit is None:
-            m = re.search(r"(\d+)\s*(?:-\s*(\d+))?\s*meals?\s*(?:/\s*day)?", notes_l)
-            if m:
-                a = int(m.group(1))
-                b = int(m.group(2)) if m.group(2) else None
-                mpd_explicit = max(a, b) if b else a
-                mpd_explicit = max(1, min(8, mpd_explicit))
-
-        label = "lower‑carb; IF 16:8 (2/day)" if (low_carb or if_2) else "balanced; 3/day"
-        mpd = mpd_explicit if mpd_explicit else (2 if (low_carb or if_2) else 3)
-
-        def _times_for_mpd(n: int) -> List[str]:
-            if n == 1:
-                return ["12:00"]
-            if n == 2:
-                return ["12:00", "18:00"]
-            if n == 3:
-                return ["08:00", "12:00", "18:00"]
-            start_minutes = 8 * 60
-            end_minutes = 20 * 60
-            span = end_minutes - start_minutes
-            step = span // (n - 1)
-            vals = [start_minutes + i * step for i in range(n)]
-            return [f"{v//60:02d}:{v%60:02d}" for v in vals]
-
-        times = _times_for_mpd(mpd)
-        protein = 140 if low_carb else 110
-        carb = 120 if low_carb else 200
-
-        # Compute calorie target from intake using Mifflin-St Jeor + activity and goal rate
-        def _loss_per_week(text: str) -> float | None:
-            t = (text or '').lower()
-            m = re.search(r"(\\d+(?:\\.\\d+)?)\\s*(lb|pounds?)\\s*(?:per\\s*week|/\\s*week)", t)
-            if m:
-                try:
-                    return float(m.group(1))
-                except Exception:
-                    return None
-            m2 = re.search(r"lose\\s+(\\d+(?:\\.\\d+)?)\\s*(lb|pounds?)\\s*(?:in|over)\\s+(\\d+)\\s*(weeks?|wks?)", t)
-            if m2:
-                try:
-                    total = float(m2.group(1)); weeks = float(m2.group(3))
-                    if weeks > 0:
-                        return total / weeks
-                except Exception:
-                    return None
-            return None
-
-        def _calorie_target_from_intake(intake_obj) -> Optional[int]:
+            age = int(getattr(intake_obj, 'age', 0) or 0)
+            sex = (getattr(intake_obj, 'sex', '') or '').upper()
+            height_in = int(getattr(intake_obj, 'height_in', 0) or 0)
+            weight_lb = int(getattr(intake_obj, 'weight_lb', 0) or 0)
+            if not (age and height_in and weight_lb):
+                return None
+            kg = weight_lb * 0.45359237
+            cm = height_in * 2.54
+            s = 5 if sex == 'M' else (-161 if sex == 'F' else -78)
+            bmr = 10*kg + 6.25*cm - 5*age + s
+            # Activity from workout days/week
             try:
-                age = int(getattr(intake_obj, 'age', 0) or 0)
-                sex = (getattr(intake_obj, 'sex', '') or '').upper()
-                height_in = int(getattr(intake_obj, 'height_in', 0) or 0)
-                weight_lb = int(getattr(intake_obj, 'weight_lb', 0) or 0)
-                if not (age and height_in and weight_lb):
-                    return None
-                kg = weight_lb * 0.45359237
-                cm = height_in * 2.54
-                s = 5 if sex == 'M' else (-161 if sex == 'F' else -78)
-                bmr = 10*kg + 6.25*cm - 5*age + s
-                # Activity from workout days/week
-                try:
-                    wdw = int(getattr(intake_obj, 'workout_days_per_week', 0) or 0)
-                except Exception:
-                    wdw = 0
-                if wdw <= 0:
-                    act = 1.2
-                elif wdw <= 2:
-                    act = 1.3
-                elif wdw <= 4:
-                    act = 1.5
-                elif wdw <= 6:
-                    act = 1.7
-                else:
-                    act = 1.9
-                tdee = bmr * act
-                rate = _loss_per_week(getattr(intake_obj, 'goals', '') or notes)
-                rate = rate if (isinstance(rate, (int,float)) and rate > 0) else 1.0
-                deficit = min(1000.0, max(250.0, rate * 500.0))
-                target = int(round(tdee - deficit))
-                floor = 1200 if sex == 'F' else 1400
-                return max(floor, target)
+                wdw = int(getattr(intake_obj, 'workout_days_per_week', 0) or 0)
             except Exception:
-                return None
+                wdw = 0
+            if wdw <= 0:
+                act = 1.2
+            elif wdw <= 2:
+                act = 1.3
+            elif wdw <= 4:
+                act = 1.5
+            elif wdw <= 6:
+                act = 1.7
+            else:
+                act = 1.9
+            tdee = bmr * act
+            rate = _loss_per_week(getattr(intake_obj, 'goals', '') or notes)
+            rate = rate if (isinstance(rate, (int,float)) and rate > 0) else 1.0
+            deficit = min(1000.0, max(250.0, rate * 500.0))
+            target = int(round(tdee - deficit))
+            floor = 1200 if sex == 'F' else 1400
+            return max(floor, target)
+        except Exception:
+            return None
 
-        calorie_target = _calorie_target_from_intake(intake)
-        if aggressive:
-            warns.append("Aggressive goal pace — consider medical guidance.")
-        if getattr(intake, 'diabetic', False) and not low_carb:
-            warns.append("Diabetic flag set — consider lower carb options.")
-
-        return RationalizeOut(
-            diet_label=label,
-            meals_per_day=mpd,
-            times=times,
-            protein_target=protein,
-            carb_target=carb,
-            calorie_target=calorie_target,
-            safety_required=aggressive,
-            warnings=warns,
-        )
+    calorie_target = _calorie_target_from_intake(intake)
+    if aggressive:
+        warns.append("Aggressive goal pace — consider medical guidance.")
+    if getattr(intake, 'diabetic', False) and not low_carb:
+        warns.append("Diabetic flag set — consider lower carb options.")
+
+    return RationalizeOut(
+        diet_label=label,
+        meals_per_day=mpd,
+        times=times,
+        protein_target=protein,
+        carb_target=carb,
+        calorie_target=calorie_target,
+        safety_required=aggressive,
+        warnings=warns,
+    )
 
 # ------------------------------------------------------------------------------
 # Meals endpoints
@@ -398,12 +451,17 @@ def list_meals(
     user: User = Depends(auth_user),
     start: Optional[date] = Query(None),
     end: Optional[date] = Query(None),
+    if_none_match: Optional[str] = Header(None),
 ):
     with _rls(session, user.id):
-        q = select(Meal).where(Meal.user_id == user.id)
+        tag, not_modified = _etag_or_304(session, user.id, _versions.MEALS, if_none_match)
+        if not_modified:
+            return not_modified
+        cols = (Meal.id, Meal.user_id, Meal.name, Meal.eaten_at, Meal.total_calories)
+        q = select(*cols).where(Meal.user_id == user.id)
         for cond in _meal_window_filters(start, end):
             q = q.where(cond)
-        return session.exec(q).all()
+        return _fastjson.rows_response([c.key for c in cols], session.exec(q).all(), headers=_validators(tag))
 
 @router.post("/meals")
 def create_meals(
@@ -433,6 +491,7 @@ def create_meals(
                     mi.ingredient = it_name  # type: ignore[attr-defined]
                 session.add(mi)
             created += 1
+        _versions.bump(session, user.id, _versions.MEALS)
         session.commit()
     return {"created": created}
 
@@ -619,6 +678,161 @@ def _pick_recipes(intake: Optional[Intake], low_carb: bool, diabetic: bool, avoi
         i += 1
     return out
 
+def _plan_inputs(session: Session, user: User) -> Dict[str, Any]:
+    # Load intake and interpret preferences/goals
+    intake = session.exec(select(Intake).where(Intake.user_id == user.id)).first()
+    return _plan_inputs_for(intake)
+
+def _plan_inputs_for(intake: Optional[Intake]) -> Dict[str, Any]:
+    """Everything plan generation needs from one intake row:
+    intake, rationalized targets, meals/day, meal times, expanded avoid list."""
+    notes_l = ((getattr(intake, 'food_notes', '') or '') + ' ' + (getattr(intake, 'workout_notes', '') or '')).lower() if intake else ''
+    diabetic_flag = bool(getattr(intake, 'diabetic', False))
+    r = _rationalize(intake)
+    meals_per_day = r.meals_per_day if isinstance(r, RationalizeOut) else 2
+    times = r.times if isinstance(r, RationalizeOut) else ["12:00", "18:00"]
+
+    # Avoidance keywords from explicit preferences + notes
+    avoids: List[str] = []
+    # From structured intake (comma-separated)
+    try:
+        ai = (getattr(intake, 'avoid_ingredients', '') or '')
+        for a in str(ai).split(','):
+            a = a.strip().lower()
+            if a:
+                avoids.append(a)
+    except Exception:
+        pass
+    # From notes (heuristic)
+    for key in ["cilantro", "pork", "beef", "dairy", "gluten", "egg", "eggs", "mushroom", "onion", "fish", "seafood", "shellfish", "chicken", "turkey"]:
+        if key in notes_l:
+            avoids.append(key)
+    # Expand broad categories to common synonyms
+    expand = {
+        'seafood': ['fish','salmon','tuna','shrimp','crab','lobster','scallop'],
+        'shellfish': ['shrimp','crab','lobster','scallop'],
+        'fish': ['fish','salmon','tuna'],
+        'dairy': ['dairy','milk','cheese','yogurt','cream'],
+        'eggs': ['egg','eggs'],
+        'onions': ['onion','onions','scallion','scallions','green onion'],
+        'scallions': ['scallion','scallions','green onion'],
+        'mushrooms': ['mushroom','mushrooms'],
+        'nuts': ['nut','nuts','peanuts','almonds','walnuts','cashews','tree nuts'],
+        'gluten': ['gluten','wheat','bread','pasta'],
+        'beef': ['beef'],
+        'pork': ['pork'],
+        'chicken': ['chicken'],
+        'turkey': ['turkey'],
+    }
+    avoids_expanded: List[str] = []
+    for a in avoids:
+        avoids_expanded.append(a)
+        avoids_expanded.extend(expand.get(a, []))
+    # Normalize and de-duplicate
+    avoids = sorted(set(a.strip().lower() for a in avoids_expanded if a))
+
+    return {
+        "intake": intake,
+        "r": r,
+        "meals_per_day": meals_per_day,
+        "times": times,
+        "avoids": avoids,
+        "diabetic": diabetic_flag,
+        "calorie_target": getattr(r, 'calorie_target', None) if isinstance(r, RationalizeOut) else None,
+    }
+
+def _heuristic_plan_days(inputs: Dict[str, Any], n_days: int, include_recipes: bool, start_dt: date) -> List[Dict[str, Any]]:
+    r = inputs["r"]
+    meals_per_day = inputs["meals_per_day"]
+    times = inputs["times"]
+    # Choose recipe titles tailored to flags (heuristic fallback)
+    titles = _pick_recipes(inputs["intake"], low_carb=('lower' in r.diet_label.lower() if isinstance(r, RationalizeOut) else False), diabetic=inputs["diabetic"], avoids=inputs["avoids"], count=n_days * meals_per_day)
+
+    # Calorie target per meal: distribute daily target evenly if available
+    kcal_target = inputs.get("calorie_target")
+    per_meal_kcal = int(round((kcal_target or 1800) / max(1, meals_per_day)))
+
+    # Build plan days
+    days: List[Dict[str, Any]] = []
+    k = 0
+    for i in range(n_days):
+        d = start_dt + timedelta(days=i)
+        day_meals = []
+        for j in range(meals_per_day):
+            title = titles[k % len(titles)]; k += 1
+            rec = _make_recipe(title) if include_recipes else None
+            meal_obj = {"time": times[j % len(times)], "title": title, "kcal": per_meal_kcal}
+            if rec:
+                meal_obj.update({"ingredients": rec.get("ingredients"), "steps": rec.get("steps")})
+            day_meals.append(meal_obj)
+        days.append({"date": str(d), "meals": day_meals})
+    return days
+
+def _item_names(ings: Any) -> List[str]:
+    """Ingredient lines fit for MealItem.name (String(120)); LLM output is unchecked,
+    so drop empties and anything that isn't a scalar."""
+    if not isinstance(ings, list):
+        return []
+    out: List[str] = []
+    for ing in ings:
+        if isinstance(ing, bool) or not isinstance(ing, (str, int, float)):
+            continue
+        nm = str(ing).strip()[:120]
+        if nm:
+            out.append(nm)
+    return out
+
+def _persist_day_meals(session: Session, user_id: int, day: Dict[str, Any]) -> None:
+    """Add Meal (and recipe MealItem) rows for one plan day; caller commits."""
+    d = date.fromisoformat(str(day.get("date")))
+    _versions.bump(session, user_id, _versions.MEALS)
+    for meal_stub in (day.get("meals") or []):
+        m = Meal(user_id=user_id)  # type: ignore[call-arg]
+        _safe_set(m, "date", d)
+        title = str(meal_stub.get("title") or "").strip()[:120] or "Meal"
+        if hasattr(m, "title"):
+            m.title = title  # type: ignore[attr-defined]
+        elif hasattr(m, "name"):
+            m.name = title  # type: ignore[attr-defined]
+        if hasattr(m, "eaten_at"):
+            try:
+                tt = time.fromisoformat(meal_stub.get("time") or "12:00")
+            except Exception:
+                tt = time(12, 0)
+            _safe_set(m, "eaten_at", datetime.combine(d, tt))
+        session.add(m)
+        ings = _item_names((meal_stub.get("recipe") or {}).get("ingredients") or meal_stub.get("ingredients"))
+        if ings:
+            session.flush()
+            for ing in ings:
+                mi = MealItem(meal_id=m.id)  # type: ignore[call-arg]
+                if hasattr(mi, "name"):
+                    mi.name = ing  # type: ignore[attr-defined]
+                elif hasattr(mi, "ingredient"):
+                    mi.ingredient = ing  # type: ignore[attr-defined]
+                session.add(mi)
+
+def _build_diet_plan(inputs: Dict[str, Any], n_days: int, include_recipes: bool, start_dt: date) -> Dict[str, Any]:
+    """LLM plan when enabled and available, else the heuristic plan. No DB access,
+    so it can run off the request thread."""
+    # If LLM is enabled, attempt LLM-driven plan using PhD Coach logic
+    if settings.LLM_ENABLED:
+        try:
+            plan_llm = _llm.generate_diet_plan(intake=inputs["intake"], days=n_days, meals_per_day=inputs["meals_per_day"], avoids=inputs["avoids"], calorie_target=inputs["calorie_target"])
+        except Exception:
+            plan_llm = None
+        if plan_llm:
+            return plan_llm
+
+    days = _heuristic_plan_days(inputs, n_days, include_recipes, start_dt)
+    return {
+        "label": "Auto Plan",
+        "start": str(start_dt),
+        "end": str(start_dt + timedelta(days=n_days - 1)),
+        "days": days,
+        "window": {"start": str(start_dt), "end": str(start_dt + timedelta(days=n_days - 1))},
+    }
+
 @router.post("/plans/generate")
 def generate_plan(
     req: PlanGenerateRequest = Body(...),
@@ -630,150 +844,92 @@ def generate_plan(
         raise HTTPException(status_code=400, detail="days must be 1..31")
 
     start_dt = date.today()
-    days: List[Dict[str, Any]] = []
 
     with _rls(session, user.id):
-        # Load intake and interpret preferences/goals
-        intake = session.exec(select(Intake).where(Intake.user_id == user.id)).first()
-        notes_l = (getattr(intake, 'food_notes', '') + ' ' + getattr(intake, 'workout_notes', '')).lower() if intake else ''
-        diabetic_flag = bool(getattr(intake, 'diabetic', False))
-        r = rationalize_intake(session=session, user=user)
-        meals_per_day = r.meals_per_day if isinstance(r, RationalizeOut) else 2
-        times = r.times if isinstance(r, RationalizeOut) else ["12:00", "18:00"]
-
-        # Avoidance keywords from explicit preferences + notes
-        avoids: List[str] = []
-        # From structured intake (comma-separated)
-        try:
-            ai = (getattr(intake, 'avoid_ingredients', '') or '')
-            for a in str(ai).split(','):
-                a = a.strip().lower()
-                if a:
-                    avoids.append(a)
-        except Exception:
-            pass
-        # From notes (heuristic)
-        for key in ["cilantro", "pork", "beef", "dairy", "gluten", "egg", "eggs", "mushroom", "onion", "fish", "seafood", "shellfish", "chicken", "turkey"]:
-            if key in notes_l:
-                avoids.append(key)
-        # Expand broad categories to common synonyms
-        expand = {
-            'seafood': ['fish','salmon','tuna','shrimp','crab','lobster','scallop'],
-            'shellfish': ['shrimp','crab','lobster','scallop'],
-            'fish': ['fish','salmon','tuna'],
-            'dairy': ['dairy','milk','cheese','yogurt','cream'],
-            'eggs': ['egg','eggs'],
-            'onions': ['onion','onions','scallion','scallions','green onion'],
-            'scallions': ['scallion','scallions','green onion'],
-            'mushrooms': ['mushroom','mushrooms'],
-            'nuts': ['nut','nuts','peanuts','almonds','walnuts','cashews','tree nuts'],
-            'gluten': ['gluten','wheat','bread','pasta'],
-            'beef': ['beef'],
-            'pork': ['pork'],
-            'chicken': ['chicken'],
-            'turkey': ['turkey'],
-        }
-        avoids_expanded: List[str] = []
-        for a in avoids:
-            avoids_expanded.append(a)
-            avoids_expanded.extend(expand.get(a, []))
-        # Normalize and de-duplicate
-        avoids = sorted(set(a.strip().lower() for a in avoids_expanded if a))
-
-        # If LLM is enabled, attempt LLM-driven plan using PhD Coach logic
-        if settings.LLM_ENABLED:
-            try:
-                kcal_target = getattr(r, 'calorie_target', None) if isinstance(r, RationalizeOut) else None
-                plan_llm = _llm.generate_diet_plan(intake=intake, days=req.days, meals_per_day=meals_per_day, avoids=avoids, calorie_target=kcal_target)
-            except Exception:
-                plan_llm = None
-            if plan_llm:
-                plan_json = plan_llm
-                # Persist minimal meal rows if requested
-                if req.persist:
-                    for day in plan_json.get('days', []):
-                        d = date.fromisoformat(str(day.get('date')))
-                        for meal_stub in (day.get('meals') or []):
-                            m = Meal(user_id=user.id)  # type: ignore[call-arg]
-                            _safe_set(m, "date", d)
-                            if hasattr(m, "title"):
-                                m.title = meal_stub.get("title") or "Meal"  # type: ignore[attr-defined]
-                            elif hasattr(m, "name"):
-                                m.name = meal_stub.get("title") or "Meal"  # type: ignore[attr-defined]
-                            if hasattr(m, "eaten_at"):
-                                try:
-                                    tt = time.fromisoformat(meal_stub.get("time") or "12:00")
-                                except Exception:
-                                    tt = time(12, 0)
-                                _safe_set(m, "eaten_at", datetime.combine(d, tt))
-                            session.add(m)
-                    session.commit()
-                return plan_json
-
-        # Choose recipe titles tailored to flags (heuristic fallback)
-        titles = _pick_recipes(intake, low_carb=('lower' in r.diet_label.lower() if isinstance(r, RationalizeOut) else False), diabetic=diabetic_flag, avoids=avoids, count=req.days * meals_per_day)
-
-        # Build plan days
-        k = 0
-        for i in range(req.days):
-            d = start_dt + timedelta(days=i)
-            day_meals = []
-            for j in range(meals_per_day):
-                title = titles[k % len(titles)]; k += 1
-                rec = _make_recipe(title) if req.include_recipes else None
-                # Calorie target per meal: distribute daily target evenly if available
-                try:
-                    kcal_target = getattr(r, 'calorie_target', None)
-                except Exception:
-                    kcal_target = None
-                per_meal_kcal = int(round((kcal_target or 1800) / max(1, meals_per_day)))
-                meal_obj = {"time": times[j % len(times)], "title": title, "kcal": per_meal_kcal}
-                if rec:
-                    meal_obj.update({"ingredients": rec.get("ingredients"), "steps": rec.get("steps")})
-                day_meals.append(meal_obj)
-            days.append({"date": str(d), "meals": day_meals})
+        inputs = _plan_inputs(session, user)
+        plan_json = _build_diet_plan(inputs, req.days, req.include_recipes, start_dt)
 
+        # Persist minimal meal rows if requested
         if req.persist:
-            for day in days:
-                d = date.fromisoformat(day["date"])
-                for meal_stub in day["meals"]:
-                    m = Meal(user_id=user.id)  # type: ignore[call-arg]
-                    _safe_set(m, "date", d)
-                    if hasattr(m, "title"):
-                        m.title = meal_stub["title"]  # type: ignore[attr-defined]
-                    elif hasattr(m, "name"):
-                        m.name = meal_stub["title"]  # type: ignore[attr-defined]
-                    if hasattr(m, "eaten_at"):
-                        try:
-                            tt = time.fromisoformat(meal_stub.get("time") or "12:00")
-                        except Exception:
-                            tt = time(12, 0)
-                        _safe_set(m, "eaten_at", datetime.combine(d, tt))
-                    session.add(m)
-                    session.flush()
-                    if meal_stub.get("recipe"):
-                        for ing in meal_stub["recipe"]["ingredients"]:
-                            mi = MealItem(meal_id=m.id)  # type: ignore[call-arg]
-                            if hasattr(mi, "name"):
-                                mi.name = ing  # type: ignore[attr-defined]
-                            elif hasattr(mi, "ingredient"):
-                                mi.ingredient = ing  # type: ignore[attr-defined]
-                            session.add(mi)
+            for day in plan_json.get("days", []):
+                _persist_day_meals(session, user.id, day)
             session.commit()
+        _save_plan(user.id, plan_json)
+
+    return plan_json
+
+@router.post("/plans/generate/stream")
+def generate_plan_stream(
+    req: PlanGenerateRequest = Body(...),
+    *,
+    session: Session = Depends(rls_session),
+    user: User = Depends(auth_user),
+):
+    """Server-sent events version of /plans/generate.
+
+    Emits `meta`, then one `day` event per plan day as soon as it validates
+    (LLM days as the model streams them; heuristic days fill anything the LLM
+    did not produce), then `done` with the saved plan summary. Meal rows are
+    committed per day when persist=true. Read with fetch() + a stream reader.
+    """
+    if req.days <= 0 or req.days > 31:
+        raise HTTPException(status_code=400, detail="days must be 1..31")
+    start_dt = date.today()
+    user_id = user.id
+    with _rls(session, user.id):
+        inputs = _plan_inputs(session, user)
+
+    def sse(event: str, data: Any) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
 
-        plans_dir = Path(f"data/plans/user-{user.id}")
-        _ensure_dir(plans_dir / "dummy")
+    def stream():
+        yield sse("meta", {"start": str(start_dt), "days": req.days, "meals_per_day": inputs["meals_per_day"]})
+        out_days: List[Dict[str, Any]] = []
+        source = "heuristic"
+        with Session(engine) as s, _rls(s, user_id):
+            if settings.LLM_ENABLED:
+                try:
+                    for day in _llm.stream_diet_plan(intake=inputs["intake"], days=req.days, meals_per_day=inputs["meals_per_day"], avoids=inputs["avoids"], calorie_target=inputs["calorie_target"]):
+                        source = "llm"
+                        if req.persist:
+                            _persist_day_meals(s, user_id, day)
+                            s.commit()
+                        out_days.append(day)
+                        yield sse("day", day)
+                except Exception:
+                    pass
+            if len(out_days) < req.days:
+                filler = _heuristic_plan_days(inputs, req.days, req.include_recipes, start_dt)[len(out_days):]
+                for day in filler:
+                    if req.persist:
+                        _persist_day_meals(s, user_id, day)
+                        s.commit()
+                    out_days.append(day)
+                    yield sse("day", day)
         plan_json = {
-            "label": "Auto Plan",
-            "start": str(start_dt),
-            "end": str(start_dt + timedelta(days=req.days - 1)),
-            "days": days,
-            "window": {"start": str(start_dt), "end": str(start_dt + timedelta(days=req.days - 1))},
+            "label": "PhD Coach Plan" if source == "llm" else "Auto Plan",
+            "start": out_days[0]["date"],
+            "end": out_days[-1]["date"],
+            "days": out_days,
+            "window": {"start": out_days[0]["date"], "end": out_days[-1]["date"]},
         }
-        with (plans_dir / f"{start_dt}.json").open("w", encoding="utf-8") as f:
-            json.dump(plan_json, f, ensure_ascii=False, indent=2)
-
-    return plan_json
+        _save_plan(user_id, plan_json)
+        yield sse("done", {"label": plan_json["label"], "start": plan_json["start"], "end": plan_json["end"], "days": len(out_days), "source": source})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _save_plan(user_id: int, plan_json: Dict[str, Any]) -> Path:
+    """Write a plan into the per-user plan store (data/plans/user-N/<start>.json)."""
+    plans_dir = Path(f"data/plans/user-{user_id}")
+    _ensure_dir(plans_dir / "dummy")
+    fp = plans_dir / f"{plan_json.get('start') or date.today()}.json"
+    with fp.open("w", encoding="utf-8") as f:
+        json.dump(plan_json, f, ensure_ascii=False, indent=2)
+    return fp
 
 @router.get("/plans")
 def list_plans(
@@ -883,6 +1039,67 @@ def _build_day_template(eq: Dict[str,bool], day_index: int) -> List[Dict[str, An
         out += [ex('Plank','Mat', sets=3, reps=45, tw=None, rest=45), ex('Cable Woodchop','Cable', sets=3, reps=12), ex('Farmer Carry','Dumbbells', sets=4, reps=40)]
     return out
 
+def _build_workout_days(intake: Optional[Intake], n_days: int, start_dt: date) -> List[Dict[str, Any]]:
+    """Workout sessions ({date, title, exercises}) from the LLM when enabled, else
+    the heuristic split. No DB access, so it can run off the request thread."""
+    eq = _equipment_from_notes(intake)
+    per_week = _sessions_per_week(intake)
+    minutes = _session_minutes(intake)
+    sessions: List[Dict[str, Any]] = []
+
+    if settings.LLM_ENABLED:
+        # Use LLM stub to produce plan-shaped output
+        llm_sessions = _llm.generate_workout_plan(intake=intake, days=n_days, per_week=per_week, minutes=minutes, equipment=eq)
+        for s in llm_sessions:
+            d = date.fromisoformat(s['date'])
+            sessions.append({ 'date': str(d), 'title': s.get('title') or 'Workout', 'exercises': s.get('exercises') or [] })
+        return sessions
+
+    # Heuristic fallback
+    # Derive session indices across the requested window
+    day_indices = list(range(n_days))
+    if per_week < n_days:
+        step = n_days / per_week
+        # pick evenly spaced indices
+        picks = []
+        for i in range(per_week):
+            x = int(round(i * step))
+            if x >= n_days: x = n_days - 1
+            if x not in picks:
+                picks.append(x)
+        day_indices = picks
+    for i in day_indices:
+        d = start_dt + timedelta(days=i)
+        tmpl = _build_day_template(eq, i)
+        if minutes <= 30 and len(tmpl) > 3:
+            tmpl = tmpl[:3]
+        sessions.append({ 'date': str(d), 'title': ['Upper','Lower','Push','Pull','Core'][i%5], 'exercises': tmpl })
+    return sessions
+
+def _persist_workout_days(session: Session, user_id: int, intake: Optional[Intake], sessions: List[Dict[str, Any]]) -> int:
+    """Add WorkoutSession/WorkoutExercise rows for generated sessions; caller commits."""
+    eq = _equipment_from_notes(intake)
+    tstr = (getattr(intake, 'workout_time', None) or '06:00')
+    try:
+        tt = time.fromisoformat(tstr)
+    except Exception:
+        tt = time(6,0)
+    location = getattr(intake,'gym',None) or ('Home' if eq.get('home') else None)
+    if sessions:
+        _versions.bump(session, user_id, _versions.WORKOUTS)
+    made = 0
+    for s in sessions:
+        d = date.fromisoformat(s['date'])
+        sess = WorkoutSession(user_id=user_id, date=datetime.combine(d, tt), title=s['title'], location=location)
+        session.add(sess)
+        session.flush()
+        for j, e in enumerate(s['exercises']):
+            we = WorkoutExercise(session_id=sess.id, order_index=j, name=e.get('name'), machine=e.get('machine'), sets=e.get('sets'), reps=e.get('reps'), target_weight=e.get('target_weight'), rest_sec=e.get('rest_sec'))
+            session.add(we)
+            _volume.track(session, user_id, d, e.get('name') or '', None, e)
+        made += 1
+    return made
+
 @router.post('/workouts/generate')
 def generate_workouts(
     req: WorkoutGenerateRequest = Body(...),
@@ -895,100 +1112,57 @@ def generate_workouts(
     start_dt = date.today()
     with _rls(session, user.id):
         intake = session.exec(select(Intake).where(Intake.user_id == user.id)).first()
-        eq = _equipment_from_notes(intake)
-        per_week = _sessions_per_week(intake)
-        minutes = _session_minutes(intake)
+        sessions = _build_workout_days(intake, req.days, start_dt)
+        _progression.apply_targets(sessions, _progression.targets(session, user.id))
         made = 0
-        sessions: List[Dict[str, Any]] = []
-
-        if settings.LLM_ENABLED:
-            # Use LLM stub to produce plan-shaped output
-            llm_sessions = _llm.generate_workout_plan(intake=intake, days=req.days, per_week=per_week, minutes=minutes, equipment=eq)
-            for s in llm_sessions:
-                d = date.fromisoformat(s['date'])
-                tmpl = s.get('exercises') or []
-                tstr = (getattr(intake, 'workout_time', None) or '06:00')
-                try:
-                    tt = time.fromisoformat(tstr)
-                except Exception:
-                    tt = time(6,0)
-                sess = WorkoutSession(user_id=user.id, date=datetime.combine(d, tt), title=s.get('title') or 'Workout', location=(getattr(intake,'gym',None) or ('Home' if eq.get('home') else None)))
-                if req.persist:
-                    session.add(sess)
-                    session.flush()
-                    for j, e in enumerate(tmpl):
-                        we = WorkoutExercise(session_id=sess.id, order_index=j, name=e.get('name'), machine=e.get('machine'), sets=e.get('sets'), reps=e.get('reps'), target_weight=e.get('target_weight'), rest_sec=e.get('rest_sec'))
-                        session.add(we)
-                    made += 1
-                sessions.append({ 'date': str(d), 'title': sess.title, 'exercises': tmpl })
-        else:
-            # Heuristic fallback
-            # Derive session indices across the requested window
-            day_indices = list(range(req.days))
-            if per_week < req.days:
-                step = req.days / per_week
-                # pick evenly spaced indices
-                picks = []
-                for i in range(per_week):
-                    x = int(round(i * step))
-                    if x >= req.days: x = req.days - 1
-                    if x not in picks:
-                        picks.append(x)
-                day_indices = picks
-            for i in day_indices:
-                d = start_dt + timedelta(days=i)
-                tmpl = _build_day_template(eq, i)
-                if minutes <= 30 and len(tmpl) > 3:
-                    tmpl = tmpl[:3]
-                tstr = (getattr(intake, 'workout_time', None) or '06:00')
-                try:
-                    tt = time.fromisoformat(tstr)
-                except Exception:
-                    tt = time(6,0)
-                sess = WorkoutSession(user_id=user.id, date=datetime.combine(d, tt), title=['Upper','Lower','Push','Pull','Core'][i%5], location=(getattr(intake,'gym',None) or ('Home' if eq['home'] else None)))
-                if req.persist:
-                    session.add(sess)
-                    session.flush()
-                    for j, e in enumerate(tmpl):
-                        we = WorkoutExercise(session_id=sess.id, order_index=j, name=e['name'], machine=e.get('machine'), sets=e.get('sets'), reps=e.get('reps'), target_weight=e.get('target_weight'), rest_sec=e.get('rest_sec'))
-                        session.add(we)
-                    made += 1
-                sessions.append({ 'date': str(d), 'title': sess.title, 'exercises': tmpl })
         if req.persist:
+            made = _persist_workout_days(session, user.id, intake, sessions)
             session.commit()
     return { 'created': made, 'start': str(start_dt), 'days': sessions }
 
+_WORKOUT_EXERCISE_KEYS = (
+    'id', 'name', 'machine', 'sets', 'reps', 'target_weight',
+    'rest_sec', 'complete', 'actual_reps', 'actual_weight',
+)
+
 @router.get('/workouts')
 def list_workouts(
     *,
     session: Session = Depends(rls_session),
     user: User = Depends(auth_user),
     start: Optional[date] = Query(None), end: Optional[date] = Query(None),
+    if_none_match: Optional[str] = Header(None),
 ):
     with _rls(session, user.id):
-        q = select(WorkoutSession).where(WorkoutSession.user_id == user.id)
-        if start: q = q.where(func.date(WorkoutSession.date) >= start)
-        if end: q = q.where(func.date(WorkoutSession.date) <= end)
-        q = q.order_by(WorkoutSession.date)
-        sessions = session.exec(q).all()
-        out = []
-        for s in sessions:
-            exs = session.exec(select(WorkoutExercise).where(WorkoutExercise.session_id == s.id).order_by(WorkoutExercise.order_index)).all()
-            out.append({
-              'id': s.id,
-              'date': s.date.date().isoformat(),
-              'title': s.title,
-              'location': s.location,
-              'exercises': [
-                {
-                  'id': e.id, 'name': e.name, 'machine': e.machine,
-                  'sets': e.sets, 'reps': e.reps, 'target_weight': e.target_weight,
-                  'rest_sec': e.rest_sec, 'complete': e.complete,
-                  'actual_reps': e.actual_reps, 'actual_weight': e.actual_weight,
-                } for e in exs
-              ]
-            })
-        return out
+        tag, not_modified = _etag_or_304(session, user.id, _versions.WORKOUTS, if_none_match)
+        if not_modified:
+            return not_modified
+        # one joined query instead of one exercise query per session
+        sql = """
+            SELECT s.id, CAST(s.date AS date), s.title, s.location,
+                   e.id, e.name, e.machine, e.sets, e.reps, e.target_weight,
+                   e.rest_sec, e.complete, e.actual_reps, e.actual_weight
+            FROM workout_sessions s
+            LEFT JOIN workout_exercises e ON e.session_id = s.id
+            WHERE s.user_id = :uid
+        """
+        params: Dict[str, Any] = {'uid': user.id}
+        if start:
+            sql += " AND CAST(s.date AS date) >= :start"
+            params['start'] = start
+        if end:
+            sql += " AND CAST(s.date AS date) <= :end"
+            params['end'] = end
+        sql += " ORDER BY s.date, s.id, e.order_index, e.id"
+        out: List[Dict[str, Any]] = []
+        cur: Optional[Dict[str, Any]] = None
+        for r in session.exec(text(sql).bindparams(**params)).all():
+            if cur is None or cur['id'] != r[0]:
+                cur = {'id': r[0], 'date': r[1], 'title': r[2], 'location': r[3], 'exercises': []}
+                out.append(cur)
+            if r[4] is not None:
+                cur['exercises'].append(dict(zip(_WORKOUT_EXERCISE_KEYS, r[4:])))
+        return _fastjson.FastJSONResponse(out, headers=_validators(tag))
 
 class ExerciseUpdate(BaseModel):
     complete: Optional[bool] = None
@@ -1002,8 +1176,11 @@ def update_exercise(
 ):
     with _rls(session, user.id):
         e = session.get(WorkoutExercise, exercise_id)
-        if not e:
+        ws = session.get(WorkoutSession, e.session_id) if e else None
+        # Same owner filter as the batch path; another user's exercise is "not found"
+        if not e or ws is None or ws.user_id != user.id:
             raise HTTPException(status_code=404, detail='Exercise not found')
+        before = _volume.snapshot(e)
         if payload.complete is not None:
             e.complete = bool(payload.complete)
         if payload.actual_reps is not None:
@@ -1011,10 +1188,140 @@ def update_exercise(
         if payload.actual_weight is not None:
             e.actual_weight = int(payload.actual_weight)
         session.add(e)
+        _volume.track(session, user.id, ws.date, e.name, before, _volume.snapshot(e))
+        if _volume.snapshot(e) != before:
+            _progression.record(session, user.id, e, ws.date)
+        _versions.bump(session, user.id, _versions.WORKOUTS)
+        _events.publish(session, user.id, _events.EXERCISE, {
+            'id': e.id, 'session_id': e.session_id, 'complete': e.complete,
+            'actual_reps': e.actual_reps, 'actual_weight': e.actual_weight,
+        })
         session.commit()
         session.refresh(e)
         return { 'ok': True, 'id': e.id, 'complete': e.complete, 'actual_reps': e.actual_reps, 'actual_weight': e.actual_weight }
 
+class ExerciseBatchItem(ExerciseUpdate):
+    id: int
+
+class ExerciseBatchIn(BaseModel):
+    updates: List[ExerciseBatchItem]
+
+_BATCH_MAX = 200
+
+@router.post('/workouts/exercises/batch')
+def update_exercises_batch(
+    payload: ExerciseBatchIn,
+    *, session: Session = Depends(rls_session), user: User = Depends(auth_user),
+    idempotency_key: Optional[str] = Header(None, alias='Idempotency-Key', max_length=128),
+):
+    """Apply many exercise updates in one transaction and one UPDATE.
+
+    Send an `Idempotency-Key` header to make the batch safe to replay from an
+    offline queue: a repeat returns the first response with `replayed: true`.
+    Ids that do not exist or belong to someone else come back in `missing`.
+    """
+    if len(payload.updates) > _BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f'at most {_BATCH_MAX} updates per batch')
+    # Later updates to the same id win field by field (UPDATE ... FROM needs one row per id)
+    merged: Dict[int, Dict[str, Any]] = {}
+    for u in payload.updates:
+        cur = merged.setdefault(u.id, {'complete': None, 'actual_reps': None, 'actual_weight': None})
+        for k in cur:
+            v = getattr(u, k)
+            if v is not None:
+                cur[k] = v
+
+    with _rls(session, user.id):
+        if idempotency_key:
+            prior = _idem.claim(session, user.id, idempotency_key, 'workouts.exercises.batch', payload.model_dump())
+            if prior is not None:
+                session.rollback()
+                return { **prior, 'replayed': True }
+
+        rows: List[Dict[str, Any]] = []
+        if merged:
+            values, params = [], {'uid': user.id}
+            for i, (eid, u) in enumerate(merged.items()):
+                values.append(f"(CAST(:id{i} AS integer), CAST(:c{i} AS boolean), CAST(:r{i} AS integer), CAST(:w{i} AS integer))")
+                params.update({f'id{i}': eid, f'c{i}': u['complete'], f'r{i}': u['actual_reps'], f'w{i}': u['actual_weight']})
+            upd = text(f"""
+                UPDATE workout_exercises e
+                SET complete = COALESCE(v.complete, e.complete),
+                    actual_reps = COALESCE(v.actual_reps, e.actual_reps),
+                    actual_weight = COALESCE(v.actual_weight, e.actual_weight)
+                FROM (VALUES {', '.join(values)}) AS v(id, complete, actual_reps, actual_weight),
+                     workout_sessions s,
+                     workout_exercises old
+                WHERE e.id = v.id AND s.id = e.session_id AND s.user_id = :uid AND old.id = e.id
+                RETURNING e.id, e.session_id, e.order_index, e.name, e.sets, e.reps, e.target_weight,
+                          e.complete, e.actual_reps, e.actual_weight, s.date AS session_date,
+                          old.complete AS old_complete, old.actual_reps AS old_actual_reps, old.actual_weight AS old_actual_weight
+            """).bindparams(**params)
+            rows = [dict(r) for r in session.exec(upd).mappings().all()]
+
+        changed: List[Dict[str, Any]] = []
+        for r in rows:
+            # `old` is the pre-update snapshot of the same row, so the rollup gets an exact delta
+            before = { **r, 'complete': r['old_complete'], 'actual_reps': r['old_actual_reps'], 'actual_weight': r['old_actual_weight'] }
+            _volume.track(session, user.id, r['session_date'], r['name'], before, r)
+            if _volume.snapshot(before) != _volume.snapshot(r):
+                changed.append(r)
+        # In session order, so entries completed together fold oldest first
+        changed.sort(key=lambda r: (r['session_date'], r['session_id'], r['order_index']))
+        for r in changed:
+            _progression.record(session, user.id, SimpleNamespace(**r), r['session_date'])
+
+        found = {r['id'] for r in rows}
+        out = {
+            'ok': True,
+            'updated': len(rows),
+            'missing': [eid for eid in merged if eid not in found],
+            'exercises': [
+                { 'id': r['id'], 'complete': r['complete'], 'actual_reps': r['actual_reps'], 'actual_weight': r['actual_weight'] }
+                for r in rows
+            ],
+        }
+        if rows:
+            _versions.bump(session, user.id, _versions.WORKOUTS)
+            _events.publish(session, user.id, _events.EXERCISE, {'exercises': out['exercises']})
+        if idempotency_key:
+            _idem.store(session, user.id, idempotency_key, out)
+        session.commit()
+        return { **out, 'replayed': False }
+
+@router.get('/workouts/analytics')
+def workout_analytics(
+    *, session: Session = Depends(rls_session), user: User = Depends(auth_user),
+    weeks: int = Query(12, ge=1, le=104),
+    by: str = Query('group', pattern='^(group|exercise)$'),
+):
+    """Weekly sets/reps/tonnage/completion rate by movement group or exercise.
+    Past weeks come from the rollups; only the current week reads raw rows."""
+    with _rls(session, user.id):
+        return _volume.analytics(session, user.id, weeks=weeks, by=by)
+
+@router.post('/workouts/analytics/rebuild')
+def rebuild_analytics(*, session: Session = Depends(rls_session), user: User = Depends(auth_user)):
+    with _rls(session, user.id):
+        n = _volume.rebuild(session, user.id)
+        session.commit()
+        return { 'ok': True, 'rows': n }
+
+@router.get('/workouts/progression')
+def list_progression(*, session: Session = Depends(rls_session), user: User = Depends(auth_user)):
+    """Per-exercise aggregates and the next-session targets generation will use."""
+    with _rls(session, user.id):
+        rows = _progression.targets(session, user.id)
+        return [_progression.to_dict(r) for _, r in sorted(rows.items())]
+
+@router.post('/workouts/progression/rebuild')
+def rebuild_progression(*, session: Session = Depends(rls_session), user: User = Depends(auth_user)):
+    """Recompute targets from full history (backfill, or after correcting old entries)."""
+    with _rls(session, user.id):
+        n = _progression.rebuild(session, user.id)
+        session.commit()
+        return { 'ok': True, 'exercises': n }
+
 # ------------------------------------------------------------------------------
 # Trackers: weight & glucose; Meal checklist + summary
 # ------------------------------------------------------------------------------
@@ -1023,17 +1330,20 @@ class WeightIn(BaseModel):
     weight_lb: int
 
 @router.get('/trackers/weight')
-def list_weight(*, session: Session = Depends(rls_session), user: User = Depends(auth_user), limit: int = 30):
+def list_weight(*, session: Session = Depends(rls_session), user: User = Depends(auth_user), limit: int = 30, if_none_match: Optional[str] = Header(None)):
     with _rls(session, user.id):
-        q = select(WeightLog).where(WeightLog.user_id == user.id).order_by(WeightLog.when.desc()).limit(limit)
-        rows = session.exec(q).all()
-        return [{ 'id': r.id, 'when': r.when.isoformat(), 'weight_lb': r.weight_lb } for r in rows]
+        tag, not_modified = _etag_or_304(session, user.id, _versions.TRACKERS, if_none_match)
+        if not_modified:
+            return not_modified
+        q = select(WeightLog.id, WeightLog.when, WeightLog.weight_lb).where(WeightLog.user_id == user.id).order_by(WeightLog.when.desc()).limit(limit)
+        return _fastjson.rows_response(('id', 'when', 'weight_lb'), session.exec(q).all(), headers=_validators(tag))
 
 @router.post('/trackers/weight')
 def add_weight(payload: WeightIn, *, session: Session = Depends(rls_session), user: User = Depends(auth_user)):
     with _rls(session, user.id):
         wl = WeightLog(user_id=user.id, when=payload.when or datetime.utcnow(), weight_lb=int(payload.weight_lb))
         session.add(wl)
+        _versions.bump(session, user.id, _versions.TRACKERS)
         session.commit()
         session.refresh(wl)
         return { 'id': wl.id, 'when': wl.when.isoformat(), 'weight_lb': wl.weight_lb }
@@ -1043,17 +1353,20 @@ class GlucoseIn(BaseModel):
     mg_dL: int
 
 @router.get('/trackers/glucose')
-def list_glucose(*, session: Session = Depends(rls_session), user: User = Depends(auth_user), limit: int = 30):
+def list_glucose(*, session: Session = Depends(rls_session), user: User = Depends(auth_user), limit: int = 30, if_none_match: Optional[str] = Header(None)):
     with _rls(session, user.id):
-        q = select(GlucoseLog).where(GlucoseLog.user_id == user.id).order_by(GlucoseLog.when.desc()).limit(limit)
-        rows = session.exec(q).all()
-        return [{ 'id': r.id, 'when': r.when.isoformat(), 'mg_dL': r.mg_dL } for r in rows]
+        tag, not_modified = _etag_or_304(session, user.id, _versions.TRACKERS, if_none_match)
+        if not_modified:
+            return not_modified
+        q = select(GlucoseLog.id, GlucoseLog.when, GlucoseLog.mg_dL).where(GlucoseLog.user_id == user.id).order_by(GlucoseLog.when.desc()).limit(limit)
+        return _fastjson.rows_response(('id', 'when', 'mg_dL'), session.exec(q).all(), headers=_validators(tag))
 
 @router.post('/trackers/glucose')
 def add_glucose(payload: GlucoseIn, *, session: Session = Depends(rls_session), user: User = Depends(auth_user)):
     with _rls(session, user.id):
         gl = GlucoseLog(user_id=user.id, when=payload.when or datetime.utcnow(), mg_dL=int(payload.mg_dL))
         session.add(gl)
+        _versions.bump(session, user.id, _versions.TRACKERS)
         session.commit()
         session.refresh(gl)
         return { 'id': gl.id, 'when': gl.when.isoformat(), 'mg_dL': gl.mg_dL }
@@ -1064,8 +1377,12 @@ class MealCheckIn(BaseModel):
     complete: bool = True
 
 @router.get('/checklists/meals')
-def list_meal_checks(*, session: Session = Depends(rls_session), user: User = Depends(auth_user), start: Optional[date] = Query(None), end: Optional[date] = Query(None)):
+def list_meal_checks(response: Response, *, session: Session = Depends(rls_session), user: User = Depends(auth_user), start: Optional[date] = Query(None), end: Optional[date] = Query(None), if_none_match: Optional[str] = Header(None)):
     with _rls(session, user.id):
+        tag, not_modified = _etag_or_304(session, user.id, _versions.TRACKERS, if_none_match)
+        if not_modified:
+            return not_modified
+        response.headers.update(_validators(tag))
         q = select(MealCheck).where(MealCheck.user_id == user.id)
         if start: q = q.where(func.date(MealCheck.date) >= start)
         if end: q = q.where(func.date(MealCheck.date) <= end)
@@ -1084,6 +1401,8 @@ def mark_meal_check(payload: MealCheckIn, *, session: Session = Depends(rls_sess
             row.complete = bool(payload.complete)
             row.completed_at = datetime.utcnow() if payload.complete else None
         session.add(row)
+        _versions.bump(session, user.id, _versions.TRACKERS)
+        _events.publish(session, user.id, _events.MEAL_CHECK, {'date': payload.date, 'title': row.title, 'complete': row.complete})
         session.commit()
         session.refresh(row)
         return { 'id': row.id, 'date': row.date.date().isoformat(), 'title': row.title, 'complete': row.complete }
@@ -1125,6 +1444,34 @@ def checklists_summary(*, session: Session = Depends(rls_session), user: User =
           'groceries': { 'open': gro_open, 'purchased': gro_purch },
         }
 
+# ------------------------------------------------------------------------------
+# Today view: the day's meals with check state, workouts with exercises and the
+# latest tracker values, from one CTE query (app.core.today)
+# ------------------------------------------------------------------------------
+_TODAY_SCOPES = (_versions.MEALS, _versions.WORKOUTS, _versions.TRACKERS)
+_today_cache = _versions.LRUCache(settings.TODAY_CACHE_SIZE)
+
+@router.get('/today')
+def get_today(*, session: Session = Depends(rls_session), user: User = Depends(auth_user), day: Optional[date] = Query(None), if_none_match: Optional[str] = Header(None)):
+    day = day or date.today()
+    with _rls(session, user.id):
+        vers = _versions.get_many(session, user.id, _TODAY_SCOPES)
+        plan_fp = _today.current_plan(Path(f"data/plans/user-{user.id}"), day)
+        plan_key = (plan_fp[0].stem, plan_fp[1]) if plan_fp else None
+        # Every write that can change the view bumps one of these counters;
+        # plan files are keyed on their mtime
+        key = (user.id, day, tuple(vers[s] for s in _TODAY_SCOPES), plan_key)
+        digest = "-".join(str(vers[s]) for s in _TODAY_SCOPES) + (f"-{plan_key[1]}" if plan_key else "")
+        tag = _versions.etag(user.id, f"today-{day.isoformat()}", digest, settings.VERSION)
+        if _versions.etag_matches(if_none_match, tag):
+            return Response(status_code=304, headers=_validators(tag))
+        hit = _today_cache.get(key)
+        if hit is None:
+            plan, pday = _today.plan_day(plan_fp[0], day) if plan_fp else (None, None)
+            hit = _fastjson.dumps(_today.build(day, _today.load(session, user.id, day), plan, pday))
+            _today_cache.put(key, hit)
+        return Response(content=hit, media_type="application/json", headers=_validators(tag))
+
 # ------------------------------------------------------------------------------
 # Groceries (RAW SQL; never reference missing pricing columns)
 #   - add_grocery
@@ -1159,9 +1506,9 @@ def add_grocery(
                 VALUES (:uid, :name, :qty, NULL, false)
                 RETURNING id, user_id, name, quantity, unit, purchased
             """).bindparams(uid=user.id, name=item.name, qty=float(item.quantity or 1.0))
-        res = session.exec(stmt)
+        row = session.exec(stmt).mappings().first()
+        _versions.bump(session, user.id, _versions.GROCERIES)
         session.commit()
-        row = res.mappings().first()
         return dict(row) if row else {"ok": True}
 
 @router.get("/groceries")
@@ -1170,8 +1517,12 @@ def list_groceries(
     session: Session = Depends(rls_session),
     user: User = Depends(auth_user),
     only_open: bool = Query(False, description="Show only items not yet purchased"),
+    if_none_match: Optional[str] = Header(None),
 ):
     with _rls(session, user.id):
+        tag, not_modified = _etag_or_304(session, user.id, _versions.GROCERIES, if_none_match)
+        if not_modified:
+            return not_modified
         sql = """
             SELECT id, user_id, name, quantity, unit, purchased
             FROM grocery_items
@@ -1180,9 +1531,8 @@ def list_groceries(
         if only_open:
             sql += " AND COALESCE(purchased, false) = false"
         sql += " ORDER BY id"
-        stmt = text(sql).bindparams(uid=user.id)
-        rows = session.exec(stmt).mappings().all()
-        return [dict(r) for r in rows]
+        res = session.exec(text(sql).bindparams(uid=user.id))
+        return _fastjson.rows_response(list(res.keys()), res.all(), headers=_validators(tag))
 
 @router.patch("/groceries/{item_id}")
 def toggle_grocery_purchased(
@@ -1205,12 +1555,105 @@ def toggle_grocery_purchased(
             upd = text("UPDATE grocery_items SET purchased=:p WHERE id=:id AND user_id=:uid") \
                 .bindparams(p=not current, id=item_id, uid=user.id)
         session.exec(upd)
+        _versions.bump(session, user.id, _versions.GROCERIES)
+        _events.publish(session, user.id, _events.GROCERY, {'id': item_id, 'purchased': not current})
         session.commit()
         sel2 = text("SELECT id, user_id, name, quantity, unit, purchased FROM grocery_items WHERE id=:id AND user_id=:uid") \
             .bindparams(id=item_id, uid=user.id)
         row2 = session.exec(sel2).mappings().first()
         return dict(row2) if row2 else {"id": item_id, "purchased": not current}
 
+def _clear_open_groceries(session: Session, user_id: int) -> None:
+    session.exec(text("DELETE FROM grocery_items WHERE user_id=:uid AND purchased=false").bindparams(uid=user_id))
+    _versions.bump(session, user_id, _versions.GROCERIES)
+
+def _upsert_grocery_counts(
+    session: Session, user_id: int, name_counts: Dict[str, float], cols: set[str],
+    units: Optional[Dict[str, Optional[str]]] = None,
+) -> int:
+    """Set open grocery rows to the computed quantities (idempotent); returns rows created. Caller commits."""
+    units = units or {}
+    created = 0
+    for nm, qty in name_counts.items():
+        unit = units.get(nm)
+        sel = text("""
+            SELECT id, quantity
+            FROM grocery_items
+            WHERE user_id=:uid AND name=:nm AND purchased=false
+            LIMIT 1
+        """).bindparams(uid=user_id, nm=nm)
+        row = session.exec(sel).mappings().first()
+        if row:
+            # Idempotent: set to computed quantity instead of incrementing
+            if "updated_at" in cols:
+                upd = text("""
+                    UPDATE grocery_items
+                    SET quantity = :qty, unit = :unit,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id=:id
+                """).bindparams(qty=float(qty), unit=unit, id=row["id"])
+            else:
+                upd = text("UPDATE grocery_items SET quantity = :qty, unit = :unit WHERE id=:id") \
+                    .bindparams(qty=float(qty), unit=unit, id=row["id"])
+            session.exec(upd)
+        else:
+            if {"created_at", "updated_at"} <= cols:
+                ins = text("""
+                    INSERT INTO grocery_items (user_id, name, quantity, unit, purchased, created_at, updated_at)
+                    VALUES (:uid, :nm, :qty, :unit, false, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                """).bindparams(uid=user_id, nm=nm, qty=float(qty), unit=unit)
+            elif "created_at" in cols:  # rare case: only created_at enforced
+                ins = text("""
+                    INSERT INTO grocery_items (user_id, name, quantity, unit, purchased, created_at)
+                    VALUES (:uid, :nm, :qty, :unit, false, CURRENT_TIMESTAMP)
+                """).bindparams(uid=user_id, nm=nm, qty=float(qty), unit=unit)
+            else:
+                ins = text("""
+                    INSERT INTO grocery_items (user_id, name, quantity, unit, purchased)
+                    VALUES (:uid, :nm, :qty, :unit, false)
+                """).bindparams(uid=user_id, nm=nm, qty=float(qty), unit=unit)
+            session.exec(ins)
+            created += 1
+    if name_counts:
+        _versions.bump(session, user_id, _versions.GROCERIES)
+    return created
+
+def _plan_ingredient_counts(days: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Recipe-line counts straight from an in-memory plan (no meal re-read)."""
+    name_counts: Dict[str, float] = {}
+    for day in days:
+        for meal in (day.get("meals") or []):
+            ings = meal.get("ingredients") or _fallback_ingredients_from_title(meal.get("title") or "")
+            for nm in ings:
+                if not nm:
+                    continue
+                nm = str(nm)
+                name_counts[nm] = name_counts.get(nm, 0.0) + 1.0
+    return name_counts
+
+def _grocery_lines(line_counts: Dict[str, float]) -> tuple[Dict[str, float], Dict[str, Optional[str]]]:
+    """Fold recipe lines ("1 tbsp olive oil": uses) into one line per canonical
+    ingredient, sized in whole catalog packages where the units convert.
+
+    Returns (name -> quantity, name -> unit). Packaged lines get the package
+    count and a unit like "16.9 fl oz"; the rest keep the number of uses."""
+    cat = _catalog.get_catalog()
+    qty: Dict[str, float] = {}
+    unit: Dict[str, Optional[str]] = {}
+    for ing, line in _units.aggregate(line_counts).items():
+        nm = ing[:120]
+        q: float = max(1.0, float(line.uses))
+        u: Optional[str] = None
+        m = cat.resolve(ing)
+        if m is not None and m.offers:
+            offer = min(m.offers, key=lambda o: o.price)
+            n = _units.packages(line, offer.size, offer.unit)
+            if n is not None:
+                q, u = float(n), f"{offer.size:g} {offer.unit}"[:24]
+        qty[nm] = q
+        unit[nm] = u
+    return qty, unit
+
 @router.post("/groceries/sync_from_meals")
 def sync_groceries_from_meals(
     *,
@@ -1229,13 +1672,7 @@ def sync_groceries_from_meals(
         cols = _table_cols(session, "grocery_items")
 
         if clear_existing:
-            if "updated_at" in cols:
-                del_stmt = text("DELETE FROM grocery_items WHERE user_id=:uid AND purchased=false") \
-                    .bindparams(uid=user.id)
-            else:
-                del_stmt = text("DELETE FROM grocery_items WHERE user_id=:uid AND purchased=false") \
-                    .bindparams(uid=user.id)
-            session.exec(del_stmt)
+            _clear_open_groceries(session, user.id)
             session.commit()
 
         # Query meals in window (time-aware)
@@ -1268,6 +1705,7 @@ def sync_groceries_from_meals(
                             mi.ingredient = ing  # type: ignore[attr-defined]
                         session.add(mi)
                 cur += timedelta(days=1)
+            _versions.bump(session, user.id, _versions.MEALS)
             if persist:
                 session.commit()
             # Re-query after seeding
@@ -1276,7 +1714,7 @@ def sync_groceries_from_meals(
                 q = q.where(cond)
             meals = session.exec(q).all()
 
-        # Aggregate ingredient counts
+        # Aggregate recipe lines, then fold into canonical ingredients / packages
         name_counts: Dict[str, float] = {}
         for m in meals:
             mis = session.exec(select(MealItem).where(MealItem.meal_id == m.id)).all()
@@ -1299,51 +1737,17 @@ def sync_groceries_from_meals(
                 for nm in _fallback_ingredients_from_title(title or ""):
                     name_counts[nm] = name_counts.get(nm, 0.0) + 1.0
 
+        name_counts, units = _grocery_lines(name_counts)
+
         created = 0
         if persist:
-            for nm, qty in name_counts.items():
-                sel = text("""
-                    SELECT id, quantity
-                    FROM grocery_items
-                    WHERE user_id=:uid AND name=:nm AND purchased=false
-                    LIMIT 1
-                """).bindparams(uid=user.id, nm=nm)
-                row = session.exec(sel).mappings().first()
-                if row:
-                    # Idempotent: set to computed quantity instead of incrementing
-                    if "updated_at" in cols:
-                        upd = text("""
-                            UPDATE grocery_items
-                            SET quantity = :qty,
-                                updated_at = CURRENT_TIMESTAMP
-                            WHERE id=:id
-                        """).bindparams(qty=float(qty), id=row["id"])
-                    else:
-                        upd = text("UPDATE grocery_items SET quantity = :qty WHERE id=:id") \
-                            .bindparams(qty=float(qty), id=row["id"])
-                    session.exec(upd)
-                else:
-                    if {"created_at", "updated_at"} <= cols:
-                        ins = text("""
-                            INSERT INTO grocery_items (user_id, name, quantity, unit, purchased, created_at, updated_at)
-                            VALUES (:uid, :nm, :qty, NULL, false, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                        """).bindparams(uid=user.id, nm=nm, qty=float(qty))
-                    elif "created_at" in cols:  # rare case: only created_at enforced
-                        ins = text("""
-                            INSERT INTO grocery_items (user_id, name, quantity, unit, purchased, created_at)
-                            VALUES (:uid, :nm, :qty, NULL, false, CURRENT_TIMESTAMP)
-                        """).bindparams(uid=user.id, nm=nm, qty=float(qty))
-                    else:
-                        ins = text("""
-                            INSERT INTO grocery_items (user_id, name, quantity, unit, purchased)
-                            VALUES (:uid, :nm, :qty, NULL, false)
-                        """).bindparams(uid=user.id, nm=nm, qty=float(qty))
-                    session.exec(ins)
-                    created += 1
+            created = _upsert_grocery_counts(session, user.id, name_counts, cols, units)
             session.commit()
 
         return {"created": created, "count": len(name_counts), "window": {"start": str(start), "end": str(end)}}
 
+_preview_cache = _versions.LRUCache(settings.PRICE_PREVIEW_CACHE_SIZE)
+
 @router.get("/groceries/price_preview")
 def price_preview(
     *,
@@ -1351,6 +1755,13 @@ def price_preview(
     user: User = Depends(auth_user),
 ):
     with _rls(session, user.id):
+        # Keyed on the list version (bumped by every grocery/intake write) and
+        # the catalog version, so a hit costs one counter read
+        key = (user.id, _versions.get(session, user.id, _versions.GROCERIES), _catalog.get_catalog().version)
+        hit = _preview_cache.get(key)
+        if hit is not None:
+            return hit
+
         sel = text("""
             SELECT id, name, quantity
             FROM grocery_items
@@ -1361,25 +1772,138 @@ def price_preview(
 
         intake = session.exec(select(Intake).where(Intake.user_id == user.id)).first()
         prefer = _prefer_store_from_intake(intake)
+        preview = _price_rows(rows, prefer)
+        preview["preferred_store"] = prefer
+        _preview_cache.put(key, preview)
+        return preview
+
+def _price_rows(rows: List[Any], prefer: Optional[str]) -> Dict[str, Any]:
+    """Price open grocery rows ({id, name, quantity}) at the preferred or cheapest store."""
+    preview_items: List[Dict[str, Any]] = []
+    totals = {s: 0.0 for s in _STORES}
+    # One batched catalog lookup for the whole list
+    matches = _catalog.get_catalog().resolve_many(r["name"] for r in rows)
+
+    for r in rows:
+        name = r["name"]
+        qty = float(r.get("quantity") or 1.0)
+        m = matches.get(name)
+        price_map = m.price_map() if m is not None else _PRICE_BOOK.get(_normalize_name(name), _DEFAULT_PRICE)
+        store = prefer if prefer in price_map else min(price_map, key=price_map.get)
+        unit_price = float(price_map[store])
+        total_price = round(unit_price * max(1.0, qty), 2)
+        totals[store] = totals.get(store, 0.0) + total_price
+
+        sku = next((o.sku for o in m.offers if o.store == store), None) if m is not None else None
+        preview_items.append(
+            {"id": r["id"], "name": name, "suggested_store": store, "unit_price": unit_price, "total_price": total_price,
+             "match": m.product if m is not None else None, "sku": sku}
+        )
 
-        preview_items: List[Dict[str, Any]] = []
-        totals = {s: 0.0 for s in _STORES}
+    grand_total = round(sum(totals.values()), 2)
+    return {"items": preview_items, "totals": {k: round(v, 2) for k, v in totals.items()}, "grand_total": grand_total}
 
-        for r in rows:
-            name = r["name"]
-            qty = float(r.get("quantity") or 1.0)
-            price_map = _price_map_for_item(name)
-            store = prefer or min(price_map, key=price_map.get)
-            unit_price = float(price_map[store])
-            total_price = round(unit_price * max(1.0, qty), 2)
-            totals[store] += total_price
-
-            preview_items.append(
-                {"id": r["id"], "name": name, "suggested_store": store, "unit_price": unit_price, "total_price": total_price}
-            )
+@router.get("/prices/current")
+def current_prices(
+    *,
+    session: Session = Depends(rls_session),
+    user: User = Depends(auth_user),
+    name: str = Query(..., min_length=1, description="Ingredient or product name"),
+):
+    """Latest price per store for the catalog product matching `name`."""
+    m = _catalog.get_catalog().resolve(name)
+    if m is None:
+        raise HTTPException(status_code=404, detail="No catalog product matches that name")
+    try:
+        rows = _price_history.latest(session.connection(), skus=[o.sku for o in m.offers])
+    except Exception:
+        session.rollback()
+        rows = []
+    return {"product": m.product, "score": m.score, "prices": rows}
 
-        grand_total = round(sum(totals.values()), 2)
-        return {"items": preview_items, "totals": {k: round(v, 2) for k, v in totals.items()}, "grand_total": grand_total}
+@router.get("/prices/history")
+def price_history(
+    *,
+    session: Session = Depends(rls_session),
+    user: User = Depends(auth_user),
+    name: str = Query(..., min_length=1, description="Ingredient or product name"),
+    store: Optional[str] = Query(None),
+    start: Optional[date] = Query(None, description="YYYY-MM-DD"),
+    end: Optional[date] = Query(None, description="YYYY-MM-DD"),
+    bucket: Optional[str] = Query(None, pattern="^(day|week|month)$"),
+):
+    """Price observations over time for one product, optionally per store and bucketed for charts."""
+    m = _catalog.get_catalog().resolve(name)
+    if m is None:
+        raise HTTPException(status_code=404, detail="No catalog product matches that name")
+    skus = [o.sku for o in m.offers if not store or o.store == store.upper()]
+    try:
+        points = _price_history.history(session.connection(), skus, start=start, end=end, bucket=bucket)
+    except Exception:
+        session.rollback()
+        points = []
+    return {"product": m.product, "bucket": bucket, "points": points}
+
+@router.get("/groceries/optimize")
+def optimize_basket(
+    *,
+    session: Session = Depends(rls_session),
+    user: User = Depends(auth_user),
+    visit_penalty: Optional[float] = Query(None, ge=0, description="Cost per store visited; defaults to BASKET_VISIT_PENALTY"),
+    max_stores: Optional[int] = Query(None, ge=1),
+):
+    """Split the open grocery list across stores to minimize item cost plus a
+    per-visit penalty, and compare with buying everything at one store."""
+    penalty = settings.BASKET_VISIT_PENALTY if visit_penalty is None else float(visit_penalty)
+    with _rls(session, user.id):
+        rows = session.exec(text("""
+            SELECT id, name, quantity
+            FROM grocery_items
+            WHERE user_id=:uid AND purchased=false
+            ORDER BY id
+        """).bindparams(uid=user.id)).mappings().all()
+
+    matches = _catalog.get_catalog().resolve_many(r["name"] for r in rows)
+    maps: List[Dict[str, float]] = []
+    for r in rows:
+        m = matches.get(r["name"])
+        maps.append(m.price_map() if m is not None else _PRICE_BOOK.get(_normalize_name(r["name"]), _DEFAULT_PRICE))
+    stores = sorted({s for pm in maps for s in pm})
+    qtys = [max(1.0, float(r.get("quantity") or 1.0)) for r in rows]
+    costs = [[(round(pm[s] * q, 2) if s in pm else None) for s in stores] for pm, q in zip(maps, qtys)]
+
+    res = _basket.optimize(costs, stores, visit_penalty=penalty,
+                           exact_max_stores=settings.BASKET_EXACT_MAX_STORES, max_stores=max_stores)
+
+    split: Dict[str, Dict[str, Any]] = {s: {"items": [], "subtotal": 0.0} for s in res["stores"]}
+    items: List[Dict[str, Any]] = []
+    for r, pm, q, store in zip(rows, maps, qtys, res["assignment"]):
+        line = {"id": r["id"], "name": r["name"], "store": store,
+                "unit_price": pm.get(store) if store else None,
+                "total_price": round(pm[store] * q, 2) if store else None}
+        items.append(line)
+        if store:
+            split[store]["items"].append(r["id"])
+            split[store]["subtotal"] = round(split[store]["subtotal"] + line["total_price"], 2)
+
+    best = res["single_store"]["best"]
+    single_total = round(res["single_store"]["by_store"][best] + penalty, 2) if best else None
+    # A partial plan's total leaves these out, so it is not comparable with a full single-store basket
+    uncovered = [{"id": rows[i]["id"], "name": rows[i]["name"]} for i in res["uncovered"]]
+    return {
+        "stores": res["stores"],
+        "split": split,
+        "items": items,
+        "item_cost": res["item_cost"],
+        "visit_cost": res["visit_cost"],
+        "total": res["total"],
+        "visit_penalty": penalty,
+        "uncovered": uncovered,
+        "complete": not uncovered,
+        "single_store": {"store": best, "total": single_total, "item_cost_by_store": res["single_store"]["by_store"]},
+        "savings": round(single_total - res["total"], 2) if single_total is not None and not uncovered else None,
+        "method": res["method"],
+    }
 
 def _persist_prices_fallback(user_id: int, items: List[Dict[str, Any]]) -> Dict[str, Any]:
     path = Path(f"data/prices/user-{user_id}.json")
@@ -1388,6 +1912,52 @@ def _persist_prices_fallback(user_id: int, items: List[Dict[str, Any]]) -> Dict[
         json.dump({"items": items, "saved_at": datetime.utcnow().isoformat()}, f, ensure_ascii=False, indent=2)
     return {"backend": "file", "path": str(path)}
 
+def _assign_prices(session: Session, user_id: int, items: List[Dict[str, Any]]) -> tuple[int, Dict[str, Any]]:
+    """Write suggested store/prices onto grocery rows (file fallback if the columns are missing)."""
+    meta: Dict[str, Any] = {"backend": "db"}
+    updated = 0
+    try:
+        cols = _table_cols(session, "grocery_items")
+        if "updated_at" in cols:
+            for stub in items:
+                upd = text("""
+                    UPDATE grocery_items
+                    SET store=:s, unit_price=:u, total_price=:t, updated_at=CURRENT_TIMESTAMP
+                    WHERE id=:id AND user_id=:uid
+                """).bindparams(
+                    s=stub["suggested_store"],
+                    u=float(stub["unit_price"]),
+                    t=float(stub["total_price"]),
+                    id=stub["id"],
+                    uid=user_id,
+                )
+                session.exec(upd)
+                updated += 1
+        else:
+            for stub in items:
+                upd = text("""
+                    UPDATE grocery_items
+                    SET store=:s, unit_price=:u, total_price=:t
+                    WHERE id=:id AND user_id=:uid
+                """).bindparams(
+                    s=stub["suggested_store"],
+                    u=float(stub["unit_price"]),
+                    t=float(stub["total_price"]),
+                    id=stub["id"],
+                    uid=user_id,
+                )
+                session.exec(upd)
+                updated += 1
+        _versions.bump(session, user_id, _versions.GROCERIES)
+        session.commit()
+    except Exception:
+        # Columns missing: the failed UPDATE aborted the transaction
+        session.rollback()
+        _restore_rls(session, user_id)
+        meta = _persist_prices_fallback(user_id, items)
+        updated = len(items)
+    return updated, meta
+
 @router.post("/groceries/price_assign")
 def price_assign(
     *,
@@ -1397,42 +1967,91 @@ def price_assign(
     with _rls(session, user.id):
         prev = price_preview(session=session, user=user)
         items: List[Dict[str, Any]] = prev["items"]
-        meta: Dict[str, Any] = {"backend": "db"}
-        updated = 0
-        try:
+        updated, meta = _assign_prices(session, user.id, items)
+        # Assigning writes the preview's own prices, so it stays valid under the new version
+        # (the file fallback leaves the rows, and the version, unchanged)
+        if meta.get("backend") != "file":
+            _preview_cache.put((user.id, _versions.get(session, user.id, _versions.GROCERIES), _catalog.get_catalog().version), prev)
+        return {"updated": updated, "totals": prev["totals"], "grand_total": prev["grand_total"], "persist": meta}
+
+# ------------------------------------------------------------------------------
+# Onboarding: one call for rationalize + plan + workouts + groceries + prices
+# ------------------------------------------------------------------------------
+# Each build runs two builders, so two threads per concurrently admitted generate request
+_onboard_pool = ThreadPoolExecutor(
+    max_workers=max(2, settings.ONBOARD_WORKERS or 2 * settings.ADMISSION_GENERATE_CONCURRENCY),
+    thread_name_prefix="onboard",
+)
+
+class OnboardingBuildRequest(BaseModel):
+    days: int = 7
+    workout_days: Optional[int] = None  # defaults to `days`
+    include_recipes: bool = True
+    persist: bool = True
+
+@router.post("/onboarding/build")
+def onboarding_build(
+    req: OnboardingBuildRequest = Body(...),
+    *,
+    session: Session = Depends(rls_session),
+    user: User = Depends(auth_user),
+):
+    """Everything the post-intake screens need in one round trip.
+
+    Reads the intake once, builds the diet plan and workout sessions
+    concurrently (both may wait on the LLM), then syncs and prices groceries
+    straight from the in-memory plan instead of re-reading meals.
+    """
+    n_workout_days = req.workout_days or req.days
+    if req.days <= 0 or req.days > 31 or n_workout_days <= 0 or n_workout_days > 31:
+        raise HTTPException(status_code=400, detail="days must be 1..31")
+
+    start_dt = date.today()
+
+    with _rls(session, user.id):
+        intake = session.exec(select(Intake).where(Intake.user_id == user.id)).first()
+        rationalized = _rationalize(intake)
+        inputs = _plan_inputs_for(intake)
+        progress = _progression.targets(session, user.id)
+
+        # Builders are DB-free; run them before any commit so `intake` stays loaded.
+        # copy_context: the builders' LLM time is attributed to this request (Server-Timing)
+        plan_f = _onboard_pool.submit(contextvars.copy_context().run, _build_diet_plan, inputs, req.days, req.include_recipes, start_dt)
+        workouts_f = _onboard_pool.submit(contextvars.copy_context().run, _build_workout_days, intake, n_workout_days, start_dt)
+        plan_json = plan_f.result()
+        sessions = workouts_f.result()
+        _progression.apply_targets(sessions, progress)
+
+        name_counts, units = _grocery_lines(_plan_ingredient_counts(plan_json.get("days", [])))
+        prefer = _prefer_store_from_intake(intake)
+        made = 0
+        created = 0
+        if req.persist:
+            for day in plan_json.get("days", []):
+                _persist_day_meals(session, user.id, day)
+            made = _persist_workout_days(session, user.id, intake, sessions)
             cols = _table_cols(session, "grocery_items")
-            if "updated_at" in cols:
-                for stub in items:
-                    upd = text("""
-                        UPDATE grocery_items
-                        SET store=:s, unit_price=:u, total_price=:t, updated_at=CURRENT_TIMESTAMP
-                        WHERE id=:id AND user_id=:uid
-                    """).bindparams(
-                        s=stub["suggested_store"],
-                        u=float(stub["unit_price"]),
-                        t=float(stub["total_price"]),
-                        id=stub["id"],
-                        uid=user.id,
-                    )
-                    session.exec(upd)
-                    updated += 1
-            else:
-                for stub in items:
-                    upd = text("""
-                        UPDATE grocery_items
-                        SET store=:s, unit_price=:u, total_price=:t
-                        WHERE id=:id AND user_id=:uid
-                    """).bindparams(
-                        s=stub["suggested_store"],
-                        u=float(stub["unit_price"]),
-                        t=float(stub["total_price"]),
-                        id=stub["id"],
-                        uid=user.id,
-                    )
-                    session.exec(upd)
-                    updated += 1
+            _clear_open_groceries(session, user.id)
+            created = _upsert_grocery_counts(session, user.id, name_counts, cols, units)
             session.commit()
-        except Exception:
-            meta = _persist_prices_fallback(user.id, items)
-            updated = len(items)
-        return {"updated": updated, "totals": prev["totals"], "grand_total": prev["grand_total"], "persist": meta}
+            rows = session.exec(text("""
+                SELECT id, name, quantity
+                FROM grocery_items
+                WHERE user_id=:uid AND purchased=false
+                ORDER BY id
+            """).bindparams(uid=user.id)).mappings().all()
+            pricing = _price_rows(rows, prefer)
+            updated, meta = _assign_prices(session, user.id, pricing["items"])
+            pricing.update({"updated": updated, "persist": meta})
+        else:
+            rows = [{"id": None, "name": nm, "quantity": qty} for nm, qty in name_counts.items()]
+            pricing = _price_rows(rows, prefer)
+        _save_plan(user.id, plan_json)
+
+    return {
+        "rationalize": rationalized.model_dump(),
+        "plan": plan_json,
+        "workouts": {"created": made, "start": str(start_dt), "days": sessions},
+        "groceries": {"created": created, "count": len(name_counts)},
+        "pricing": pricing,
+    }
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core import events as _events
+from app.core.config import settings
+from app.core.db import engine
+from app.api.auth import get_current_user_session
+
+router = APIRouter()
+
+def _authenticate(request: Request) -> int:
+    # Short-lived session: a stream can stay open for hours and must not pin a pooled connection
+    with Session(engine) as s:
+        return int(get_current_user_session(request, s).id)
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.get("/events")
+async def user_events(request: Request):
+    """Server-sent events for the signed-in user's grocery, meal checklist and
+    exercise changes, from any device or worker. `resync` means events may
+    have been missed: refetch. Use EventSource; it reconnects on its own."""
+    if not settings.EVENTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Events are disabled")
+    user_id = await run_in_threadpool(_authenticate, request)
+    sub = _events.hub.subscribe(user_id)
+    queue = sub[1]
+
+    async def stream():
+        try:
+            yield f"retry: {settings.EVENTS_RETRY_MS}\n\n" + _sse("ready", {"user_id": user_id})
+            while True:
+                try:
+                    ev: Dict[str, Any] = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(ev["kind"] or "message", ev["data"])
+        finally:
+            _events.hub.unsubscribe(user_id, sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
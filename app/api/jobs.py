@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+from app.core import jobs as _jobs
+from app.core.db import engine
+from app.models import User, Job
+from app.api.diet import (
+    auth_user, rls_session,
+    PlanGenerateRequest, WorkoutGenerateRequest,
+    generate_plan, generate_workouts,
+)
+
+router = APIRouter()
+
+# ------------------------------------------------------------------------------
+# Handlers: run the same code paths as the sync endpoints, on a worker thread.
+# Plans land in the plan store (data/plans/user-N/) exactly as /plans/generate.
+# ------------------------------------------------------------------------------
+def _load_user(session: Session, user_id: int) -> User:
+    u = session.get(User, user_id)
+    if not u:
+        raise RuntimeError(f"user {user_id} not found")
+    return u
+
+@_jobs.register("plan")
+def _run_plan_job(session: Session, user_id: int, payload: Dict[str, Any]) -> Any:
+    user = _load_user(session, user_id)
+    return generate_plan(req=PlanGenerateRequest(**payload), session=session, user=user)
+
+@_jobs.register("workouts")
+def _run_workouts_job(session: Session, user_id: int, payload: Dict[str, Any]) -> Any:
+    user = _load_user(session, user_id)
+    return generate_workouts(req=WorkoutGenerateRequest(**payload), session=session, user=user)
+
+# ------------------------------------------------------------------------------
+# Submit / poll / subscribe
+# ------------------------------------------------------------------------------
+def _submitted(job: Job) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "poll": f"/api/v1/jobs/{job.id}",
+        "events": f"/api/v1/jobs/{job.id}/events",
+    }
+
+@router.post("/jobs/plans", status_code=202)
+def submit_plan_job(
+    req: PlanGenerateRequest = Body(...),
+    *,
+    session: Session = Depends(rls_session),
+    user: User = Depends(auth_user),
+):
+    if req.days <= 0 or req.days > 31:
+        raise HTTPException(status_code=400, detail="days must be 1..31")
+    return _submitted(_jobs.submit(session, user.id, "plan", req.model_dump()))
+
+@router.post("/jobs/workouts", status_code=202)
+def submit_workouts_job(
+    req: WorkoutGenerateRequest = Body(...),
+    *,
+    session: Session = Depends(rls_session),
+    user: User = Depends(auth_user),
+):
+    if req.days <= 0 or req.days > 31:
+        raise HTTPException(status_code=400, detail="days must be 1..31")
+    return _submitted(_jobs.submit(session, user.id, "workouts", req.model_dump()))
+
+@router.get("/jobs")
+def list_jobs(
+    *,
+    session: Session = Depends(rls_session),
+    user: User = Depends(auth_user),
+    limit: int = Query(20, ge=1, le=100),
+):
+    q = select(Job).where(Job.user_id == user.id).order_by(Job.id.desc()).limit(limit)
+    return [_jobs.to_dict(j, include_result=False) for j in session.exec(q).all()]
+
+@router.get("/jobs/{job_id}")
+def get_job(
+    job_id: int,
+    *,
+    session: Session = Depends(rls_session),
+    user: User = Depends(auth_user),
+):
+    job = _jobs.get(session, job_id, user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _jobs.to_dict(job)
+
+def _job_snapshot(job_id: int, user_id: int) -> Dict[str, Any] | None:
+    with Session(engine) as s:
+        job = _jobs.get(s, job_id, user_id)
+        return _jobs.to_dict(job, include_result=job.status in _jobs.TERMINAL) if job else None
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: int,
+    user: User = Depends(auth_user),
+):
+    """Server-sent events: one `status` event per change, ending on done/failed."""
+    user_id = user.id
+    if await run_in_threadpool(_job_snapshot, job_id, user_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        last = None
+        idle = 0.0
+        while True:
+            snap = await run_in_threadpool(_job_snapshot, job_id, user_id)
+            if snap is None:
+                return
+            if snap["status"] != last:
+                last = snap["status"]
+                idle = 0.0
+                yield f"event: status\ndata: {json.dumps(snap, default=str)}\n\n"
+                if last in _jobs.TERMINAL:
+                    return
+            elif idle >= 15.0:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(0.5)
+            idle += 0.5
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
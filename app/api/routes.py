@@ -3,6 +3,8 @@ from pydantic import BaseModel
 from sqlmodel import select, Session
 
 from ..core.config import settings
+from ..core import llm as _llm
+from ..core import admission as _admission
 import os
 from ..core.db import get_session
 from ..models import Ping
@@ -17,6 +19,9 @@ def status():
         "version": settings.VERSION,
         "llm_enabled": settings.LLM_ENABLED,
         "llm_key_present": bool(os.getenv("OPENAI_API_KEY")),
+        "llm_metrics": _llm.metrics_snapshot(),
+        "llm_breaker": _llm.breaker_snapshot(),
+        "admission": _admission.snapshot(),
     }
 
 @router.get("/version")
@@ -0,0 +1,244 @@
+"""
+Admission control for expensive endpoints.
+
+Routes are assigned a cost class (``ROUTE_CLASSES``); everything else is
+cheap and passes straight through. Each class has a ``FairLimiter`` with a
+bounded number of in-flight requests, a bounded wait queue and a per-user cap
+on in-flight plus queued requests. Waiting happens on the event loop, so a
+queued generation holds no threadpool thread and cheap reads keep running.
+
+When a class is saturated (queue full, per-user cap reached, or the wait
+exceeds ``max_wait``) the request is shed with 429 and a ``Retry-After``
+estimated from the class's recent service times. Freed slots are handed to
+waiting users round-robin, so one user's repeated generations cannot take
+every slot.
+
+Limits are per process; with N gunicorn workers the totals are N times the
+configured values.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, Optional, Tuple
+import asyncio
+import json
+import math
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core import timing as _timing
+
+GENERATE = "generate"  # LLM calls plus bulk writes
+BULK = "bulk"          # full-history rebuilds and list syncs
+
+ROUTE_CLASSES: Dict[Tuple[str, str], str] = {
+    ("POST", "/api/v1/plans/generate"): GENERATE,
+    ("POST", "/api/v1/plans/generate/stream"): GENERATE,
+    ("POST", "/api/v1/workouts/generate"): GENERATE,
+    ("POST", "/api/v1/onboarding/build"): GENERATE,
+    ("POST", "/api/v1/workouts/analytics/rebuild"): BULK,
+    ("POST", "/api/v1/workouts/progression/rebuild"): BULK,
+    ("POST", "/api/v1/groceries/sync_from_meals"): BULK,
+}
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class FairLimiter:
+    def __init__(self, name: str, limit: int, queue: int, per_user: int, max_wait: float) -> None:
+        self.name = name
+        self.limit = max(1, int(limit))
+        self.queue = max(0, int(queue))
+        self.per_user = max(1, int(per_user))
+        self.max_wait = float(max_wait)
+        self.active = 0
+        self._held: Dict[Hashable, int] = {}
+        self._waiters: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+        self._avg_sec = 5.0
+        self.admitted = 0
+        self.shed = 0
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._waiters.values())
+
+    def retry_after(self) -> int:
+        # Time for the queue ahead to drain at the observed service time
+        est = self._avg_sec * (self.waiting + 1) / self.limit
+        return int(min(60, max(1, math.ceil(est))))
+
+    def _reject(self, reason: str) -> Rejected:
+        self.shed += 1
+        return Rejected(reason, self.retry_after())
+
+    async def acquire(self, user: Hashable) -> None:
+        if self._held.get(user, 0) >= self.per_user:
+            raise self._reject("per_user")
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._held[user] = self._held.get(user, 0) + 1
+            self.admitted += 1
+            return
+        if self.waiting >= self.queue:
+            raise self._reject("queue_full")
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user, deque()).append(fut)
+        self._held[user] = self._held.get(user, 0) + 1
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, timeout=self.max_wait)
+        except BaseException as exc:
+            if fut.done() and not fut.cancelled():
+                # Slot was handed over as we gave up: pass it on
+                self.release(user)
+            else:
+                self._drop_waiter(user, fut)
+                self._dec(user)
+            if isinstance(exc, asyncio.TimeoutError):
+                raise self._reject("timeout")
+            raise
+        finally:
+            _timing.add("queue", (time.perf_counter() - t0) * 1000.0)
+        self.admitted += 1
+
+    def release(self, user: Hashable, elapsed: Optional[float] = None) -> None:
+        if elapsed is not None:
+            self._avg_sec = 0.8 * self._avg_sec + 0.2 * elapsed
+        self._dec(user)
+        # Hand the slot to the next user in round-robin order
+        while self._waiters:
+            nxt, q = next(iter(self._waiters.items()))
+            fut = q.popleft()
+            if q:
+                self._waiters.move_to_end(nxt)
+            else:
+                del self._waiters[nxt]
+            if not fut.done():
+                fut.set_result(True)
+                return
+        self.active -= 1
+
+    def _drop_waiter(self, user: Hashable, fut: "asyncio.Future") -> None:
+        q = self._waiters.get(user)
+        if q is not None:
+            try:
+                q.remove(fut)
+            except ValueError:
+                pass
+            if not q:
+                del self._waiters[user]
+
+    def _dec(self, user: Hashable) -> None:
+        n = self._held.get(user, 0) - 1
+        if n > 0:
+            self._held[user] = n
+        else:
+            self._held.pop(user, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit, "queue": self.queue, "per_user": self.per_user,
+            "active": self.active, "waiting": self.waiting,
+            "admitted": self.admitted, "shed": self.shed,
+            "avg_sec": round(self._avg_sec, 2),
+        }
+
+
+def _user_key(scope: Scope) -> Hashable:
+    sess = scope.get("session")
+    uid = None
+    if sess is not None:
+        try:
+            uid = sess.get("user_id")
+        except Exception:
+            uid = None
+    if uid is not None:
+        return ("user", uid)
+    client = scope.get("client") or ("", 0)
+    return ("ip", client[0])
+
+
+class AdmissionMiddleware:
+    """Bound concurrency per cost class; shed with 429 + Retry-After.
+
+    Must run inside the session middleware (it keys fairness on the session's
+    user id) and inside CORS, so 429s carry CORS headers."""
+
+    def __init__(self, app: ASGIApp, *, limiters: Dict[str, FairLimiter], routes: Optional[Dict[Tuple[str, str], str]] = None) -> None:
+        self.app = app
+        self.limiters = limiters
+        self.routes = ROUTE_CLASSES if routes is None else routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = None
+        if scope["type"] == "http":
+            cls = self.routes.get((scope["method"], scope["path"]))
+            limiter = self.limiters.get(cls) if cls else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        user = _user_key(scope)
+        try:
+            await limiter.acquire(user)
+        except Rejected as rej:
+            await _too_many(send, limiter.name, rej)
+            return
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(user, time.perf_counter() - t0)
+
+
+async def _too_many(send: Send, name: str, rej: Rejected) -> None:
+    body = json.dumps({
+        "detail": "Server busy, retry later",
+        "reason": rej.reason,
+        "class": name,
+        "retry_after": rej.retry_after,
+    }).encode("utf-8")
+    start: Message = {
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(rej.retry_after).encode("latin-1")),
+        ],
+    }
+    await send(start)
+    await send({"type": "http.response.body", "body": body})
+
+
+limiters: Dict[str, FairLimiter] = {}
+
+
+def configure() -> Dict[str, FairLimiter]:
+    limiters.clear()
+    limiters[GENERATE] = FairLimiter(
+        GENERATE,
+        settings.ADMISSION_GENERATE_CONCURRENCY,
+        settings.ADMISSION_GENERATE_QUEUE,
+        settings.ADMISSION_PER_USER,
+        settings.ADMISSION_MAX_WAIT_SEC,
+    )
+    limiters[BULK] = FairLimiter(
+        BULK,
+        settings.ADMISSION_BULK_CONCURRENCY,
+        settings.ADMISSION_BULK_QUEUE,
+        settings.ADMISSION_PER_USER,
+        settings.ADMISSION_MAX_WAIT_SEC,
+    )
+    return limiters
+
+
+def snapshot() -> Dict[str, Any]:
+    return {name: lim.snapshot() for name, lim in limiters.items()}
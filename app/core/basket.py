@@ -0,0 +1,181 @@
+"""
+Multi-store basket optimizer.
+
+Chooses which stores to visit so that item cost plus a per-store visit
+penalty is minimal, then buys every item at its cheapest store among those
+visited. Prices form an items x stores matrix of line costs (``None`` where a
+store does not carry the item).
+
+For up to BASKET_EXACT_MAX_STORES stores every subset is scored exactly:
+each item's cheapest line within a subset is built for all 2^S subsets with
+one pass per item (``best[mask] = min(best[mask - lowbit], cost[lowbit])``),
+so the whole search is O(items x 2^S). Larger store counts use a greedy
+add/drop local search seeded from the cheapest single store.
+
+When no allowed subset carries every item (``max_stores`` too small, or an
+item no store stocks) the result is the cheapest subset covering the most
+items, and the items left out are listed in ``uncovered``.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+INF = float("inf")
+
+Matrix = List[List[Optional[float]]]
+
+
+def _subset_totals(costs: Matrix, n_stores: int) -> List[float]:
+    """Item cost of buying everything within each store subset (bitmask -> total)."""
+    size = 1 << n_stores
+    totals = [0.0] * size
+    totals[0] = INF
+    for row in costs:
+        best = [INF] * size
+        for mask in range(1, size):
+            low = mask & -mask
+            j = low.bit_length() - 1
+            c = row[j]
+            prev = best[mask ^ low]
+            best[mask] = prev if c is None or prev <= c else c
+            totals[mask] += best[mask]
+    return totals
+
+
+def _score(costs: Matrix, chosen: Sequence[int]) -> float:
+    total = 0.0
+    for row in costs:
+        cands = [row[j] for j in chosen if row[j] is not None]
+        if not cands:
+            return INF
+        total += min(cands)
+    return total
+
+
+def _partial(costs: Matrix, chosen: Sequence[int]) -> Tuple[int, float]:
+    """(items not carried by ``chosen``, cost of the rest) - compared as a tuple."""
+    missing, total = 0, 0.0
+    for row in costs:
+        cands = [row[j] for j in chosen if row[j] is not None]
+        if cands:
+            total += min(cands)
+        else:
+            missing += 1
+    return missing, total
+
+
+def _best_partial(costs: Matrix, n_stores: int, limit: int, penalty: float) -> List[int]:
+    """Exact fallback: among subsets of at most ``limit`` stores, most items covered, then cheapest."""
+    carried = [sum(1 << j for j, c in enumerate(row) if c is not None) for row in costs]
+    best_key: Tuple[int, float] = (len(costs) + 1, INF)
+    best: List[int] = []
+    for mask in range(1, 1 << n_stores):
+        k = bin(mask).count("1")
+        if k > limit:
+            continue
+        missing = sum(1 for c in carried if not c & mask)
+        if missing > best_key[0]:
+            continue
+        sel = [j for j in range(n_stores) if mask >> j & 1]
+        _, cost = _partial(costs, sel)
+        key = (missing, cost + penalty * k)
+        if key < best_key:
+            best_key, best = key, sel
+    return best
+
+
+def _greedy(costs: Matrix, n_stores: int, penalty: float) -> Tuple[List[int], float]:
+    def obj(sel: List[int]) -> float:
+        return _score(costs, sel) + penalty * len(sel) if sel else INF
+
+    # seed: the best single store, or every store if none carries the whole list
+    singles = [(obj([j]), j) for j in range(n_stores)]
+    best_obj, j0 = min(singles) if singles else (INF, -1)
+    chosen = [j0] if best_obj < INF else list(range(n_stores))
+    cur = obj(chosen)
+    improved = True
+    while improved:
+        improved = False
+        moves = [chosen + [j] for j in range(n_stores) if j not in chosen]
+        moves += [[k for k in chosen if k != j] for j in chosen if len(chosen) > 1]
+        for sel in moves:
+            v = obj(sel)
+            if v < cur - 1e-9:
+                chosen, cur, improved = sel, v, True
+                break
+    return sorted(chosen), cur
+
+
+def optimize(
+    costs: Matrix,
+    stores: Sequence[str],
+    *,
+    visit_penalty: float,
+    exact_max_stores: int = 12,
+    max_stores: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Pick stores for ``costs`` (rows = items, columns = ``stores``).
+
+    Returns chosen store names, per-item store assignment (None if no chosen
+    store carries it), the indexes of those unassigned items (``uncovered``;
+    costs cover the assigned items only), item/visit/total cost, the best
+    single-store option, and the method used.
+    """
+    n = len(stores)
+    single: Dict[str, Optional[float]] = {}
+    for j, s in enumerate(stores):
+        col = [row[j] for row in costs]
+        single[s] = None if any(c is None for c in col) else round(sum(col), 2)  # type: ignore[arg-type]
+    feasible = {s: v for s, v in single.items() if v is not None}
+    best_single = min(feasible, key=feasible.get) if feasible else None  # type: ignore[arg-type]
+
+    if not costs or n == 0:
+        return {"stores": [], "assignment": [None] * len(costs), "item_cost": 0.0, "visit_cost": 0.0,
+                "total": 0.0, "uncovered": list(range(len(costs))), "single_store": {"best": best_single, "by_store": single}, "method": "empty"}
+
+    limit = max(1, min(n, max_stores or n))
+    if n <= exact_max_stores:
+        totals = _subset_totals(costs, n)
+        best_mask, best_obj = 0, INF
+        for mask in range(1, 1 << n):
+            k = bin(mask).count("1")
+            if k > limit:
+                continue
+            v = totals[mask] + visit_penalty * k
+            if v < best_obj:
+                best_mask, best_obj = mask, v
+        if best_obj < INF:
+            chosen = [j for j in range(n) if best_mask >> j & 1]
+        else:
+            chosen = _best_partial(costs, n, limit, visit_penalty)
+        method = "exact"
+    else:
+        chosen, best_obj = _greedy(costs, n, visit_penalty)
+        while len(chosen) > limit:
+            # drop the store whose removal hurts least (fewest items lost, then cost)
+            chosen = min(([k for k in chosen if k != j] for j in chosen), key=lambda sel: _partial(costs, sel))
+        method = "greedy"
+
+    assignment: List[Optional[int]] = []
+    uncovered: List[int] = []
+    item_cost = 0.0
+    for i, row in enumerate(costs):
+        cands = [(row[j], j) for j in chosen if row[j] is not None]
+        if cands:
+            c, j = min(cands)
+            assignment.append(j)
+            item_cost += c  # type: ignore[operator]
+        else:
+            assignment.append(None)
+            uncovered.append(i)
+    visit_cost = visit_penalty * len(chosen)
+    return {
+        "stores": [stores[j] for j in chosen],
+        "assignment": [stores[j] if j is not None else None for j in assignment],
+        "item_cost": round(item_cost, 2),
+        "visit_cost": round(visit_cost, 2),
+        "total": round(item_cost + visit_cost, 2),
+        "uncovered": uncovered,
+        "single_store": {"best": best_single, "by_store": single},
+        "method": method,
+    }
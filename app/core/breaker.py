@@ -0,0 +1,117 @@
+"""
+Circuit breaker for upstream calls (used around the LLM in app/core/llm.py).
+
+Keeps a rolling window of recent call outcomes. The breaker opens when, with
+at least ``min_calls`` in the window, the error rate or the slow-call rate
+crosses its threshold; while open, ``allow()`` returns False so callers skip
+the upstream and use their fallback. After ``cooldown_sec`` one probe call is
+let through (half-open): success closes the breaker, failure re-opens it.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        *,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        slow_ms: float = 20000.0,
+        slow_rate: float = 0.8,
+        cooldown_sec: float = 30.0,
+    ) -> None:
+        self.window = max(1, int(window))
+        self.min_calls = max(1, int(min_calls))
+        self.error_rate = float(error_rate)
+        self.slow_ms = float(slow_ms)
+        self.slow_rate = float(slow_rate)
+        self.cooldown_sec = float(cooldown_sec)
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=self.window)  # (ok, slow)
+        self._state = CLOSED
+        self._opened_at: Optional[float] = None
+        self._probe_inflight = False
+        self._opens = 0
+        self._rejected = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - (self._opened_at or 0.0) < self.cooldown_sec:
+                    self._rejected += 1
+                    return False
+                self._state = HALF_OPEN
+                self._probe_inflight = False
+            # half-open: a single probe at a time
+            if self._probe_inflight:
+                self._rejected += 1
+                return False
+            self._probe_inflight = True
+            return True
+
+    def cancel_probe(self) -> None:
+        """Hand back a half-open probe that never reached the upstream, or was
+        abandoned by its caller before the outcome was known."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_inflight = False
+
+    def record(self, ok: bool, ms: float) -> None:
+        slow = ms >= self.slow_ms
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_inflight = False
+                if ok and not slow:
+                    self._state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._trip()
+                return
+            self._calls.append((ok, slow))
+            if self._state == CLOSED and len(self._calls) >= self.min_calls:
+                n = len(self._calls)
+                errs = sum(1 for c in self._calls if not c[0])
+                slows = sum(1 for c in self._calls if c[1])
+                if errs / n >= self.error_rate or slows / n >= self.slow_rate:
+                    self._trip()
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._opens += 1
+        self._calls.clear()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            n = len(self._calls)
+            errs = sum(1 for c in self._calls if not c[0])
+            slows = sum(1 for c in self._calls if c[1])
+            retry_in = None
+            if self._state == OPEN and self._opened_at is not None:
+                retry_in = max(0.0, round(self.cooldown_sec - (time.monotonic() - self._opened_at), 1))
+            return {
+                "state": self._state,
+                "window_calls": n,
+                "error_rate": round(errs / n, 3) if n else 0.0,
+                "slow_rate": round(slows / n, 3) if n else 0.0,
+                "opens": self._opens,
+                "rejected": self._rejected,
+                "retry_in_sec": retry_in,
+            }
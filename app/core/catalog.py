@@ -0,0 +1,210 @@
+"""
+Grocery price catalog with fuzzy ingredient matching.
+
+Loaded once per process from PRICE_CATALOG_PATH, a CSV with columns
+``sku,store,name,size,unit,price`` (one row per SKU per store; the bundled
+app/data/price_catalog.csv is a small seed, production catalogs have tens of
+thousands of rows). Rows are grouped into products by normalized name, and
+each product keeps its cheapest SKU per store.
+
+Matching an ingredient string ("6 oz chicken breast", "broccoli florets"):
+  1. strip leading quantity/unit words and normalize
+  2. exact product-name hit, else
+  3. candidates from an inverted token index, rarest tokens first (falling
+     back to the trigram index when no token is shared), ranked by trigram
+     Jaccard similarity with a bonus when every product token is in the query
+Resolved names are memoized in an LRU (PRICE_MATCH_CACHE_SIZE), so a list is
+priced with ``resolve_many`` in one pass and repeat names cost a dict hit.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import csv
+import hashlib
+import logging
+import re
+import threading
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+_UNIT_WORDS = {
+    "oz", "ounce", "ounces", "lb", "lbs", "pound", "pounds", "g", "gram", "grams", "kg",
+    "cup", "cups", "tbsp", "tablespoon", "tablespoons", "tsp", "teaspoon", "teaspoons",
+    "each", "ea", "ct", "count", "slice", "slices", "clove", "cloves", "can", "cans",
+    "ml", "l", "fl", "pinch", "dash", "large", "medium", "small",
+}
+_STOP = {"and", "or", "of", "the", "a", "fresh", "cooked", "raw", "chopped", "sliced", "diced", "to", "taste"}
+_SYNONYMS = {"veg": "vegetable", "veggie": "vegetable", "veggies": "vegetable", "vegetables": "vegetable"}
+# Tokens shared by more products than this are only used when nothing rarer matched
+_MAX_POSTINGS = 2000
+_QTY = re.compile(r"^\s*(\d+(?:[./]\d+)?|\d+\s+\d/\d)\s*")
+
+
+def normalize(s: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9\s]", " ", (s or "").lower())).strip()
+
+
+def strip_quantity(name: str) -> str:
+    """'6 oz chicken breast' -> 'chicken breast'; leaves bare names alone."""
+    s = _QTY.sub("", name or "")
+    words = normalize(s).split()
+    while words and words[0] in _UNIT_WORDS:
+        words.pop(0)
+    return " ".join(words)
+
+
+def _tokens(s: str) -> Set[str]:
+    out = set()
+    for w in s.split():
+        if w in _STOP or w in _UNIT_WORDS:
+            continue
+        w = _SYNONYMS.get(w, w)
+        out.add(w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w)
+    return out
+
+
+def _trigrams(s: str) -> Set[str]:
+    p = f"  {s} "
+    return {p[i:i + 3] for i in range(len(p) - 2)}
+
+
+@dataclass(frozen=True)
+class Offer:
+    sku: str
+    store: str
+    price: float
+    size: float
+    unit: str
+
+
+@dataclass(frozen=True)
+class Match:
+    product: str
+    score: float
+    offers: Tuple[Offer, ...]
+
+    def price_map(self) -> Dict[str, float]:
+        return {o.store: o.price for o in self.offers}
+
+
+class PriceCatalog:
+    def __init__(self, rows: Iterable[Dict[str, str]], version: str = "empty") -> None:
+        best: Dict[str, Dict[str, Offer]] = defaultdict(dict)
+        for r in rows:
+            try:
+                name = normalize(r["name"])
+                offer = Offer(
+                    sku=str(r["sku"]),
+                    store=str(r["store"]).strip().upper(),
+                    price=float(r["price"]),
+                    size=float(r.get("size") or 1),
+                    unit=normalize(r.get("unit") or "each") or "each",
+                )
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not name:
+                continue
+            cur = best[name].get(offer.store)
+            if cur is None or offer.price < cur.price:
+                best[name][offer.store] = offer
+
+        self.version = version
+        self.products: List[str] = sorted(best)
+        self.offers: List[Tuple[Offer, ...]] = [tuple(sorted(best[p].values(), key=lambda o: o.store)) for p in self.products]
+        self.stores: Tuple[str, ...] = tuple(sorted({o.store for offs in self.offers for o in offs}))
+        self._by_name: Dict[str, int] = {p: i for i, p in enumerate(self.products)}
+        self._ptokens: List[Set[str]] = [_tokens(p) for p in self.products]
+        self._ptri: List[Set[str]] = [_trigrams(p) for p in self.products]
+        self._token_index: Dict[str, List[int]] = defaultdict(list)
+        self._tri_index: Dict[str, List[int]] = defaultdict(list)
+        for i in range(len(self.products)):
+            for t in self._ptokens[i]:
+                self._token_index[t].append(i)
+            for g in self._ptri[i]:
+                self._tri_index[g].append(i)
+        self._resolve = lru_cache(maxsize=max(1, settings.PRICE_MATCH_CACHE_SIZE))(self._match)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def _match(self, query: str) -> Optional[Match]:
+        if not query:
+            return None
+        i = self._by_name.get(query)
+        if i is not None:
+            return Match(self.products[i], 1.0, self.offers[i])
+
+        qtok = _tokens(query)
+        qtri = _trigrams(query)
+        cands: Set[int] = set()
+        # rarest tokens first; very common ones ("organic", "chicken") only if nothing else hit
+        for postings in sorted((self._token_index.get(t, ()) for t in qtok), key=len):
+            if cands and len(postings) > _MAX_POSTINGS:
+                break
+            cands.update(postings)
+        if not cands:
+            for g in qtri:
+                cands.update(self._tri_index.get(g, ()))
+
+        best_i, best_score = -1, 0.0
+        for i in cands:
+            ptri = self._ptri[i]
+            inter = len(qtri & ptri)
+            score = inter / (len(qtri) + len(ptri) - inter)
+            if self._ptokens[i] and self._ptokens[i] <= qtok:
+                score += 0.25
+            if score > best_score or (score == best_score and len(self.products[i]) < len(self.products[best_i])):
+                best_i, best_score = i, score
+        if best_i < 0 or best_score < settings.PRICE_MATCH_MIN_SCORE:
+            return None
+        return Match(self.products[best_i], round(min(1.0, best_score), 3), self.offers[best_i])
+
+    def resolve(self, name: str) -> Optional[Match]:
+        return self._resolve(strip_quantity(name))
+
+    def resolve_many(self, names: Iterable[str]) -> Dict[str, Optional[Match]]:
+        """Resolve a whole list; duplicates and previously seen names hit the LRU."""
+        return {n: self.resolve(n) for n in dict.fromkeys(names)}
+
+    def cache_info(self) -> Dict[str, int]:
+        ci = self._resolve.cache_info()
+        return {"hits": ci.hits, "misses": ci.misses, "size": ci.currsize, "maxsize": ci.maxsize or 0}
+
+
+def _load(path: Path) -> PriceCatalog:
+    try:
+        raw = path.read_bytes()
+    except OSError:
+        log.warning("price catalog %s not found; using built-in prices", path)
+        return PriceCatalog([])
+    version = hashlib.sha256(raw).hexdigest()[:16]
+    rows = csv.DictReader(raw.decode("utf-8").splitlines())
+    cat = PriceCatalog(rows, version=version)
+    log.info("price catalog: %d products, %d stores from %s (version %s)", len(cat), len(cat.stores), path, version)
+    return cat
+
+
+_lock = threading.Lock()
+_catalog: Optional[PriceCatalog] = None
+
+
+def get_catalog() -> PriceCatalog:
+    global _catalog
+    if _catalog is None:
+        with _lock:
+            if _catalog is None:
+                _catalog = _load(Path(settings.PRICE_CATALOG_PATH))
+    return _catalog
+
+
+def reload() -> PriceCatalog:
+    global _catalog
+    with _lock:
+        _catalog = _load(Path(settings.PRICE_CATALOG_PATH))
+    return _catalog
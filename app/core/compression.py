@@ -0,0 +1,172 @@
+"""
+Streaming response compression (pure ASGI).
+
+Picks brotli when the client accepts it and a brotli module is installed
+(``brotli`` or ``brotlicffi``), else gzip. A response is compressed when:
+  - its media type is in the allowlist (JSON, text, JS/CSS, SVG; never
+    ``text/event-stream``, which must reach the client unbuffered),
+  - it is not already encoded and does not say ``no-transform``,
+  - it is at least ``minimum_size`` bytes, judged from Content-Length or the
+    first body chunk when the body arrives in one piece.
+
+Bodies are compressed chunk by chunk as the app sends them and flushed after
+each chunk, so a streamed response is never held in memory whole and the
+client sees data as soon as it is produced.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover
+    try:
+        import brotlicffi as brotli  # type: ignore
+    except Exception:
+        brotli = None  # type: ignore
+
+DEFAULT_TYPES = (
+    "application/json", "application/javascript", "application/xml", "application/manifest+json",
+    "text/html", "text/css", "text/plain", "text/javascript", "text/csv", "text/xml", "image/svg+xml",
+)
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """'br;q=1.0, gzip;q=0.8, *;q=0' -> {'br': 1.0, 'gzip': 0.8, '*': 0.0}"""
+    out: Dict[str, float] = {}
+    for part in (header or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[name.strip()] = q
+    return out
+
+
+def choose_encoding(header: str, *, allow_br: bool = True) -> Optional[str]:
+    acc = accepted_encodings(header)
+    star = acc.get("*", 0.0)
+    for enc in (("br", "gzip") if allow_br and brotli is not None else ("gzip",)):
+        if acc.get(enc, star) > 0:
+            return enc
+    return None
+
+
+class _Encoder:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int) -> None:
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.finish()
+        return self._gz.compress(data) + self._gz.flush()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        types: Iterable[str] = DEFAULT_TYPES,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        brotli_enabled: bool = True,
+    ) -> None:
+        self.app = app
+        self.minimum_size = max(0, int(minimum_size))
+        self.types = frozenset(t.strip().lower() for t in types if t.strip())
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli_enabled = brotli_enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        enc = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), allow_br=self.brotli_enabled)
+        if enc is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _Responder(self, enc, send).send)
+
+    def compressible(self, status: int, headers: Headers) -> bool:
+        if status < 200 or status in (204, 304):
+            return False
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", "").lower():
+            return False
+        ctype = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        if ctype not in self.types:
+            return False
+        length = headers.get("content-length")
+        return not (length is not None and length.isdigit() and int(length) < self.minimum_size)
+
+
+class _Responder:
+    def __init__(self, mw: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.mw = mw
+        self.encoding = encoding
+        self._send = send
+        self.start: Optional[Message] = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            headers = Headers(raw=message.get("headers", []))
+            if not self.mw.compressible(message["status"], headers):
+                self.passthrough = True
+                await self._send(message)
+                return
+            self.start = message  # decided on the first body chunk
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.encoder is None:
+            assert self.start is not None
+            if not more and len(body) < self.mw.minimum_size:
+                self.passthrough = True
+                MutableHeaders(raw=self.start.setdefault("headers", [])).add_vary_header("Accept-Encoding")
+                await self._send(self.start)
+                await self._send(message)
+                return
+            self.encoder = _Encoder(self.encoding, self.mw.gzip_level, self.mw.brotli_quality)
+            headers = MutableHeaders(raw=self.start.setdefault("headers", []))
+            del headers["content-length"]
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["etag"] = "W/" + etag
+            await self._send(self.start)
+
+        if more:
+            data = self.encoder.chunk(body) if body else b""
+            if data:
+                await self._send({"type": "http.response.body", "body": data, "more_body": True})
+            return
+        await self._send({"type": "http.response.body", "body": self.encoder.finish(body), "more_body": False})
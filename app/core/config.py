@@ -25,10 +25,96 @@ class Settings:
     # Frontend redirect target
     UI_BASE: str | None = os.getenv("UI_BASE") or None
     UI_PORT: int = int(os.getenv("UI_PORT", "8080"))
+    # Built UI bundle (ui/dist) served by the API itself; empty = UI runs elsewhere
+    UI_DIST_DIR: str = os.getenv("UI_DIST_DIR", "")
+
+    # Response compression: brotli (if installed) or gzip for allowlisted types
+    # at or above COMPRESSION_MIN_SIZE bytes
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "1") == "1"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI: bool = os.getenv("COMPRESSION_BROTLI", "1") == "1"
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
 
     # LLM toggle (OpenAI) — enabled by default; falls back safely if no API key
     LLM_ENABLED: bool = os.getenv("LLM_ENABLED", "1") == "1"
     LLM_PROVIDER: str | None = os.getenv("LLM_PROVIDER") or "openai"
     OPENAI_API_KEY: str | None = os.getenv("OPENAI_API_KEY") or None
+    # Upstream call limits: per-call deadline, pooled connections, and a cap on
+    # concurrent calls per process (excess calls wait up to LLM_QUEUE_TIMEOUT_SEC,
+    # then fall back to the deterministic planners)
+    LLM_TIMEOUT_SEC: float = float(os.getenv("LLM_TIMEOUT_SEC", "30"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+    LLM_QUEUE_TIMEOUT_SEC: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SEC", "5"))
+    LLM_POOL_CONNECTIONS: int = int(os.getenv("LLM_POOL_CONNECTIONS", "10"))
+    # Circuit breaker: skip the upstream while recent calls mostly fail or are slow
+    LLM_BREAKER_WINDOW: int = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+    LLM_BREAKER_MIN_CALLS: int = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+    LLM_BREAKER_ERROR_RATE: float = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+    LLM_BREAKER_SLOW_MS: float = float(os.getenv("LLM_BREAKER_SLOW_MS", "20000"))
+    LLM_BREAKER_SLOW_RATE: float = float(os.getenv("LLM_BREAKER_SLOW_RATE", "0.8"))
+    LLM_BREAKER_COOLDOWN_SEC: float = float(os.getenv("LLM_BREAKER_COOLDOWN_SEC", "30"))
+    # Hedging: return the deterministic plan if the LLM misses this budget (0 = off);
+    # the LLM call keeps running in the background and still fills the cache
+    LLM_HEDGE_BUDGET_MS: int = int(os.getenv("LLM_HEDGE_BUDGET_MS", "0"))
+    # Long diet plans are split into chunks of this many days, generated
+    # concurrently and merged (0 = always one request)
+    LLM_CHUNK_DAYS: int = int(os.getenv("LLM_CHUNK_DAYS", "7"))
+    # Response cache for identical prompts (Postgres llm_cache table)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+    LLM_CACHE_TTL_SEC: int = int(os.getenv("LLM_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+    # Fake LLM stand-in for tests/load runs: canned JSON, no network
+    LLM_FAKE: bool = os.getenv("LLM_FAKE", "0") == "1"
+    LLM_FAKE_LATENCY_MS: int = int(os.getenv("LLM_FAKE_LATENCY_MS", "0"))
+
+    # Background jobs (plan/workout generation off the request path)
+    JOBS_ENABLED: bool = os.getenv("JOBS_ENABLED", "1") == "1"
+    JOBS_WORKERS: int = int(os.getenv("JOBS_WORKERS", "2"))
+    JOBS_PER_USER: int = int(os.getenv("JOBS_PER_USER", "1"))
+    JOBS_POLL_SEC: float = float(os.getenv("JOBS_POLL_SEC", "1.0"))
+    JOBS_STALE_SEC: int = int(os.getenv("JOBS_STALE_SEC", "600"))
+
+    # Grocery price catalog (CSV: sku,store,name,size,unit,price) and fuzzy-match tuning
+    PRICE_CATALOG_PATH: str = os.getenv(
+        "PRICE_CATALOG_PATH",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "price_catalog.csv"),
+    )
+    PRICE_MATCH_CACHE_SIZE: int = int(os.getenv("PRICE_MATCH_CACHE_SIZE", "4096"))
+    PRICE_MATCH_MIN_SCORE: float = float(os.getenv("PRICE_MATCH_MIN_SCORE", "0.45"))
+    # Append catalog prices to the price history tables at startup
+    PRICE_HISTORY_ENABLED: bool = os.getenv("PRICE_HISTORY_ENABLED", "1") == "1"
+    # Price previews cached per (user, grocery list version, catalog version)
+    PRICE_PREVIEW_CACHE_SIZE: int = int(os.getenv("PRICE_PREVIEW_CACHE_SIZE", "1024"))
+    # Basket optimizer: cost (in dollars) charged per store visited, and the
+    # store count up to which every store combination is searched exactly
+    BASKET_VISIT_PENALTY: float = float(os.getenv("BASKET_VISIT_PENALTY", "5.0"))
+    BASKET_EXACT_MAX_STORES: int = int(os.getenv("BASKET_EXACT_MAX_STORES", "12"))
+
+    # POST /batch: max sub-requests per call
+    BATCH_MAX_REQUESTS: int = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    # Server-Timing header on every response; JSON log line ("app.timing") for requests at least this slow
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "1") == "1"
+    TIMING_LOG_MIN_MS: float = float(os.getenv("TIMING_LOG_MIN_MS", "500"))
+    # Admission control for expensive routes (per process; app.core.admission)
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "1") == "1"
+    ADMISSION_GENERATE_CONCURRENCY: int = int(os.getenv("ADMISSION_GENERATE_CONCURRENCY", "2"))
+    ADMISSION_GENERATE_QUEUE: int = int(os.getenv("ADMISSION_GENERATE_QUEUE", "8"))
+    ADMISSION_BULK_CONCURRENCY: int = int(os.getenv("ADMISSION_BULK_CONCURRENCY", "4"))
+    ADMISSION_BULK_QUEUE: int = int(os.getenv("ADMISSION_BULK_QUEUE", "16"))
+    ADMISSION_PER_USER: int = int(os.getenv("ADMISSION_PER_USER", "1"))
+    ADMISSION_MAX_WAIT_SEC: float = float(os.getenv("ADMISSION_MAX_WAIT_SEC", "20"))
+    # Threads for /onboarding/build's two concurrent builders; 0 = two per admitted generate request
+    ONBOARD_WORKERS: int = int(os.getenv("ONBOARD_WORKERS", "0"))
+    # GET /events: per-user change stream (LISTEN/NOTIFY fan-out across workers)
+    EVENTS_ENABLED: bool = os.getenv("EVENTS_ENABLED", "1") == "1"
+    EVENTS_QUEUE_SIZE: int = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+    EVENTS_KEEPALIVE_SEC: float = float(os.getenv("EVENTS_KEEPALIVE_SEC", "15"))
+    EVENTS_RETRY_MS: int = int(os.getenv("EVENTS_RETRY_MS", "3000"))
+    # GET /today: results cached per (user, day, meals/workouts/trackers versions, plan file)
+    TODAY_CACHE_SIZE: int = int(os.getenv("TODAY_CACHE_SIZE", "1024"))
+
+    # Idempotency keys for replayable writes (offline queues); stored responses expire after this
+    IDEMPOTENCY_TTL_SEC: int = int(os.getenv("IDEMPOTENCY_TTL_SEC", str(7 * 24 * 3600)))
 
 settings = Settings()
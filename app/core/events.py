@@ -0,0 +1,162 @@
+"""
+Per-user change events, fanned out across processes with Postgres LISTEN/NOTIFY.
+
+``publish`` issues ``pg_notify`` in the caller's transaction, so an event is
+delivered exactly when (and only if) the write commits. Every app process runs
+one listener thread on a dedicated connection (``LISTEN diet_events``) that
+hands each notification to the asyncio queues of that user's subscribers, so
+all gunicorn workers deliver every event to the clients connected to them.
+
+Notifications are not durable: a client that was disconnected, or a listener
+that had to reconnect, may have missed events. Subscribers get a ``resync``
+event in that case and should refetch what they show (conditional GETs make
+that cheap).
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import threading
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "diet_events"
+# Postgres caps a NOTIFY payload at 8000 bytes
+_MAX_PAYLOAD = 7900
+
+GROCERY = "grocery"
+MEAL_CHECK = "meal_check"
+EXERCISE = "exercise"
+RESYNC = "resync"
+
+
+def publish(session: Session, user_id: int, kind: str, data: Optional[Dict[str, Any]] = None) -> None:
+    """Queue an event for ``user_id``; sent by Postgres when the caller commits."""
+    payload = json.dumps({"u": user_id, "kind": kind, "data": data}, default=str, separators=(",", ":"))
+    if len(payload.encode("utf-8")) > _MAX_PAYLOAD:
+        payload = json.dumps({"u": user_id, "kind": kind, "data": None})
+    session.exec(text("SELECT pg_notify(:ch, :payload)").bindparams(ch=CHANNEL, payload=payload))
+
+
+Subscriber = Tuple[asyncio.AbstractEventLoop, "asyncio.Queue[Dict[str, Any]]"]
+
+
+class EventHub:
+    def __init__(self) -> None:
+        self._subs: Dict[int, Set[Subscriber]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="events-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        """Register the calling event loop for ``user_id``'s events."""
+        self.start()
+        sub: Subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE))
+        with self._lock:
+            self._subs.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, user_id: int, sub: Subscriber) -> None:
+        with self._lock:
+            subs = self._subs.get(user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[user_id]
+
+    def subscribers(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+    def dispatch(self, user_id: Optional[int], event: Dict[str, Any]) -> None:
+        """Deliver to one user's subscribers (all users when ``user_id`` is None)."""
+        with self._lock:
+            if user_id is None:
+                subs = [s for group in self._subs.values() for s in group]
+            else:
+                subs = list(self._subs.get(user_id, ()))
+        for loop, queue in subs:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                pass  # loop closed; the stream's finally unsubscribes it
+
+    def _loop(self) -> None:
+        import psycopg
+
+        conninfo = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        backoff = 1.0
+        first = True
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(conninfo, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    log.info("events listener connected")
+                    if not first:
+                        self.dispatch(None, {"kind": RESYNC, "data": None})
+                    first = False
+                    backoff = 1.0
+                    while not self._stop.is_set():
+                        for n in conn.notifies(timeout=1.0):
+                            self._handle(n.payload)
+            except Exception:
+                if self._stop.is_set():
+                    break
+                log.exception("events listener lost its connection; retrying in %.0fs", backoff)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _handle(self, payload: str) -> None:
+        try:
+            msg = json.loads(payload)
+            uid = int(msg["u"])
+        except Exception:
+            log.warning("events: dropping malformed payload")
+            return
+        self.dispatch(uid, {"kind": msg.get("kind"), "data": msg.get("data")})
+
+
+def _offer(queue: "asyncio.Queue[Dict[str, Any]]", event: Dict[str, Any]) -> None:
+    # A subscriber that fell this far behind gets one resync instead of a backlog
+    if queue.full():
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({"kind": RESYNC, "data": None})
+        return
+    queue.put_nowait(event)
+
+
+hub = EventHub()
+
+
+def start() -> None:
+    hub.start()
+
+
+def stop() -> None:
+    hub.stop()
@@ -0,0 +1,56 @@
+"""
+orjson-backed JSON responses.
+
+``FastJSONResponse`` is the app's default response class: datetimes and dates
+are encoded natively (ISO 8601, same strings ``jsonable_encoder`` produced),
+Decimals become floats and any pydantic/SQLModel object that slips through is
+dumped via ``model_dump``.
+
+FastAPI still runs ``jsonable_encoder`` over whatever a route returns, so hot
+list routes build their payload from query row tuples and return the response
+themselves (``rows_response``), skipping both the ORM objects and the encoder
+walk.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Iterable, List, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from app.core import timing as _timing
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    dump = getattr(obj, "model_dump", None)
+    if dump is not None:
+        return dump()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    with _timing.measure("serialize"):
+        return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows(keys: Sequence[str], result: Iterable[Sequence[Any]]) -> List[dict]:
+    """Row tuples -> list of dicts keyed by ``keys`` (no per-row model)."""
+    return [dict(zip(keys, r)) for r in result]
+
+
+def rows_response(keys: Sequence[str], result: Iterable[Sequence[Any]], **kw: Any) -> FastJSONResponse:
+    return FastJSONResponse(rows(keys, result), **kw)
@@ -0,0 +1,60 @@
+"""
+Idempotency keys for replayable writes (Postgres table ``idempotency_keys``).
+
+A client that queues writes offline sends the same ``Idempotency-Key`` on
+every retry. ``claim`` inserts the key inside the caller's transaction: the
+first request wins and later ones (including concurrent ones, which block on
+the unique key until the first commits) get the stored response back instead
+of re-applying the write. Reusing a key with a different body is a 409.
+Keys expire after IDEMPOTENCY_TTL_SEC.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import hashlib
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+
+
+def fingerprint(body: Any) -> str:
+    canon = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+
+def claim(session: Session, user_id: int, key: str, scope: str, body: Any) -> Optional[Dict[str, Any]]:
+    """Claim ``key`` for this request. Returns None if the caller should do the
+    work (then ``store`` the response before committing), else the earlier response."""
+    fp = fingerprint(body)
+    session.exec(
+        text("DELETE FROM idempotency_keys WHERE created_at < CURRENT_TIMESTAMP - make_interval(secs => :ttl)")
+        .bindparams(ttl=settings.IDEMPOTENCY_TTL_SEC)
+    )
+    got = session.exec(
+        text("""
+            INSERT INTO idempotency_keys (user_id, key, scope, fingerprint, created_at)
+            VALUES (:uid, :k, :scope, :fp, CURRENT_TIMESTAMP)
+            ON CONFLICT (user_id, key) DO NOTHING
+            RETURNING key
+        """).bindparams(uid=user_id, k=key, scope=scope, fp=fp)
+    ).first()
+    if got:
+        return None
+    row = session.exec(
+        text("SELECT scope, fingerprint, response FROM idempotency_keys WHERE user_id=:uid AND key=:k")
+        .bindparams(uid=user_id, k=key)
+    ).mappings().first()
+    if not row or row["scope"] != scope or row["fingerprint"] != fp:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different request")
+    return json.loads(row["response"]) if row["response"] else {}
+
+
+def store(session: Session, user_id: int, key: str, response: Any) -> None:
+    session.exec(
+        text("UPDATE idempotency_keys SET response=:r WHERE user_id=:uid AND key=:k")
+        .bindparams(r=json.dumps(response, default=str), uid=user_id, k=key)
+    )
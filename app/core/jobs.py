@@ -0,0 +1,209 @@
+"""
+Background jobs: a Postgres-backed queue drained by an in-process worker pool.
+
+Submitting a job inserts a row into ``jobs`` and returns immediately. Every
+app process runs a small pool of worker threads that claim queued rows with
+``FOR UPDATE SKIP LOCKED``, so several gunicorn workers can poll the same
+table without running a job twice. Handlers are registered per ``kind`` from
+the API layer (see app/api/jobs.py) and run with their own DB session.
+
+Concurrency is bounded by JOBS_WORKERS (threads per process) and
+JOBS_PER_USER (running jobs per user across all processes).
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import threading
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Job
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[Session, int, Dict[str, Any]], Any]
+
+_HANDLERS: Dict[str, Handler] = {}
+
+TERMINAL = ("done", "failed")
+
+
+def register(kind: str) -> Callable[[Handler], Handler]:
+    """Decorator: ``@register('plan')`` binds a handler(session, user_id, payload)."""
+    def deco(fn: Handler) -> Handler:
+        _HANDLERS[kind] = fn
+        return fn
+    return deco
+
+
+def submit(session: Session, user_id: int, kind: str, payload: Dict[str, Any]) -> Job:
+    if kind not in _HANDLERS:
+        raise ValueError(f"unknown job kind '{kind}'")
+    job = Job(user_id=user_id, kind=kind, status="queued", payload=json.dumps(payload))
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    runner.wake()
+    return job
+
+
+def get(session: Session, job_id: int, user_id: int) -> Optional[Job]:
+    job = session.get(Job, job_id)
+    if not job or job.user_id != user_id:
+        return None
+    return job
+
+
+def to_dict(job: Job, include_result: bool = True) -> Dict[str, Any]:
+    out: Dict[str, Any] = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "error": job.error,
+    }
+    if include_result:
+        try:
+            out["result"] = json.loads(job.result) if job.result else None
+        except Exception:
+            out["result"] = None
+    return out
+
+
+MAX_ATTEMPTS = 3
+
+# All job timestamps are naive UTC (created_at comes from datetime.utcnow()),
+# so SQL uses timezone('utc', now()) rather than the session-local CURRENT_TIMESTAMP.
+
+# Claim the oldest runnable job. A 'running' row whose worker died (older than
+# JOBS_STALE_SEC) is reclaimed; the per-user cap counts live running rows only.
+_CLAIM_SQL = text("""
+    UPDATE jobs SET status='running', started_at=timezone('utc', now()), attempts=attempts+1
+    WHERE id = (
+        SELECT j.id FROM jobs j
+        WHERE (
+            j.status = 'queued'
+            OR (j.status = 'running' AND j.started_at < timezone('utc', now()) - make_interval(secs => :stale))
+        )
+        AND j.attempts < :max_attempts
+        AND (
+            SELECT COUNT(*) FROM jobs r
+            WHERE r.user_id = j.user_id AND r.status = 'running' AND r.id <> j.id
+              AND r.started_at >= timezone('utc', now()) - make_interval(secs => :stale)
+        ) < :per_user
+        ORDER BY j.id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, user_id, kind, payload
+""")
+
+# A stale 'running' row that has used all its attempts is never reclaimed: fail it
+# so pollers and /jobs/{id}/events see a terminal state.
+_EXPIRE_SQL = text("""
+    UPDATE jobs
+    SET status='failed', finished_at=timezone('utc', now()),
+        error=COALESCE(error, 'worker lost on the final attempt')
+    WHERE status = 'running' AND attempts >= :max_attempts
+      AND started_at < timezone('utc', now()) - make_interval(secs => :stale)
+""")
+
+
+class JobRunner:
+    def __init__(self) -> None:
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def start(self, workers: Optional[int] = None) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        n = max(1, int(workers or settings.JOBS_WORKERS))
+        for i in range(n):
+            t = threading.Thread(target=self._loop, name=f"jobs-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        log.info("job runner started with %d worker(s)", n)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        with engine.begin() as conn:
+            conn.execute(_EXPIRE_SQL.bindparams(stale=settings.JOBS_STALE_SEC, max_attempts=MAX_ATTEMPTS))
+            row = conn.execute(
+                _CLAIM_SQL.bindparams(
+                    stale=settings.JOBS_STALE_SEC, max_attempts=MAX_ATTEMPTS, per_user=max(1, settings.JOBS_PER_USER),
+                )
+            ).mappings().first()
+            return dict(row) if row else None
+
+    def _finish(self, job_id: int, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with engine.begin() as conn:
+            conn.execute(
+                text("UPDATE jobs SET status=:s, result=:r, error=:e, finished_at=timezone('utc', now()) WHERE id=:id").bindparams(
+                    s=status,
+                    r=(json.dumps(result, default=str) if result is not None else None),
+                    e=error,
+                    id=job_id,
+                )
+            )
+
+    def run_one(self, job: Dict[str, Any]) -> None:
+        handler = _HANDLERS.get(job["kind"])
+        if handler is None:
+            self._finish(job["id"], "failed", error=f"no handler for '{job['kind']}'")
+            return
+        try:
+            payload = json.loads(job.get("payload") or "{}")
+            with Session(engine) as session:
+                result = handler(session, int(job["user_id"]), payload)
+            self._finish(job["id"], "done", result=result)
+        except Exception as exc:
+            log.exception("job %s (%s) failed", job["id"], job["kind"])
+            detail = getattr(exc, "detail", None) or str(exc) or exc.__class__.__name__
+            self._finish(job["id"], "failed", error=str(detail))
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception:
+                log.exception("job claim failed")
+                job = None
+            if job is None:
+                self._wake.wait(settings.JOBS_POLL_SEC)
+                self._wake.clear()
+                continue
+            self.run_one(job)
+
+
+runner = JobRunner()
+
+
+def start() -> None:
+    runner.start()
+
+
+def stop() -> None:
+    runner.stop()
@@ -1,23 +1,54 @@
 """
-LLM integration stub for generating workout plans.
+LLM-backed diet and workout plan generation.
 
-This module provides a generate_workout_plan function that can be wired to an
-LLM provider in the future. For now, it deterministically creates a structured
-weekly plan based on intake and preferences so the rest of the app can be
-developed and tested without external calls.
+``generate_workout_plan``, ``generate_diet_plan`` and ``stream_diet_plan`` call
+an OpenAI-compatible chat API in JSON mode and return sanitized plans, or
+None / nothing when the LLM is unavailable, so callers fall back to the
+deterministic planners (``_fallback_plan`` for workouts).
+
+Around every upstream call:
+  - one pooled client per process with a per-call deadline and a bounded
+    number of concurrent calls (``LLMBusy`` when no slot frees up in time)
+  - a circuit breaker (app/core/breaker.py) that skips the upstream while
+    recent calls mostly fail or run slow
+  - a content-addressed cache of sanitized plans (app/core/llm_cache.py)
+  - optional hedging: give up at LLM_HEDGE_BUDGET_MS and use the fallback
+    while the call finishes in the background and fills the cache
+Long diet plans are split into week-sized chunks generated concurrently, and
+``stream_diet_plan`` yields days as the model produces them. ``LLM_FAKE=1``
+swaps in ``FakeLLM`` for tests and local runs.
 """
 from __future__ import annotations
 
 from datetime import date, datetime, time, timedelta
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as _FutureTimeout
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
 import json
 import os
+import re
+import threading
+import time as _time
+
+from app.core.config import settings
+from app.core import llm_cache as _cache
+from app.core.breaker import CircuitBreaker
+from app.core.metrics import Counter, LatencyStats
+from app.core import timing as _timing
 
 try:
     from openai import OpenAI
 except Exception:  # pragma: no cover
     OpenAI = None  # type: ignore
 
+try:
+    import httpx
+except Exception:  # pragma: no cover
+    httpx = None  # type: ignore
+
+_MODEL = "gpt-4o-mini"
+
 
 def _fallback_plan(
     *,
@@ -100,6 +131,266 @@ def _fallback_plan(
     return sessions
 
 
+# ------------------------------------------------------------------------------
+# Fake LLM stand-in (LLM_FAKE=1): mimics the slice of the OpenAI client we use
+# (chat.completions.create -> choices[0].message.content) and returns canned
+# plan JSON after LLM_FAKE_LATENCY_MS, so jobs and endpoints can be exercised
+# without network access or an API key.
+# ------------------------------------------------------------------------------
+_FAKE_MEALS = [
+    ("Grilled Chicken Salad", ["6 oz chicken breast", "3 cups mixed greens", "1 tbsp olive oil"]),
+    ("Salmon and Broccoli", ["6 oz salmon", "2 cups broccoli florets", "1 tbsp olive oil"]),
+    ("Eggs and Spinach", ["3 each eggs", "2 cups spinach", "1 tsp olive oil"]),
+    ("Turkey Lettuce Wraps", ["6 oz ground turkey", "4 each romaine leaves"]),
+]
+
+
+def _fake_diet_json(payload: Dict[str, Any]) -> Dict[str, Any]:
+    days = max(1, min(31, int(payload.get('days') or 7)))
+    mpd = max(1, min(8, int(payload.get('meals_per_day') or 3)))
+    kcal = int(round((payload.get('calorie_target') or 1800) / mpd))
+    start = date.today()
+    out = []
+    for i in range(days):
+        meals = []
+        for j in range(mpd):
+            title, ings = _FAKE_MEALS[(i * mpd + j) % len(_FAKE_MEALS)]
+            hour = 8 + (12 * j) // (mpd - 1) if mpd > 1 else 12
+            meals.append({
+                'time': f"{hour:02d}:00",
+                'title': title,
+                'kcal': kcal,
+                'ingredients': list(ings),
+                'steps': [f"Prep and cook {title.lower()}."],
+            })
+        out.append({'date': (start + timedelta(days=i)).isoformat(), 'meals': meals})
+    return {'days': out}
+
+
+def _fake_workout_json(prefs: Dict[str, Any]) -> Dict[str, Any]:
+    sessions = _fallback_plan(
+        intake=None,
+        days=int(prefs.get('days') or 7),
+        per_week=int(prefs.get('sessions_per_week') or 4),
+        minutes=int(prefs.get('session_minutes') or 45),
+        equipment=prefs.get('equipment') or {},
+    )
+    return {'sessions': sessions}
+
+
+class _FakeCompletions:
+    def create(self, *, model: str, messages: List[Dict[str, str]], stream: bool = False, **_: Any) -> Any:
+        if settings.LLM_FAKE_LATENCY_MS > 0 and not stream:
+            _time.sleep(settings.LLM_FAKE_LATENCY_MS / 1000.0)
+        system = messages[0]['content'] if messages else ''
+        user = messages[-1]['content'] if messages else '{}'
+        if '"sessions"' in system:
+            data = _fake_workout_json(json.loads(user.split(':', 1)[1] if user.startswith('Preferences:') else user))
+        else:
+            data = _fake_diet_json(json.loads(user))
+        if stream:
+            return self._chunks(json.dumps(data))
+        msg = SimpleNamespace(content=json.dumps(data))
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+    @staticmethod
+    def _chunks(txt: str, size: int = 48) -> Iterator[Any]:
+        # Spread the canned latency across chunks so streaming looks incremental.
+        pieces = [txt[i:i + size] for i in range(0, len(txt), size)] or [""]
+        per = settings.LLM_FAKE_LATENCY_MS / 1000.0 / max(1, len(pieces))
+        for piece in pieces:
+            if per > 0:
+                _time.sleep(per)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+
+class FakeLLM:
+    """Drop-in for ``OpenAI`` in tests; see ``_client``."""
+
+    def __init__(self, *_: Any, **__: Any) -> None:
+        self.chat = SimpleNamespace(completions=_FakeCompletions())
+
+
+def _llm_available() -> bool:
+    if settings.LLM_FAKE:
+        return True
+    return bool(os.getenv("OPENAI_API_KEY")) and OpenAI is not None
+
+
+# ------------------------------------------------------------------------------
+# Client manager: one pooled client per process (keep-alive + TLS reuse), a
+# per-call deadline, and a bounded semaphore on concurrent upstream calls.
+# ------------------------------------------------------------------------------
+class LLMBusy(RuntimeError):
+    """Raised when no upstream slot frees up within LLM_QUEUE_TIMEOUT_SEC."""
+
+
+class LLMUnavailable(RuntimeError):
+    """Raised while the circuit breaker is open."""
+
+
+class _ClientManager:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._client: Any = None
+        self._key: Optional[str] = None
+        self._slots = threading.BoundedSemaphore(max(1, settings.LLM_MAX_CONCURRENCY))
+        self.queue_wait = LatencyStats()
+        self.upstream = LatencyStats()
+        self.first_day = LatencyStats()
+        self.outcomes = Counter()
+
+    def get(self) -> Any:
+        if settings.LLM_FAKE:
+            return FakeLLM()
+        key = os.getenv("OPENAI_API_KEY")
+        with self._lock:
+            if self._client is None or key != self._key:
+                kwargs: Dict[str, Any] = {"api_key": key, "timeout": settings.LLM_TIMEOUT_SEC, "max_retries": 0}
+                if httpx is not None:
+                    n = max(1, settings.LLM_POOL_CONNECTIONS)
+                    kwargs["http_client"] = httpx.Client(
+                        limits=httpx.Limits(max_connections=n, max_keepalive_connections=n),
+                        timeout=settings.LLM_TIMEOUT_SEC,
+                    )
+                old, self._client, self._key = self._client, OpenAI(**kwargs), key
+                if old is not None:
+                    try:
+                        old.close()
+                    except Exception:
+                        pass
+            return self._client
+
+    @contextmanager
+    def slot(self, queue_timeout: Optional[float] = None) -> Iterator[None]:
+        t0 = _time.perf_counter()
+        wait = settings.LLM_QUEUE_TIMEOUT_SEC if queue_timeout is None else queue_timeout
+        ok = self._slots.acquire(timeout=max(0.0, wait))
+        self.queue_wait.observe((_time.perf_counter() - t0) * 1000.0, ok=ok)
+        if not ok:
+            self.outcomes.inc("busy")
+            raise LLMBusy("LLM concurrency limit reached")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": settings.LLM_MAX_CONCURRENCY,
+            "timeout_sec": settings.LLM_TIMEOUT_SEC,
+            "queue_wait": self.queue_wait.snapshot(),
+            "upstream": self.upstream.snapshot(),
+            "stream_first_day": self.first_day.snapshot(),
+            "outcomes": self.outcomes.snapshot(),
+        }
+
+
+_manager = _ClientManager()
+
+_breaker = CircuitBreaker(
+    window=settings.LLM_BREAKER_WINDOW,
+    min_calls=settings.LLM_BREAKER_MIN_CALLS,
+    error_rate=settings.LLM_BREAKER_ERROR_RATE,
+    slow_ms=settings.LLM_BREAKER_SLOW_MS,
+    slow_rate=settings.LLM_BREAKER_SLOW_RATE,
+    cooldown_sec=settings.LLM_BREAKER_COOLDOWN_SEC,
+)
+
+# Hedged calls run here so the request thread can give up at the budget while
+# the upstream call finishes (and fills the cache) in the background. Calls in
+# flight (abandoned ones included) are capped at the pool size: with every
+# worker busy a request goes straight to the fallback rather than queueing
+# behind upstream calls nobody is waiting for.
+_HEDGE_WORKERS = max(1, settings.LLM_MAX_CONCURRENCY)
+_hedge_pool = ThreadPoolExecutor(max_workers=_HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+_hedge_slots = threading.BoundedSemaphore(_HEDGE_WORKERS)
+
+T = TypeVar("T")
+
+
+def _hedged(call: Callable[[], Optional[T]]) -> Optional[T]:
+    """Run ``call`` within LLM_HEDGE_BUDGET_MS; None means "use the fallback"."""
+    budget = settings.LLM_HEDGE_BUDGET_MS
+    with _timing.measure("llm"):
+        if budget <= 0:
+            return call()
+        if not _hedge_slots.acquire(blocking=False):
+            _manager.outcomes.inc("hedge_full")
+            return None
+
+        def run() -> Optional[T]:
+            try:
+                return call()
+            finally:
+                _hedge_slots.release()
+
+        fut = _hedge_pool.submit(run)
+        try:
+            return fut.result(timeout=budget / 1000.0)
+        except _FutureTimeout:
+            _manager.outcomes.inc("hedged")
+            return None
+
+
+def _breaker_gate() -> None:
+    if not _breaker.allow():
+        _manager.outcomes.inc("breaker_open")
+        raise LLMUnavailable("LLM circuit breaker is open")
+
+
+@contextmanager
+def _upstream_slot(queue_timeout: Optional[float] = None) -> Iterator[None]:
+    """Breaker gate, then a concurrency slot. A half-open probe that cannot get
+    a slot is handed back; otherwise only ``record()`` would clear it."""
+    _breaker_gate()
+    entered = False
+    try:
+        with _manager.slot(queue_timeout):
+            entered = True
+            yield
+    except LLMBusy:
+        if not entered:
+            _breaker.cancel_probe()
+        raise
+
+
+def _client() -> Any:
+    return _manager.get()
+
+
+def _chat_json(messages: List[Dict[str, str]], temperature: float, queue_timeout: Optional[float] = None) -> Dict[str, Any]:
+    """One JSON-mode completion through the breaker, shared client, slot and deadline."""
+    with _upstream_slot(queue_timeout):
+        t0 = _time.perf_counter()
+        ok = False
+        try:
+            resp = _client().chat.completions.create(
+                model=_MODEL,
+                messages=messages,
+                temperature=temperature,
+                response_format={"type": "json_object"},
+                timeout=settings.LLM_TIMEOUT_SEC,
+            )
+            txt = resp.choices[0].message.content or "{}"
+            data = json.loads(txt)
+            ok = True
+        finally:
+            ms = (_time.perf_counter() - t0) * 1000.0
+            _manager.upstream.observe(ms, ok=ok)
+            _manager.outcomes.inc("ok" if ok else "error")
+            _breaker.record(ok, ms)
+    return data if isinstance(data, dict) else {}
+
+
+def metrics_snapshot() -> Dict[str, Any]:
+    return _manager.snapshot()
+
+
+def breaker_snapshot() -> Dict[str, Any]:
+    return {**_breaker.snapshot(), "hedge_budget_ms": settings.LLM_HEDGE_BUDGET_MS}
+
+
 def generate_workout_plan(
     *,
     intake: Any,
@@ -109,15 +400,13 @@ def generate_workout_plan(
     equipment: Dict[str, bool],
 ) -> List[Dict[str, Any]]:
     """
-    If OPENAI_API_KEY is present and OpenAI SDK is available, ask the model to
-    produce a JSON plan. Otherwise, return the deterministic fallback plan.
+    If OPENAI_API_KEY is present and OpenAI SDK is available (or LLM_FAKE=1),
+    ask the model to produce a JSON plan. Otherwise, return the deterministic fallback plan.
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key or OpenAI is None:
+    if not _llm_available():
         return _fallback_plan(intake=intake, days=days, per_week=per_week, minutes=minutes, equipment=equipment)
 
     try:
-        client = OpenAI(api_key=api_key)
         # PhD Coach v3.27 framing for workouts
         sys = (
             "You are the PhD Coach v3.27. Use S3N workout logic (specificity, progressive overload, fatigue management) "
@@ -141,18 +430,29 @@ def generate_workout_plan(
             'notes': notes,
             'goals': goals,
         }
+        key = _cache.make_key(system=sys, model=_MODEL, temperature=0.3, payload=user_prefs)
+        cached = _cache.get(key)
+        if cached:
+            _manager.outcomes.inc("cache_hit")
+            return cached
+        _manager.outcomes.inc("cache_miss")
+        out = _hedged(lambda: _workout_plan_upstream(sys, user_prefs, key))
+        if not out:
+            return _fallback_plan(intake=intake, days=days, per_week=per_week, minutes=minutes, equipment=equipment)
+        return out
+    except Exception:
+        # Any failure → fallback plan
+        return _fallback_plan(intake=intake, days=days, per_week=per_week, minutes=minutes, equipment=equipment)
+
+
+def _workout_plan_upstream(sys: str, user_prefs: Dict[str, Any], key: str) -> Optional[List[Dict[str, Any]]]:
+    try:
+        start = user_prefs['start']
         messages = [
             {"role": "system", "content": sys},
             {"role": "user", "content": f"Preferences: {json.dumps(user_prefs)}"},
         ]
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.3,
-            response_format={"type": "json_object"},
-        )
-        txt = resp.choices[0].message.content or "{}"
-        data = json.loads(txt)
+        data = _chat_json(messages, temperature=0.3)
         sessions = data.get('sessions') or []
         # Basic normalization
         out: List[Dict[str, Any]] = []
@@ -165,11 +465,74 @@ def generate_workout_plan(
             except Exception:
                 continue
         if not out:
-            return _fallback_plan(intake=intake, days=days, per_week=per_week, minutes=minutes, equipment=equipment)
+            return None
+        _cache.put(key, "workouts", out)
         return out
     except Exception:
-        # Any failure → fallback plan
-        return _fallback_plan(intake=intake, days=days, per_week=per_week, minutes=minutes, equipment=equipment)
+        return None
+
+
+_DIET_SYSTEM = (
+    "You are the PhD Coach v3.27 using the NSSN nutrition framework. "
+    "Generate a compact JSON meal plan for the user. Respect avoid_ingredients strictly (exclude or substitute). "
+    "Aim for balanced micronutrients unless user notes indicate low-carb or diabetic focus; then bias carbs lower. "
+    "Match the daily calorie target (calorie_target) within ±5% across the day's meals. "
+    "Output strictly JSON with top-level key 'days' (array) where each item is {date, meals}. "
+    "Each meal is {time: 'HH:MM', title, kcal: int, ingredients: [string], steps: [string]}."
+)
+
+
+def _diet_payload(
+    *,
+    intake: Any,
+    days: int,
+    meals_per_day: int,
+    avoids: List[str],
+    calorie_target: Optional[int],
+) -> Dict[str, Any]:
+    # Extract preferences
+    notes = (getattr(intake, 'food_notes', '') or '')
+    diabetic = bool(getattr(intake, 'diabetic', False))
+    mpd = max(1, min(8, int(meals_per_day or 3)))
+    return {
+        'days': int(days),
+        'meals_per_day': mpd,
+        'avoid_ingredients': [a for a in avoids if a],
+        'diabetic': diabetic,
+        'notes': notes,
+        'calorie_target': int(calorie_target) if calorie_target else None,
+    }
+
+
+def _normalize_day(d: Dict[str, Any], default_date: str) -> Dict[str, Any]:
+    """Sanitize one {date, meals} entry to the minimal plan shape; raises on junk."""
+    date_str = d.get('date') or default_date
+    meals_list = d.get('meals') or []
+    norm_meals = []
+    for m in meals_list:
+        norm_meals.append({
+            'time': m.get('time') or '12:00',
+            'title': m.get('title') or 'Meal',
+            'kcal': int(m.get('kcal') or 500),
+            'ingredients': m.get('ingredients') or [],
+            'steps': m.get('steps') or [],
+        })
+    return {'date': date_str, 'meals': norm_meals}
+
+
+def _complete_plan(plan: Any, days: int) -> bool:
+    """A cached diet plan is only served (or stored) if it covers every requested day."""
+    return isinstance(plan, dict) and len(plan.get('days') or []) >= int(days)
+
+
+def _plan_from_days(out_days: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        'label': 'PhD Coach Plan',
+        'start': out_days[0]['date'],
+        'end': out_days[-1]['date'],
+        'days': out_days,
+        'window': {'start': out_days[0]['date'], 'end': out_days[-1]['date']},
+    }
 
 
 def generate_diet_plan(
@@ -184,45 +547,38 @@ def generate_diet_plan(
     Returns a dict with keys: label, start, end, days (list of {date, meals:[{time,title,kcal,ingredients,steps}]})
     or None on failure/unavailable.
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key or OpenAI is None:
+    if not _llm_available():
         return None
     try:
-        client = OpenAI(api_key=api_key)
-        sys = (
-            "You are the PhD Coach v3.27 using the NSSN nutrition framework. "
-            "Generate a compact JSON meal plan for the user. Respect avoid_ingredients strictly (exclude or substitute). "
-            "Aim for balanced micronutrients unless user notes indicate low-carb or diabetic focus; then bias carbs lower. "
-            "Match the daily calorie target (calorie_target) within ±5% across the day's meals. "
-            "Output strictly JSON with top-level key 'days' (array) where each item is {date, meals}. "
-            "Each meal is {time: 'HH:MM', title, kcal: int, ingredients: [string], steps: [string]}."
-        )
-        # Extract preferences
-        notes = (getattr(intake, 'food_notes', '') or '')
-        diabetic = bool(getattr(intake, 'diabetic', False))
-        mpd = max(1, min(8, int(meals_per_day or 3)))
+        sys = _DIET_SYSTEM
         start = date.today().isoformat()
-        payload = {
-            'days': int(days),
-            'meals_per_day': mpd,
-            'avoid_ingredients': [a for a in avoids if a],
-            'diabetic': diabetic,
-            'notes': notes,
-            'calorie_target': int(calorie_target) if calorie_target else None,
-        }
+        payload = _diet_payload(intake=intake, days=days, meals_per_day=meals_per_day, avoids=avoids, calorie_target=calorie_target)
         # calorie_target provided by caller; LLM should match within ±5%.
+        # The payload carries no dates, so a cached plan is re-dated from today.
+        key = _cache.make_key(system=sys, model=_MODEL, temperature=0.2, payload=payload)
+        cached = _cache.get(key)
+        if cached and _complete_plan(cached, payload['days']):
+            _manager.outcomes.inc("cache_hit")
+            return _rebase_plan_dates(cached, date.today())
+        _manager.outcomes.inc("cache_miss")
+        chunk = settings.LLM_CHUNK_DAYS
+        if chunk > 0 and payload['days'] > chunk:
+            call = lambda: _diet_plan_chunked(payload, key, date.today(), chunk)
+        else:
+            call = lambda: _diet_plan_upstream(sys, payload, key, start)
+        # No plan in budget → None, and the caller builds its heuristic plan.
+        return _hedged(call)
+    except Exception:
+        return None
+
+
+def _diet_plan_upstream(sys: str, payload: Dict[str, Any], key: str, start: str) -> Optional[Dict[str, Any]]:
+    try:
         messages = [
             {"role": "system", "content": sys},
             {"role": "user", "content": json.dumps(payload)},
         ]
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.2,
-            response_format={"type": "json_object"},
-        )
-        txt = resp.choices[0].message.content or "{}"
-        data = json.loads(txt)
+        data = _chat_json(messages, temperature=0.2)
         days_arr = data.get('days') or []
         if not isinstance(days_arr, list) or not days_arr:
             return None
@@ -230,28 +586,262 @@ def generate_diet_plan(
         out_days: List[Dict[str, Any]] = []
         for d in days_arr:
             try:
-                date_str = d.get('date') or start
-                meals_list = d.get('meals') or []
-                norm_meals = []
-                for m in meals_list:
-                    norm_meals.append({
-                        'time': m.get('time') or '12:00',
-                        'title': m.get('title') or 'Meal',
-                        'kcal': int(m.get('kcal') or 500),
-                        'ingredients': m.get('ingredients') or [],
-                        'steps': m.get('steps') or [],
-                    })
-                out_days.append({'date': date_str, 'meals': norm_meals})
+                out_days.append(_normalize_day(d, start))
             except Exception:
                 continue
         if not out_days:
             return None
-        return {
-            'label': 'PhD Coach Plan',
-            'start': out_days[0]['date'],
-            'end': out_days[-1]['date'],
-            'days': out_days,
-            'window': {'start': out_days[0]['date'], 'end': out_days[-1]['date']},
-        }
+        plan = _plan_from_days(out_days)
+        if _complete_plan(plan, payload['days']):
+            _cache.put(key, "diet", plan)
+        return plan
+    except Exception:
+        return None
+
+
+# ------------------------------------------------------------------------------
+# Chunked generation: a 31-day plan is output-token bound, so split it into
+# week-sized requests, run them concurrently and merge. Chunks share a context
+# block (position in the plan plus a rotated protein focus) so variety holds
+# across chunks that cannot see each other's output.
+# ------------------------------------------------------------------------------
+_CHUNK_SYSTEM = _DIET_SYSTEM + (
+    " This request is one chunk of a longer plan described in 'chunk'. Produce exactly 'days' days. "
+    "Lead with the proteins in 'variety_focus' and do not repeat a meal title within the chunk."
+)
+
+_VARIETY = ["chicken", "fish", "eggs", "turkey", "legumes", "tofu", "beef", "yogurt/dairy", "pork", "shellfish"]
+
+# Separate from the hedge pool: a hedged chunked plan fans out from there.
+_chunk_pool = ThreadPoolExecutor(max_workers=max(1, settings.LLM_MAX_CONCURRENCY), thread_name_prefix="llm-chunk")
+
+
+def _chunk_payloads(payload: Dict[str, Any], chunk_days: int) -> List[Dict[str, Any]]:
+    total = int(payload['days'])
+    avoid = " ".join(payload.get('avoid_ingredients') or []).lower()
+    proteins = [p for p in _VARIETY if not any(w in avoid for w in p.split('/'))] or _VARIETY
+    count = (total + chunk_days - 1) // chunk_days
+    out = []
+    for k in range(count):
+        off = k * chunk_days
+        focus = [proteins[(k * 3 + j) % len(proteins)] for j in range(3)]
+        out.append({
+            **payload,
+            'days': min(chunk_days, total - off),
+            'chunk': {'index': k + 1, 'of': count, 'day_offset': off, 'total_days': total},
+            'variety_focus': focus,
+        })
+    return out
+
+
+def _diet_chunk_days(cp: Dict[str, Any], start: date) -> Optional[List[Dict[str, Any]]]:
+    ckey = _cache.make_key(system=_CHUNK_SYSTEM, model=_MODEL, temperature=0.2, payload=cp)
+    cached = _cache.get(ckey)
+    if cached:
+        _manager.outcomes.inc("cache_hit")
+        return cached
+    messages = [
+        {"role": "system", "content": _CHUNK_SYSTEM},
+        {"role": "user", "content": json.dumps(cp)},
+    ]
+    # Chunks queue behind each other for slots, so allow up to one call's deadline.
+    data = _chat_json(messages, temperature=0.2, queue_timeout=settings.LLM_QUEUE_TIMEOUT_SEC + settings.LLM_TIMEOUT_SEC)
+    days_arr = data.get('days') or []
+    out: List[Dict[str, Any]] = []
+    for d in days_arr if isinstance(days_arr, list) else []:
+        try:
+            out.append(_normalize_day(d, start.isoformat()))
+        except Exception:
+            continue
+        if len(out) >= cp['days']:
+            break
+    if len(out) < cp['days']:
+        return None
+    _cache.put(ckey, "diet_chunk", out)
+    return out
+
+
+def _diet_plan_chunked(payload: Dict[str, Any], key: str, start: date, chunk_days: int) -> Optional[Dict[str, Any]]:
+    try:
+        futures = [_chunk_pool.submit(_diet_chunk_days, cp, start) for cp in _chunk_payloads(payload, chunk_days)]
+        out_days: List[Dict[str, Any]] = []
+        for fut in futures:
+            part = fut.result()
+            if not part:
+                return None
+            out_days.extend(part)
+        plan = _rebase_plan_dates(_plan_from_days(out_days), start)
+        _cache.put(key, "diet", plan)
+        return plan
     except Exception:
         return None
+
+
+def _rebase_plan_dates(plan: Dict[str, Any], start: date) -> Dict[str, Any]:
+    days_arr = plan.get('days') or []
+    for i, d in enumerate(days_arr):
+        d['date'] = (start + timedelta(days=i)).isoformat()
+    if days_arr:
+        plan['start'] = days_arr[0]['date']
+        plan['end'] = days_arr[-1]['date']
+        plan['window'] = {'start': plan['start'], 'end': plan['end']}
+    return plan
+
+
+# ------------------------------------------------------------------------------
+# Streaming: emit each day of the plan as soon as its JSON object closes.
+# ------------------------------------------------------------------------------
+class _DaysStreamParser:
+    """Incrementally pulls complete objects out of the top-level ``"days": [...]``.
+
+    Tracks string/escape state and brace depth from where the array opens, so
+    each ``feed`` only scans the new text and returns the day objects that
+    closed within it.
+    """
+
+    _OPEN = re.compile(r'"days"\s*:\s*\[')
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos = -1
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._obj_start = -1
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._buf += chunk
+        out: List[Dict[str, Any]] = []
+        if self.done:
+            return out
+        if self._pos < 0:
+            m = self._OPEN.search(self._buf)
+            if not m:
+                return out
+            self._pos = m.end()
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            c = buf[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == '\\':
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+            elif c == '"':
+                self._in_str = True
+            elif c in '{[':
+                if self._depth == 0 and c == '{':
+                    self._obj_start = i
+                self._depth += 1
+            elif c in '}]':
+                if self._depth == 0:
+                    self.done = True
+                    i += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._obj_start >= 0:
+                    try:
+                        obj = json.loads(buf[self._obj_start:i + 1])
+                        if isinstance(obj, dict):
+                            out.append(obj)
+                    except Exception:
+                        pass
+                    self._obj_start = -1
+            i += 1
+        self._pos = i
+        return out
+
+
+def stream_diet_plan(
+    *,
+    intake: Any,
+    days: int,
+    meals_per_day: int,
+    avoids: List[str],
+    calorie_target: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield sanitized days ({date, meals}) as the model streams them.
+
+    Same prompt and cache as ``generate_diet_plan``; a cache hit replays the
+    stored days. Yields nothing if the LLM is unavailable and simply stops on
+    an upstream error, so callers fill any missing days with their fallback.
+    """
+    if not _llm_available():
+        return
+    today = date.today()
+    payload = _diet_payload(intake=intake, days=days, meals_per_day=meals_per_day, avoids=avoids, calorie_target=calorie_target)
+    key = _cache.make_key(system=_DIET_SYSTEM, model=_MODEL, temperature=0.2, payload=payload)
+    cached = _cache.get(key)
+    if cached and _complete_plan(cached, payload['days']):
+        _manager.outcomes.inc("cache_hit")
+        yield from (_rebase_plan_dates(cached, today).get('days') or [])
+        return
+    _manager.outcomes.inc("cache_miss")
+    messages = [
+        {"role": "system", "content": _DIET_SYSTEM},
+        {"role": "user", "content": json.dumps(payload)},
+    ]
+    out_days: List[Dict[str, Any]] = []
+    try:
+        with _upstream_slot():
+            t0 = _time.perf_counter()
+            ok = False
+            aborted = False
+            stream = None
+            try:
+                stream = _client().chat.completions.create(
+                    model=_MODEL,
+                    messages=messages,
+                    temperature=0.2,
+                    response_format={"type": "json_object"},
+                    timeout=settings.LLM_TIMEOUT_SEC,
+                    stream=True,
+                )
+                parser = _DaysStreamParser()
+                for chunk in stream:
+                    try:
+                        piece = chunk.choices[0].delta.content or ""
+                    except Exception:
+                        piece = ""
+                    for d in parser.feed(piece):
+                        try:
+                            day = _normalize_day(d, today.isoformat())
+                        except Exception:
+                            continue
+                        if not out_days:
+                            _manager.first_day.observe((_time.perf_counter() - t0) * 1000.0)
+                        out_days.append(day)
+                        yield day
+                        if len(out_days) >= int(days):
+                            break
+                    if len(out_days) >= int(days) or parser.done:
+                        break
+                ok = bool(out_days)
+            except GeneratorExit:
+                # The client went away; that says nothing about the upstream
+                aborted = True
+                raise
+            finally:
+                close = getattr(stream, 'close', None)
+                if callable(close):
+                    try:
+                        close()
+                    except Exception:
+                        pass
+                ms = (_time.perf_counter() - t0) * 1000.0
+                _timing.add("llm", ms)
+                if aborted:
+                    _breaker.cancel_probe()
+                else:
+                    _manager.upstream.observe(ms, ok=ok)
+                    _manager.outcomes.inc("ok" if ok else "error")
+                    _breaker.record(ok, ms)
+    except Exception:
+        return
+    plan = _plan_from_days(out_days) if out_days else None
+    if _complete_plan(plan, payload['days']):
+        _cache.put(key, "diet", plan)
@@ -0,0 +1,82 @@
+"""
+Content-addressed cache for sanitized LLM outputs (Postgres table ``llm_cache``).
+
+Keys are a SHA-256 over the canonical JSON of (system prompt, model,
+temperature, payload), so any prompt or parameter change is a new key. Values
+are the already-normalized plan, so a hit skips both the upstream call and
+re-sanitizing. Entries expire after LLM_CACHE_TTL_SEC and the table is trimmed
+to LLM_CACHE_MAX_ENTRIES by least-recent use. Any DB error counts as a miss.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import engine
+
+log = logging.getLogger(__name__)
+
+
+def make_key(*, system: str, model: str, temperature: float, payload: Dict[str, Any]) -> str:
+    canon = json.dumps(
+        {"system": system, "model": model, "temperature": temperature, "payload": payload},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> Optional[Any]:
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    try:
+        with engine.begin() as conn:
+            row = conn.execute(
+                text("""
+                    UPDATE llm_cache
+                    SET last_used_at = CURRENT_TIMESTAMP, hits = hits + 1
+                    WHERE key = :k AND created_at >= CURRENT_TIMESTAMP - make_interval(secs => :ttl)
+                    RETURNING value
+                """).bindparams(k=key, ttl=settings.LLM_CACHE_TTL_SEC)
+            ).first()
+        return json.loads(row[0]) if row else None
+    except Exception:
+        log.debug("llm cache get failed", exc_info=True)
+        return None
+
+
+def put(key: str, kind: str, value: Any) -> None:
+    if not settings.LLM_CACHE_ENABLED:
+        return
+    try:
+        blob = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+        with engine.begin() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO llm_cache (key, kind, value, size_bytes, hits, created_at, last_used_at)
+                    VALUES (:k, :kind, :v, :n, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                    ON CONFLICT (key) DO UPDATE
+                    SET value = EXCLUDED.value, size_bytes = EXCLUDED.size_bytes,
+                        created_at = CURRENT_TIMESTAMP, last_used_at = CURRENT_TIMESTAMP
+                """).bindparams(k=key, kind=kind, v=blob, n=len(blob))
+            )
+            conn.execute(
+                text("DELETE FROM llm_cache WHERE created_at < CURRENT_TIMESTAMP - make_interval(secs => :ttl)")
+                .bindparams(ttl=settings.LLM_CACHE_TTL_SEC)
+            )
+            conn.execute(
+                text("""
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache ORDER BY last_used_at DESC OFFSET :max
+                    )
+                """).bindparams(max=max(1, settings.LLM_CACHE_MAX_ENTRIES))
+            )
+    except Exception:
+        log.debug("llm cache put failed", exc_info=True)
@@ -0,0 +1,66 @@
+"""
+Tiny in-process latency/counter metrics.
+
+Each ``LatencyStats`` keeps running totals plus a bounded window of recent
+samples for percentiles. Values are per process (each gunicorn worker has its
+own) and are surfaced through ``/api/v1/status``.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Deque, Dict
+import threading
+
+
+class LatencyStats:
+    def __init__(self, window: int = 512) -> None:
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float, ok: bool = True) -> None:
+        with self._lock:
+            self.count += 1
+            if not ok:
+                self.errors += 1
+            self.total_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+            self._samples.append(ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            xs = sorted(self._samples)
+            count, errors, total, mx = self.count, self.errors, self.total_ms, self.max_ms
+
+        def pct(p: float) -> float | None:
+            if not xs:
+                return None
+            return round(xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))], 1)
+
+        return {
+            "count": count,
+            "errors": errors,
+            "avg_ms": round(total / count, 1) if count else None,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(mx, 1),
+        }
+
+
+class Counter:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._values: Dict[str, int] = {}
+
+    def inc(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._values)
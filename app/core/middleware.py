@@ -0,0 +1,160 @@
+"""
+Pure ASGI middleware for the per-request layers in app.main.
+
+Both classes decide from the raw scope and short-circuit on path prefix, so
+the common case is one string comparison and a direct call into the app: no
+``Request`` object, no ``call_next`` task or body stream.
+
+``LazySessionMiddleware`` is Starlette's signed-cookie session with the same
+cookie format and semantics (re-signed on every response that used it,
+cleared when emptied), except that the cookie is only verified and decoded
+when a handler first touches ``request.session``. Health checks and status
+polls never pay for the HMAC, and ``skip_paths`` bypass the layer entirely.
+"""
+from __future__ import annotations
+
+from base64 import b64decode, b64encode
+from typing import Any, Dict, Iterator, Optional, Sequence
+from collections.abc import MutableMapping
+import json
+
+import itsdangerous
+from itsdangerous.exc import BadSignature
+from starlette.datastructures import URL, Headers
+from starlette.requests import cookie_parser
+from starlette.responses import RedirectResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class LazySession(MutableMapping):
+    """Session dict that unsigns its cookie on first access."""
+
+    def __init__(self, raw: Optional[str], signer: itsdangerous.TimestampSigner, max_age: Optional[int]) -> None:
+        self._raw = raw
+        self._signer = signer
+        self._max_age = max_age
+        self._data: Optional[Dict[str, Any]] = None
+        self.initially_empty = True
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = {}
+            if self._raw:
+                try:
+                    self._data = json.loads(b64decode(self._signer.unsign(self._raw.encode("utf-8"), max_age=self._max_age)))
+                    self.initially_empty = False
+                except (BadSignature, ValueError):
+                    pass
+        return self._data
+
+    def __getitem__(self, key: str) -> Any:
+        return self._load()[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._load()[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def clear(self) -> None:
+        self._load().clear()
+
+    def data(self) -> Dict[str, Any]:
+        return dict(self._load())
+
+
+class LazySessionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        secret_key: str,
+        *,
+        session_cookie: str = "session",
+        max_age: Optional[int] = 14 * 24 * 60 * 60,
+        path: str = "/",
+        same_site: str = "lax",
+        https_only: bool = False,
+        skip_paths: Sequence[str] = (),
+    ) -> None:
+        self.app = app
+        self.signer = itsdangerous.TimestampSigner(str(secret_key))
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.path = path
+        self.security_flags = "httponly; samesite=" + same_site + ("; secure" if https_only else "")
+        self.skip_paths = tuple(skip_paths)
+
+    def _cookie(self, value: str, expiry: str) -> bytes:
+        return f"{self.session_cookie}={value}; path={self.path}; {expiry}{self.security_flags}".encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket") or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        raw = None
+        for k, v in scope.get("headers", ()):
+            if k == b"cookie":
+                raw = cookie_parser(v.decode("latin-1")).get(self.session_cookie)
+                break
+        sess = LazySession(raw, self.signer, self.max_age)
+        scope["session"] = sess
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and sess.loaded:
+                if len(sess):
+                    data = self.signer.sign(b64encode(json.dumps(sess.data()).encode("utf-8"))).decode("utf-8")
+                    cookie = self._cookie(data, f"Max-Age={self.max_age}; " if self.max_age else "")
+                    message.setdefault("headers", []).append((b"set-cookie", cookie))
+                elif not sess.initially_empty:
+                    cookie = self._cookie("null", "expires=Thu, 01 Jan 1970 00:00:00 GMT; ")
+                    message.setdefault("headers", []).append((b"set-cookie", cookie))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class HTMLRedirectMiddleware:
+    """Send browser navigations (Accept: text/html) outside ``/api`` to the UI:
+    the SPA shell when the built bundle is served here (``ui_files``), else a
+    302 to ``ui_base`` (default: same host on ``ui_port``)."""
+
+    def __init__(self, app: ASGIApp, *, ui_base: Optional[str], ui_port: int, ui_files: Any = None, api_prefix: str = "/api") -> None:
+        self.app = app
+        self.ui_base = ui_base
+        self.ui_port = ui_port
+        self.ui_files = ui_files
+        self.api_prefix = api_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.api_prefix):
+            await self.app(scope, receive, send)
+            return
+        response = None
+        try:
+            headers = Headers(scope=scope)
+            if "text/html" in headers.get("accept", "").lower():
+                if self.ui_files is not None:
+                    response = await self.ui_files.get_response("index.html", scope)
+                else:
+                    ui_base = self.ui_base
+                    if not ui_base:
+                        url = URL(scope=scope)
+                        ui_base = f"{url.scheme or 'http'}://{url.hostname or 'localhost'}:{self.ui_port}"
+                    response = RedirectResponse(url=ui_base, status_code=302)
+        except Exception:
+            response = None
+        if response is None:
+            await self.app(scope, receive, send)
+            return
+        await response(scope, receive, send)
@@ -0,0 +1,234 @@
+"""
+Append-only grocery price history (Postgres).
+
+Layout:
+  price_observations  (store, sku, product, price_cents, observed_at, source)
+                      range-partitioned by month on observed_at, with a
+                      (sku, store, observed_at) index per partition; prices
+                      are integer cents to keep rows narrow
+  price_current       (store, sku) -> latest price, maintained by the same
+                      statement that appends, so "latest price" never scans
+                      history
+
+``record`` only appends an observation when the price differs from the
+current one, so re-ingesting an unchanged catalog adds nothing. ``history``
+range-scans one sku (partition pruning keeps it to the months asked for) and
+can bucket by day/week/month for charts.
+
+Observations come from the price catalog, snapshotted in the background at
+startup. Tables and monthly partitions are created by the writer on demand
+(like app.main._ensure_schema) since SQLModel cannot declare partitioned
+tables; readers assume they exist.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+import logging
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.db import engine
+
+log = logging.getLogger(__name__)
+
+_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS price_observations (
+        store VARCHAR(60) NOT NULL,
+        sku VARCHAR(64) NOT NULL,
+        product VARCHAR(160) NOT NULL,
+        price_cents INTEGER NOT NULL,
+        observed_at TIMESTAMP NOT NULL,
+        source VARCHAR(16) NOT NULL DEFAULT 'catalog'
+    ) PARTITION BY RANGE (observed_at)
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_price_observations_sku ON price_observations (sku, store, observed_at)",
+    """
+    CREATE TABLE IF NOT EXISTS price_current (
+        store VARCHAR(60) NOT NULL,
+        sku VARCHAR(64) NOT NULL,
+        product VARCHAR(160) NOT NULL,
+        price_cents INTEGER NOT NULL,
+        observed_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (store, sku)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_price_current_product ON price_current (product)",
+)
+
+_BUCKETS = {"day", "week", "month"}
+_CHUNK = 500
+
+_lock = threading.Lock()
+_ready = False
+_months: Set[date] = set()
+
+
+def _month(ts: datetime) -> date:
+    return date(ts.year, ts.month, 1)
+
+
+def _next_month(d: date) -> date:
+    return date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+
+
+def ensure_schema(conn: Connection) -> None:
+    global _ready
+    if _ready:
+        return
+    with _lock:
+        if not _ready:
+            for stmt in _DDL:
+                conn.execute(text(stmt))
+            _ready = True
+
+
+def _forget() -> None:
+    """Drop the created-DDL memo after a rolled-back transaction."""
+    global _ready
+    with _lock:
+        _ready = False
+        _months.clear()
+
+
+def _ensure_partitions(conn: Connection, months: Iterable[date]) -> None:
+    for m in sorted(set(months) - _months):
+        name = f"price_observations_y{m.year:04d}m{m.month:02d}"
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF price_observations "
+            f"FOR VALUES FROM ('{m.isoformat()}') TO ('{_next_month(m).isoformat()}')"
+        ))
+        _months.add(m)
+
+
+def record(observations: Sequence[Dict[str, Any]], source: str = "catalog", conn: Optional[Connection] = None) -> int:
+    """Append observations ({store, sku, product, price, observed_at?}) whose price
+    changed; returns rows appended. Uses its own transaction unless ``conn`` is given."""
+    if not observations:
+        return 0
+    if conn is None:
+        try:
+            with engine.begin() as c:
+                return record(observations, source, c)
+        except Exception:
+            _forget()
+            raise
+
+    now = datetime.utcnow()
+    rows = []
+    for o in observations:
+        try:
+            rows.append({
+                "store": str(o["store"])[:60],
+                "sku": str(o["sku"])[:64],
+                "product": str(o.get("product") or o["sku"])[:160],
+                "cents": int(round(float(o["price"]) * 100)),
+                "ts": o.get("observed_at") or now,
+            })
+        except (KeyError, TypeError, ValueError):
+            continue
+    ensure_schema(conn)
+    _ensure_partitions(conn, (_month(r["ts"]) for r in rows))
+
+    appended = 0
+    for i in range(0, len(rows), _CHUNK):
+        chunk = rows[i:i + _CHUNK]
+        params: Dict[str, Any] = {"src": source[:16]}
+        values = []
+        for j, r in enumerate(chunk):
+            values.append(
+                f"(CAST(:s{j} AS varchar), CAST(:k{j} AS varchar), CAST(:p{j} AS varchar), "
+                f"CAST(:c{j} AS integer), CAST(:t{j} AS timestamp))"
+            )
+            params.update({f"s{j}": r["store"], f"k{j}": r["sku"], f"p{j}": r["product"], f"c{j}": r["cents"], f"t{j}": r["ts"]})
+        res = conn.execute(text(f"""
+            WITH v (store, sku, product, price_cents, observed_at) AS (VALUES {', '.join(values)}),
+            ins AS (
+                INSERT INTO price_observations (store, sku, product, price_cents, observed_at, source)
+                SELECT v.store, v.sku, v.product, v.price_cents, v.observed_at, :src
+                FROM v
+                LEFT JOIN price_current c ON c.store = v.store AND c.sku = v.sku
+                WHERE c.sku IS NULL OR (c.price_cents <> v.price_cents AND v.observed_at >= c.observed_at)
+                RETURNING store, sku, product, price_cents, observed_at
+            )
+            INSERT INTO price_current (store, sku, product, price_cents, observed_at)
+            SELECT store, sku, product, price_cents, observed_at FROM ins
+            ON CONFLICT (store, sku) DO UPDATE
+            SET product = EXCLUDED.product, price_cents = EXCLUDED.price_cents, observed_at = EXCLUDED.observed_at
+            WHERE EXCLUDED.observed_at >= price_current.observed_at
+        """).bindparams(**params))
+        appended += max(0, res.rowcount or 0)
+    return appended
+
+
+def latest(conn: Connection, skus: Optional[Sequence[str]] = None, product: Optional[str] = None) -> List[Dict[str, Any]]:
+    where, params = [], {}
+    if skus:
+        where.append("sku = ANY(:skus)")
+        params["skus"] = list(skus)
+    if product:
+        where.append("product = :product")
+        params["product"] = product
+    sql = "SELECT store, sku, product, price_cents, observed_at FROM price_current"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    rows = conn.execute(text(sql + " ORDER BY product, store").bindparams(**params)).mappings().all()
+    return [{"store": r["store"], "sku": r["sku"], "product": r["product"],
+             "price": r["price_cents"] / 100.0, "since": r["observed_at"].isoformat()} for r in rows]
+
+
+def history(
+    conn: Connection,
+    skus: Sequence[str],
+    *,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    bucket: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Observations for ``skus`` in [start, end]; bucketed to min/avg/max per store when asked."""
+    if not skus:
+        return []
+    where = ["sku = ANY(:skus)"]
+    params: Dict[str, Any] = {"skus": list(skus)}
+    if start:
+        where.append("observed_at >= :start")
+        params["start"] = datetime.combine(start, datetime.min.time())
+    if end:
+        where.append("observed_at < :end")
+        params["end"] = datetime.combine(end + timedelta(days=1), datetime.min.time())
+    cond = " AND ".join(where)
+    if bucket in _BUCKETS:
+        rows = conn.execute(text(f"""
+            SELECT store, date_trunc('{bucket}', observed_at) AS ts,
+                   MIN(price_cents) AS lo, AVG(price_cents) AS avg, MAX(price_cents) AS hi, COUNT(*) AS n
+            FROM price_observations WHERE {cond}
+            GROUP BY store, ts ORDER BY ts, store
+        """).bindparams(**params)).mappings().all()
+        return [{"store": r["store"], "ts": r["ts"].isoformat(), "min": r["lo"] / 100.0,
+                 "avg": round(float(r["avg"]) / 100.0, 2), "max": r["hi"] / 100.0, "n": r["n"]} for r in rows]
+    rows = conn.execute(text(f"""
+        SELECT store, sku, price_cents, observed_at, source
+        FROM price_observations WHERE {cond}
+        ORDER BY observed_at, store
+    """).bindparams(**params)).mappings().all()
+    return [{"store": r["store"], "sku": r["sku"], "price": r["price_cents"] / 100.0,
+             "ts": r["observed_at"].isoformat(), "source": r["source"]} for r in rows]
+
+
+def record_catalog(catalog: Any) -> int:
+    """Snapshot every catalog offer (no-op rows for unchanged prices)."""
+    obs = [
+        {"store": o.store, "sku": o.sku, "product": product, "price": o.price}
+        for product, offers in zip(catalog.products, catalog.offers)
+        for o in offers
+    ]
+    try:
+        n = record(obs, source="catalog")
+        log.info("price history: %d new observations from catalog %s", n, catalog.version)
+        return n
+    except Exception:
+        log.warning("price history: catalog snapshot failed", exc_info=True)
+        return 0
@@ -0,0 +1,302 @@
+"""
+Progressive overload: next-session targets per exercise from workout history.
+
+Each (user, exercise name) has one ``exercise_progress`` row of running
+aggregates (entries, reps, tonnage, best/smoothed e1RM, hit/miss streaks) and
+the precomputed next target. Every folded entry keeps an
+``exercise_progress_entries`` row (keyed by exercise id) with what it added
+and the order-dependent state it replaced, so changing an exercise
+(completing it, entering or correcting actuals, un-completing it) takes the
+old contribution out and folds the new one in with a few indexed lookups
+(``record``), whatever the length of the history. ``rebuild`` replays a
+user's full history for every exercise (backfill, or after renaming old
+entries).
+
+Rules (double progression, weights in lb):
+  - hit the planned reps at the planned weight -> add one increment
+    (10 lb for lower-body compounds, 5 lb otherwise), same reps
+  - miss by up to 2 reps -> repeat the weight
+  - miss twice in a row, or by more than 2 reps -> deload ~10%
+  - unloaded work (bodyweight, planks, carries) progresses reps instead
+When a plan asks for a different rep count than the stored target, the weight
+is re-derived from the smoothed e1RM (Epley) for that rep count.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import re
+
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+from app.models import ExerciseProgress, ExerciseProgressEntry
+
+_EWMA_ALPHA = 0.3
+_LOWER_BODY = ("squat", "leg press", "rdl", "deadlift", "lunge", "hip thrust", "calf")
+_MAX_REPS_UNLOADED = 60
+
+
+def exercise_key(name: str) -> str:
+    return re.sub(r"\s+", " ", (name or "").strip().lower())[:160]
+
+
+def e1rm(weight: float, reps: int) -> float:
+    """Epley estimate; reps are capped at 12 where the formula stops being useful."""
+    return float(weight) * (1.0 + min(max(1, int(reps)), 12) / 30.0)
+
+
+def weight_for_reps(one_rm: float, reps: int, increment: int = 5) -> int:
+    w = one_rm / (1.0 + min(max(1, int(reps)), 12) / 30.0)
+    return _round_to(w, increment)
+
+
+def _increment(name: str) -> int:
+    key = exercise_key(name)
+    return 10 if any(k in key for k in _LOWER_BODY) else 5
+
+
+def _round_to(w: float, step: int) -> int:
+    return max(step, int(round(w / step)) * step)
+
+
+def _effective(
+    planned_reps: Optional[int], planned_weight: Optional[int], actual_reps: Optional[int], actual_weight: Optional[int],
+) -> Tuple[int, Optional[int]]:
+    reps = int(actual_reps if actual_reps is not None else (planned_reps or 0))
+    weight = actual_weight if actual_weight is not None else planned_weight
+    return reps, weight
+
+
+def observe(
+    row: ExerciseProgress,
+    *,
+    planned_reps: Optional[int],
+    planned_weight: Optional[int],
+    actual_reps: Optional[int],
+    actual_weight: Optional[int],
+    advance: bool = True,
+) -> None:
+    """Fold one completed entry into ``row`` and recompute its next target.
+
+    ``advance=False`` folds only the order-independent totals (entries, reps,
+    tonnage, best e1RM), for an entry older than the latest one folded.
+    """
+    reps, weight = _effective(planned_reps, planned_weight, actual_reps, actual_weight)
+    goal_reps = int(planned_reps or row.next_reps or reps or 0)
+    step = _increment(row.name)
+
+    row.entries += 1
+    row.total_reps += reps
+    est = e1rm(weight, reps) if weight and reps else None
+    if est is not None:
+        row.tonnage += float(weight) * reps
+        row.best_e1rm = est if row.best_e1rm is None else max(row.best_e1rm, est)
+    row.updated_at = datetime.utcnow()
+    if not advance:
+        return
+
+    row.last_reps = reps
+    row.last_weight = weight
+    if est is not None:
+        row.ewma_e1rm = est if row.ewma_e1rm is None else (_EWMA_ALPHA * est + (1 - _EWMA_ALPHA) * row.ewma_e1rm)
+
+    hit = reps >= goal_reps and (not planned_weight or not weight or weight >= planned_weight)
+    if hit:
+        row.hit_streak += 1
+        row.miss_streak = 0
+    else:
+        row.miss_streak += 1
+        row.hit_streak = 0
+
+    if not weight:
+        # Unloaded: progress reps (or seconds/steps) instead of load
+        row.next_weight = None
+        row.next_reps = min(_MAX_REPS_UNLOADED, reps + 1) if hit else max(1, goal_reps)
+    elif hit:
+        row.next_weight = int(weight) + step
+        row.next_reps = goal_reps
+    elif row.miss_streak >= 2 or goal_reps - reps > 2:
+        row.next_weight = _round_to(float(weight) * 0.9, step)
+        row.next_reps = goal_reps
+        row.miss_streak = 0
+    else:
+        row.next_weight = int(weight)
+        row.next_reps = goal_reps
+
+
+# Fields that depend on the order entries were folded in; an entry folded at
+# the head keeps their previous values so it can be taken back exactly.
+_ORDERED = ("ewma_e1rm", "last_weight", "last_reps", "hit_streak", "miss_streak", "next_weight", "next_reps")
+
+
+def _fold(row: ExerciseProgress, entry: ExerciseProgressEntry, r: Any, advance: bool) -> None:
+    if advance:
+        entry.prev_state = json.dumps({f: getattr(row, f) for f in _ORDERED})
+    observe(
+        row,
+        planned_reps=r["reps"],
+        planned_weight=r["target_weight"],
+        actual_reps=r["actual_reps"],
+        actual_weight=r["actual_weight"],
+        advance=advance,
+    )
+    entry.reps, entry.weight = _effective(r["reps"], r["target_weight"], r["actual_reps"], r["actual_weight"])
+    entry.e1rm = e1rm(entry.weight, entry.reps) if entry.weight and entry.reps else None
+
+
+def _unfold(session: Session, row: ExerciseProgress, entry: ExerciseProgressEntry, head: bool) -> None:
+    row.entries -= 1
+    row.total_reps -= entry.reps
+    if entry.e1rm is not None:
+        row.tonnage = max(0.0, row.tonnage - float(entry.weight or 0) * entry.reps)
+    if head and entry.prev_state is not None:
+        for f, v in json.loads(entry.prev_state).items():
+            setattr(row, f, v)
+    session.delete(entry)
+    if entry.e1rm is not None and row.best_e1rm is not None and entry.e1rm >= row.best_e1rm:
+        # The best entry went away: take the max of what is left (index range on user + key)
+        row.best_e1rm = session.exec(
+            select(func.max(ExerciseProgressEntry.e1rm)).where(
+                ExerciseProgressEntry.user_id == row.user_id, ExerciseProgressEntry.exercise_key == row.exercise_key,
+            )
+        ).one()
+
+
+def _position(e: ExerciseProgressEntry) -> Tuple[datetime, int, int]:
+    return (e.session_date, e.session_id, e.order_index)
+
+
+def record(session: Session, user_id: int, ex: Any, when: datetime) -> Optional[ExerciseProgress]:
+    """Apply one exercise's change to its aggregates; caller commits.
+
+    ``ex`` needs id, name, session_id, order_index, reps, target_weight,
+    complete, actual_reps and actual_weight; ``when`` is its session date.
+    The entry's previous contribution (if any) is taken out and the new one
+    folded in, so repeated PATCHes never double count and late actuals
+    replace the planned values. Correcting or un-completing the latest entry
+    restores the exact prior state; an edit behind it adjusts the totals and
+    best e1RM only (``rebuild`` replays the full order).
+    """
+    name = getattr(ex, "name", None)
+    if not name:
+        return None
+    key = exercise_key(name)
+    old = session.get(ExerciseProgressEntry, ex.id)
+    r = {k: getattr(ex, k, None) for k in ("reps", "target_weight", "actual_reps", "actual_weight")}
+    if old is None and not ex.complete:
+        return None
+    if old is not None and ex.complete and (old.reps, old.weight) == _effective(r["reps"], r["target_weight"], r["actual_reps"], r["actual_weight"]):
+        return None
+
+    row = session.exec(
+        select(ExerciseProgress).where(ExerciseProgress.user_id == user_id, ExerciseProgress.exercise_key == key)
+    ).first()
+    head = session.exec(
+        select(ExerciseProgressEntry)
+        .where(ExerciseProgressEntry.user_id == user_id, ExerciseProgressEntry.exercise_key == key)
+        .order_by(
+            ExerciseProgressEntry.session_date.desc(),
+            ExerciseProgressEntry.session_id.desc(),
+            ExerciseProgressEntry.order_index.desc(),
+        )
+        .limit(1)
+    ).first()
+    entry = ExerciseProgressEntry(
+        exercise_id=ex.id, user_id=user_id, exercise_key=key,
+        session_date=when, session_id=ex.session_id, order_index=ex.order_index or 0,
+    )
+    if old is not None:
+        at_head = head is not None and head.exercise_id == old.exercise_id and old.prev_state is not None
+        if row is not None:
+            _unfold(session, row, old, at_head)
+        else:
+            session.delete(old)
+        session.flush()
+    else:
+        at_head = head is None or _position(entry) > _position(head)
+
+    if ex.complete:
+        if row is None:
+            row = ExerciseProgress(user_id=user_id, exercise_key=key, name=name)
+        _fold(row, entry, r, at_head)
+        session.add(entry)
+    if row is None:
+        return None
+    if row.entries <= 0:
+        session.delete(row)
+        return None
+    session.add(row)
+    return row
+
+
+def rebuild(session: Session, user_id: int) -> int:
+    """Recompute every aggregate and entry for ``user_id`` from history in one pass; caller commits."""
+    session.exec(text("DELETE FROM exercise_progress_entries WHERE user_id=:uid").bindparams(uid=user_id))
+    session.exec(text("DELETE FROM exercise_progress WHERE user_id=:uid").bindparams(uid=user_id))
+    rows = session.exec(
+        text("""
+            SELECT e.id, e.session_id, e.order_index, s.date, e.name, e.reps, e.target_weight, e.actual_reps, e.actual_weight
+            FROM workout_exercises e
+            JOIN workout_sessions s ON s.id = e.session_id
+            WHERE s.user_id = :uid AND e.complete = true
+            ORDER BY s.date, e.session_id, e.order_index
+        """).bindparams(uid=user_id)
+    ).mappings().all()
+    state: Dict[str, ExerciseProgress] = {}
+    for r in rows:
+        key = exercise_key(r["name"])
+        row = state.get(key)
+        if row is None:
+            row = state[key] = ExerciseProgress(user_id=user_id, exercise_key=key, name=r["name"])
+        entry = ExerciseProgressEntry(
+            exercise_id=r["id"], user_id=user_id, exercise_key=key,
+            session_date=r["date"], session_id=r["session_id"], order_index=r["order_index"],
+        )
+        _fold(row, entry, r, True)
+        session.add(entry)
+    for row in state.values():
+        session.add(row)
+    return len(state)
+
+
+def targets(session: Session, user_id: int) -> Dict[str, ExerciseProgress]:
+    rows = session.exec(select(ExerciseProgress).where(ExerciseProgress.user_id == user_id)).all()
+    return {r.exercise_key: r for r in rows}
+
+
+def apply_targets(sessions: List[Dict[str, Any]], progress: Dict[str, ExerciseProgress]) -> int:
+    """Fill ``target_weight``/``reps`` on generated exercises in place; returns exercises touched."""
+    touched = 0
+    for s in sessions:
+        for e in s.get("exercises") or []:
+            row = progress.get(exercise_key(e.get("name") or ""))
+            if row is None or row.next_reps is None:
+                continue
+            planned = e.get("reps")
+            if row.next_weight is None:
+                e["reps"] = row.next_reps
+            elif planned and planned != row.next_reps and row.ewma_e1rm:
+                e["target_weight"] = weight_for_reps(row.ewma_e1rm, planned, _increment(row.name))
+            else:
+                e["target_weight"] = row.next_weight
+                e["reps"] = row.next_reps
+            touched += 1
+    return touched
+
+
+def to_dict(row: ExerciseProgress) -> Dict[str, Any]:
+    return {
+        "name": row.name,
+        "entries": row.entries,
+        "total_reps": row.total_reps,
+        "tonnage": round(row.tonnage, 1),
+        "best_e1rm": round(row.best_e1rm, 1) if row.best_e1rm is not None else None,
+        "e1rm": round(row.ewma_e1rm, 1) if row.ewma_e1rm is not None else None,
+        "last_weight": row.last_weight,
+        "last_reps": row.last_reps,
+        "next_weight": row.next_weight,
+        "next_reps": row.next_reps,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
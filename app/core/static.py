@@ -0,0 +1,54 @@
+"""
+Static files for the built UI bundle (``vite build`` -> ui/dist).
+
+``PrecompressedStaticFiles`` serves ``<file>.br`` / ``<file>.gz`` next to the
+original when the client accepts that encoding (made at build time by
+scripts/precompress_ui.py), so bundles are compressed once at max level
+instead of per request. Vite's content-hashed ``assets/`` are cached as
+immutable for a year; everything else (index.html) must revalidate so a new
+deploy is picked up on the next load.
+"""
+from __future__ import annotations
+
+from typing import Tuple
+import mimetypes
+import stat
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from app.core.compression import accepted_encodings
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+_VARIANTS: Tuple[Tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def __init__(self, *args, immutable_prefix: str = "assets/", **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.immutable_prefix = immutable_prefix
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        resp = None
+        if not path.endswith((".br", ".gz")):
+            acc = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+            star = acc.get("*", 0.0)
+            for enc, ext in _VARIANTS:
+                if acc.get(enc, star) <= 0:
+                    continue
+                full, st = self.lookup_path(path + ext)
+                if st is not None and stat.S_ISREG(st.st_mode):
+                    resp = self.file_response(full, st, scope)
+                    ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                    resp.headers["content-encoding"] = enc
+                    resp.headers["content-type"] = ctype + ("; charset=utf-8" if ctype.startswith("text/") else "")
+                    break
+        if resp is None:
+            resp = await super().get_response(path, scope)
+        if resp.status_code in (200, 304):
+            resp.headers["vary"] = "Accept-Encoding"
+            resp.headers["cache-control"] = IMMUTABLE if path.replace("\\", "/").startswith(self.immutable_prefix) else REVALIDATE
+        return resp
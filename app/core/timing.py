@@ -0,0 +1,159 @@
+"""
+Per-request timing breakdown, surfaced as ``Server-Timing`` and a log line.
+
+``TimingMiddleware`` puts a fresh ``Timings`` in a context variable for each
+HTTP request; code on the request path adds to it with ``add``/``measure``
+(no-ops outside a request, e.g. in job workers). Context variables follow the
+request into threadpool calls, so sync endpoints are covered too.
+
+Metrics recorded:
+  db         time in cursor.execute (SQLAlchemy cursor events; desc = query count)
+  rls        RLS set/reset (also counted in db)
+  llm        time the request waited on the LLM (cache lookups included)
+  serialize  JSON rendering of the response body
+  queue      admission-control wait
+  total      request start to response headers
+
+Values are wall-clock sums: work done concurrently (onboarding builds the diet
+plan and workouts in parallel) can add up to more than ``total``.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import json
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+log = logging.getLogger("app.timing")
+
+_ORDER = ("db", "rls", "llm", "serialize", "queue")
+
+
+class Timings:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.metrics: Dict[str, List[float]] = {}  # name -> [ms, count]
+
+    def add(self, name: str, ms: float, count: int = 1) -> None:
+        with self._lock:
+            m = self.metrics.setdefault(name, [0.0, 0])
+            m[0] += ms
+            m[1] += count
+
+    def header(self, total_ms: float) -> str:
+        parts = []
+        with self._lock:
+            items = sorted(self.metrics.items(), key=lambda kv: _ORDER.index(kv[0]) if kv[0] in _ORDER else len(_ORDER))
+            for name, (ms, count) in items:
+                desc = f';desc="{int(count)} queries"' if name == "db" else ""
+                parts.append(f"{name};dur={ms:.1f}{desc}")
+        parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+    def fields(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        with self._lock:
+            for name, (ms, count) in self.metrics.items():
+                out[f"{name}_ms"] = round(ms, 1)
+                if name == "db":
+                    out["db_queries"] = int(count)
+        return out
+
+
+_current: ContextVar[Optional[Timings]] = ContextVar("server_timing", default=None)
+
+
+def current() -> Optional[Timings]:
+    return _current.get()
+
+
+def add(name: str, ms: float, count: int = 1) -> None:
+    t = _current.get()
+    if t is not None:
+        t.add(name, ms, count)
+
+
+@contextmanager
+def measure(name: str) -> Iterator[None]:
+    t = _current.get()
+    if t is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        t.add(name, (time.perf_counter() - t0) * 1000.0)
+
+
+def install(engine: Engine) -> None:
+    """Attribute cursor execution time on ``engine`` to the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, params: Any, context: Any, executemany: bool) -> None:
+        if _current.get() is not None:
+            conn.info.setdefault("_timing_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, params: Any, context: Any, executemany: bool) -> None:
+        stack = conn.info.get("_timing_t0")
+        if stack:
+            add("db", (time.perf_counter() - stack.pop()) * 1000.0)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx: Any) -> None:
+        conn = ctx.connection
+        stack = conn.info.get("_timing_t0") if conn is not None else None
+        if stack:
+            add("db", (time.perf_counter() - stack.pop()) * 1000.0)
+
+
+class TimingMiddleware:
+    """Adds ``Server-Timing`` to every HTTP response and logs one JSON line per
+    request that took at least ``log_min_ms`` (the stream's full duration for
+    streaming responses; the header only covers time to first byte)."""
+
+    def __init__(self, app: ASGIApp, *, log_min_ms: float = 500.0) -> None:
+        self.app = app
+        self.log_min_ms = float(log_min_ms)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = Timings()
+        token = _current.set(timings)
+        status: List[int] = [0]
+        ttfb: List[float] = [0.0]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                ttfb[0] = (time.perf_counter() - timings.start) * 1000.0
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header(ttfb[0]).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            total = (time.perf_counter() - timings.start) * 1000.0
+            if total >= self.log_min_ms:
+                log.info("request %s", json.dumps({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status[0],
+                    "total_ms": round(total, 1),
+                    "ttfb_ms": round(ttfb[0], 1),
+                    **timings.fields(),
+                }))
@@ -0,0 +1,134 @@
+"""
+Today view: one user's day in one query.
+
+``load`` fetches, in a single round trip of CTEs, the day's meal checks and
+logged meals, its workout sessions with exercises (as nested JSON), and the
+latest weight and glucose readings. ``current_plan`` picks the plan-store file
+covering the day; ``build`` merges the plan's meals with their check state.
+
+Results are cached by the caller on the user's meals/workouts/trackers
+version counters plus the plan file's mtime, so any relevant write (or a new
+plan) changes the key.
+"""
+from __future__ import annotations
+
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+_SQL = text("""
+    WITH checks AS (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'id', c.id, 'title', c.title, 'complete', c.complete, 'completed_at', c.completed_at
+               ) ORDER BY c.id), '[]'::json) AS v
+        FROM meal_checks c
+        WHERE c.user_id = :uid AND CAST(c.date AS date) = :day
+    ),
+    logged AS (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'id', m.id, 'title', m.name, 'time', to_char(m.eaten_at, 'HH24:MI'), 'kcal', m.total_calories
+               ) ORDER BY m.eaten_at, m.id), '[]'::json) AS v
+        FROM meals m
+        WHERE m.user_id = :uid AND CAST(m.eaten_at AS date) = :day
+    ),
+    sessions AS (
+        SELECT COALESCE(json_agg(json_build_object(
+                   'id', s.id, 'title', s.title, 'location', s.location, 'time', to_char(s.date, 'HH24:MI'),
+                   'exercises', (
+                       SELECT COALESCE(json_agg(json_build_object(
+                                  'id', e.id, 'name', e.name, 'machine', e.machine, 'sets', e.sets, 'reps', e.reps,
+                                  'target_weight', e.target_weight, 'rest_sec', e.rest_sec, 'complete', e.complete,
+                                  'actual_reps', e.actual_reps, 'actual_weight', e.actual_weight
+                              ) ORDER BY e.order_index, e.id), '[]'::json)
+                       FROM workout_exercises e WHERE e.session_id = s.id
+                   )
+               ) ORDER BY s.date, s.id), '[]'::json) AS v
+        FROM workout_sessions s
+        WHERE s.user_id = :uid AND CAST(s.date AS date) = :day
+    ),
+    weight AS (
+        SELECT json_build_object('id', w.id, 'when', w."when", 'weight_lb', w.weight_lb) AS v
+        FROM weight_logs w WHERE w.user_id = :uid ORDER BY w."when" DESC LIMIT 1
+    ),
+    glucose AS (
+        SELECT json_build_object('id', g.id, 'when', g."when", 'mg_dL', g."mg_dL") AS v
+        FROM glucose_logs g WHERE g.user_id = :uid ORDER BY g."when" DESC LIMIT 1
+    )
+    SELECT (SELECT v FROM checks), (SELECT v FROM logged), (SELECT v FROM sessions),
+           (SELECT v FROM weight), (SELECT v FROM glucose)
+""")
+
+
+def load(session: Session, user_id: int, day: date) -> Dict[str, Any]:
+    row = session.exec(_SQL.bindparams(uid=user_id, day=day)).first()
+    checks, logged, sessions, weight, glucose = row if row else ([], [], [], None, None)
+    return {"checks": checks or [], "logged": logged or [], "workouts": sessions or [], "weight": weight, "glucose": glucose}
+
+
+def current_plan(plans_dir: Path, day: date) -> Optional[Tuple[Path, int]]:
+    """Newest plan file starting on or before ``day`` (files are named <start>.json)."""
+    if not plans_dir.exists():
+        return None
+    key = day.isoformat()
+    best = None
+    for fp in plans_dir.glob("*.json"):
+        if fp.stem <= key and (best is None or fp.stem > best.stem):
+            best = fp
+    if best is None:
+        return None
+    try:
+        return best, best.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def plan_day(fp: Path, day: date) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """(plan summary, the plan's entry for ``day``) or (None, None)."""
+    try:
+        with fp.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None, None
+    key = day.isoformat()
+    for d in data.get("days") or []:
+        if str(d.get("date")) == key:
+            summary = {"start": data.get("start") or fp.stem, "end": data.get("end"), "label": data.get("label", "Auto Plan")}
+            return summary, d
+    return None, None
+
+
+def build(day: date, rows: Dict[str, Any], plan: Optional[Dict[str, Any]], pday: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    checks = {c["title"]: c for c in rows["checks"]}
+    if pday is not None:
+        source = "plan"
+        meals: List[Dict[str, Any]] = [dict(m) for m in (pday.get("meals") or [])]
+    else:
+        source = "logged" if rows["logged"] else None
+        meals = [dict(m) for m in rows["logged"]]
+    seen = set()
+    for m in meals:
+        c = checks.get(m.get("title"))
+        m["complete"] = bool(c and c["complete"])
+        m["completed_at"] = c["completed_at"] if c else None
+        seen.add(m.get("title"))
+    # checked-off meals that aren't in the plan (renamed / ad hoc)
+    for title, c in checks.items():
+        if title not in seen:
+            meals.append({"title": title, "time": None, "complete": bool(c["complete"]), "completed_at": c["completed_at"]})
+    done = sum(1 for m in meals if m["complete"])
+    ex = [e for s in rows["workouts"] for e in s.get("exercises") or []]
+    return {
+        "date": day.isoformat(),
+        "plan": plan,
+        "meals": {"source": source, "items": meals, "total": len(meals), "completed": done},
+        "workouts": {
+            "sessions": rows["workouts"],
+            "exercises_total": len(ex),
+            "completed": sum(1 for e in ex if e.get("complete")),
+        },
+        "trackers": {"weight": rows["weight"], "glucose": rows["glucose"]},
+    }
@@ -0,0 +1,223 @@
+"""
+Ingredient quantity/unit parsing and grocery aggregation.
+
+``parse("1 1/2 tbsp olive oil")`` splits a recipe line into quantity, unit and
+canonical ingredient and converts the amount to a base unit per dimension
+(mass -> g, volume -> ml, count -> each). Parsing is one compiled regex and
+results are memoized, since plans repeat the same few dozen lines.
+
+``aggregate`` sums lines per canonical ingredient, converting across units of
+the same dimension (and between volume and mass for ingredients with a known
+density), so "1 tbsp olive oil" and "1 tsp olive oil" become one line.
+``packages`` turns a total into whole purchasable packages of a catalog SKU.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+import math
+import re
+
+# unit alias -> (canonical unit, dimension, base units per 1)
+_UNITS: Dict[str, Tuple[str, str, float]] = {}
+for _aliases, _canon, _dim, _base in (
+    (("g", "gram", "grams", "gr"), "g", "mass", 1.0),
+    (("kg", "kilogram", "kilograms"), "kg", "mass", 1000.0),
+    (("oz", "ounce", "ounces"), "oz", "mass", 28.3495),
+    (("lb", "lbs", "pound", "pounds"), "lb", "mass", 453.592),
+    (("ml", "milliliter", "milliliters"), "ml", "volume", 1.0),
+    (("l", "liter", "liters", "litre", "litres"), "l", "volume", 1000.0),
+    (("tsp", "teaspoon", "teaspoons"), "tsp", "volume", 4.92892),
+    (("tbsp", "tablespoon", "tablespoons", "tbs", "tbl"), "tbsp", "volume", 14.7868),
+    (("fl oz", "floz", "fluid ounce", "fluid ounces"), "fl oz", "volume", 29.5735),
+    (("cup", "cups"), "cup", "volume", 236.588),
+    (("pint", "pints", "pt"), "pint", "volume", 473.176),
+    (("quart", "quarts", "qt"), "quart", "volume", 946.353),
+    (("gal", "gallon", "gallons"), "gal", "volume", 3785.41),
+    (("each", "ea", "ct", "count", "whole", "piece", "pieces", "pc",
+      "slice", "slices", "can", "cans", "large", "medium", "small"), "each", "count", 1.0),
+    # parts of a purchasable unit: ~10 cloves per garlic head, ~8 leaves per lettuce head
+    (("clove", "cloves"), "clove", "count", 0.1),
+    (("leaf", "leaves"), "leaf", "count", 0.125),
+    (("dozen", "doz"), "dozen", "count", 12.0),
+    (("pinch", "dash"), "pinch", "count", 0.0),
+):
+    for _a in _aliases:
+        _UNITS[_a] = (_canon, _dim, _base)
+
+# grams per ml for ingredients bought by weight but measured by volume
+_DENSITY: Dict[str, float] = {
+    "spinach": 0.127, "mixed greens": 0.09, "romaine": 0.2, "broccoli": 0.38, "broccoli florets": 0.38,
+    "mixed vegetable": 0.55, "mixed veg": 0.55, "roasted vegetable": 0.55, "roasted veg": 0.55, "berries": 0.6, "oats": 0.34, "quinoa": 0.78,
+    "greek yogurt": 1.04, "yogurt": 1.04, "cottage cheese": 0.96, "honey": 1.42, "brown rice": 0.8,
+    "almonds": 0.6, "peanut butter": 1.08,
+}
+# typical count->grams for produce sold by weight
+_EACH_GRAMS: Dict[str, float] = {"onion": 150.0, "sweet potato": 200.0, "zucchini": 200.0, "tomato": 120.0, "banana": 120.0, "apple": 180.0}
+
+_FRACTIONS = {"½": ".5", "¼": ".25", "¾": ".75", "⅓": ".333", "⅔": ".667", "⅛": ".125"}
+_UNIT_ALT = "|".join(sorted((re.escape(u) for u in _UNITS), key=len, reverse=True))
+_LINE = re.compile(
+    r"^\s*(?P<qty>\d+\s+\d+/\d+|\d+/\d+|\d*\.\d+|\d+)?\s*"
+    rf"(?:(?P<unit>{_UNIT_ALT})\.?(?=\s|$))?\s*"
+    r"(?:of\s+)?(?P<name>.*?)\s*$",
+    re.IGNORECASE,
+)
+_PAREN = re.compile(r"\([^)]*\)")
+_DESCRIPTORS = {"fresh", "cooked", "raw", "chopped", "sliced", "diced", "minced", "frozen", "boneless", "skinless", "to", "taste", "optional"}
+
+
+@dataclass(frozen=True)
+class Parsed:
+    ingredient: str
+    qty: float
+    unit: Optional[str]
+    dimension: Optional[str]
+    base: Optional[float]  # amount in g / ml / each; None when there was no unit
+
+
+def _qty(s: Optional[str]) -> Optional[float]:
+    if not s:
+        return None
+    s = s.strip()
+    if " " in s:
+        whole, frac = s.split(None, 1)
+        return float(whole) + _qty(frac)  # type: ignore[operator]
+    if "/" in s:
+        n, d = s.split("/", 1)
+        return float(n) / float(d) if float(d) else None
+    return float(s)
+
+
+def canonical(name: str) -> str:
+    """'Quinoa (cooked)' -> 'quinoa', 'soy sauce or tamari' -> 'soy sauce', 'eggs' -> 'egg'."""
+    s = _PAREN.sub(" ", (name or "").lower())
+    s = re.split(r"\s+or\s+|,|;", s)[0]
+    words = [w for w in re.sub(r"[^a-z0-9\s-]", " ", s).replace("-", " ").split() if w not in _DESCRIPTORS]
+    if words:
+        last = words[-1]
+        if last.endswith("ies") and len(last) > 4 and last not in ("berries",):
+            words[-1] = last[:-3] + "y"
+        elif last.endswith("oes") and len(last) > 4:
+            words[-1] = last[:-2]
+        elif last.endswith("s") and not last.endswith(("ss", "us", "is", "berries", "greens", "oats", "florets", "leaves")) and len(last) > 3:
+            words[-1] = last[:-1]
+    return " ".join(words)
+
+
+@lru_cache(maxsize=8192)
+def parse(line: str) -> Parsed:
+    s = line or ""
+    for k, v in _FRACTIONS.items():
+        s = s.replace(k, v)
+    m = _LINE.match(s)
+    qty = _qty(m.group("qty")) if m else None
+    unit_raw = (m.group("unit") or "").lower() if m else ""
+    name = canonical(m.group("name") if m else s) or canonical(s)
+    # "4 each romaine leaves": the part word on the name scales the count
+    words = name.split()
+    if len(words) > 1 and words[-1] in _UNITS and _UNITS[words[-1]][0] in ("clove", "leaf") and unit_raw in ("", "each", "ea", "ct"):
+        unit_raw, name = words[-1], " ".join(words[:-1])
+    if unit_raw in _UNITS:
+        canon, dim, per = _UNITS[unit_raw]
+        q = 1.0 if qty is None else qty
+        return Parsed(name, q, canon, dim, q * per)
+    if qty is not None:
+        return Parsed(name, qty, "each", "count", qty)
+    return Parsed(name, 1.0, None, None, None)
+
+
+def _density(ingredient: str) -> Optional[float]:
+    if ingredient in _DENSITY:
+        return _DENSITY[ingredient]
+    for k, v in _DENSITY.items():
+        if k in ingredient:
+            return v
+    return None
+
+
+def convert(amount: float, dim: str, to_unit: str, ingredient: str = "") -> Optional[float]:
+    """Convert ``amount`` base units of ``dim`` into ``to_unit`` (None if impossible)."""
+    if to_unit not in _UNITS:
+        return None
+    _, to_dim, per = _UNITS[to_unit]
+    if dim == to_dim:
+        return amount / per
+    if dim == "volume" and to_dim == "mass":
+        d = _density(ingredient)
+        return amount * d / per if d else None
+    if dim == "mass" and to_dim == "volume":
+        d = _density(ingredient)
+        return amount / d / per if d else None
+    if dim == "count" and to_dim == "mass" and ingredient in _EACH_GRAMS:
+        return amount * _EACH_GRAMS[ingredient] / per
+    return None
+
+
+@dataclass
+class Line:
+    ingredient: str
+    dimension: Optional[str]
+    base: float      # summed amount in g / ml / each (0 for unit-less lines)
+    uses: float      # how many recipe lines contributed
+
+    def display(self) -> Tuple[float, Optional[str]]:
+        """Human-sized amount: g->oz/lb, ml->tsp/tbsp/cup, count->each."""
+        if self.dimension == "mass":
+            oz = self.base / 28.3495
+            return (round(oz / 16, 2), "lb") if oz >= 16 else (round(oz, 1), "oz")
+        if self.dimension == "volume":
+            for u in ("cup", "tbsp", "tsp"):
+                v = self.base / _UNITS[u][2]
+                if v >= 1 or u == "tsp":
+                    return round(v, 2), u
+        if self.dimension == "count":
+            return round(self.base, 2), "each"
+        return self.uses, None
+
+
+def aggregate(lines: Iterable[str] | Dict[str, float]) -> Dict[str, Line]:
+    """Sum recipe lines per canonical ingredient. A dict maps line -> times used.
+
+    Lines of one ingredient in different dimensions are folded into the first
+    dimension seen when a density makes that possible; otherwise the mass or
+    volume total wins and count-only uses are kept in ``uses``.
+    """
+    if isinstance(lines, dict):
+        counts = lines
+    else:
+        counts = {}
+        for l in lines:
+            counts[l] = counts.get(l, 0.0) + 1.0
+    out: Dict[str, Line] = {}
+    for raw, n in counts.items():
+        p = parse(str(raw))
+        if not p.ingredient:
+            continue
+        cur = out.get(p.ingredient)
+        if cur is None:
+            cur = out[p.ingredient] = Line(p.ingredient, p.dimension, 0.0, 0.0)
+        cur.uses += n
+        if p.base is None or p.dimension is None:
+            continue
+        if cur.dimension is None:
+            cur.dimension = p.dimension
+        if p.dimension == cur.dimension:
+            cur.base += p.base * n
+            continue
+        conv = convert(p.base * n, p.dimension, "g" if cur.dimension == "mass" else "ml" if cur.dimension == "volume" else "each", p.ingredient)
+        if conv is not None:
+            cur.base += conv
+    return out
+
+
+def packages(line: Line, size: float, unit: str) -> Optional[int]:
+    """Whole packages of ``size`` ``unit`` needed to cover ``line`` (None if the units don't convert)."""
+    if line.dimension is None or size <= 0:
+        return None
+    need = convert(line.base, line.dimension, unit, line.ingredient)
+    if need is None:
+        return None
+    # allow 2% slack so 16.0 oz of a 1 lb package is one package, not two
+    return max(1, math.ceil(need / size - 0.02))
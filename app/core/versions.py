@@ -0,0 +1,105 @@
+"""
+Per-user data versions and a small LRU for version-keyed caches.
+
+``bump`` increments the (user, scope) counter in the caller's transaction, so
+the new version becomes visible exactly when the write commits. Readers key
+cached results on the version they read; a write simply makes the old key
+unreachable, and the LRU ages it out. No invalidation messages are needed,
+which keeps caches consistent across gunicorn workers.
+
+The same counters back HTTP validators: ``etag`` turns (user, scope,
+version) into a weak ETag, so a conditional GET is answered from one
+primary-key lookup.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence
+import threading
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+GROCERIES = "groceries"
+INTAKE = "intake"
+MEALS = "meals"
+WORKOUTS = "workouts"
+TRACKERS = "trackers"  # weight, glucose and meal checklists
+
+
+def bump(session: Session, user_id: int, scope: str) -> int:
+    row = session.exec(
+        text("""
+            INSERT INTO user_versions (user_id, scope, version, updated_at)
+            VALUES (:uid, :scope, 1, CURRENT_TIMESTAMP)
+            ON CONFLICT (user_id, scope) DO UPDATE
+            SET version = user_versions.version + 1, updated_at = CURRENT_TIMESTAMP
+            RETURNING version
+        """).bindparams(uid=user_id, scope=scope)
+    ).first()
+    return int(row[0]) if row else 0
+
+
+def get(session: Session, user_id: int, scope: str) -> int:
+    row = session.exec(
+        text("SELECT version FROM user_versions WHERE user_id=:uid AND scope=:scope").bindparams(uid=user_id, scope=scope)
+    ).first()
+    return int(row[0]) if row else 0
+
+
+def get_many(session: Session, user_id: int, scopes: Sequence[str]) -> Dict[str, int]:
+    """Several scopes in one lookup (missing scopes are 0)."""
+    rows = session.exec(
+        text("SELECT scope, version FROM user_versions WHERE user_id=:uid AND scope = ANY(:scopes)").bindparams(uid=user_id, scopes=list(scopes))
+    ).all()
+    found = {r[0]: int(r[1]) for r in rows}
+    return {s: found.get(s, 0) for s in scopes}
+
+
+def etag(user_id: int, scope: str, version: int | str, salt: str = "") -> str:
+    """Weak validator for a user's ``scope`` at ``version``; ``salt`` (e.g. the
+    app version) retires old tags when the representation changes."""
+    return f'W/"{scope}-{user_id}-{version}{"-" + salt if salt else ""}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """Weak comparison against an If-None-Match header (list or ``*``)."""
+    if not if_none_match:
+        return False
+    want = tag[2:] if tag.startswith("W/") else tag
+    for cand in if_none_match.split(","):
+        cand = cand.strip()
+        if cand == "*":
+            return True
+        if (cand[2:] if cand.startswith("W/") else cand) == want:
+            return True
+    return False
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = max(1, int(maxsize))
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,200 @@
+"""
+Weekly training-volume rollups (Postgres table ``workout_volume_weekly``).
+
+One row per (user, ISO week, exercise) with planned/completed exercise and set
+counts, reps and tonnage (reps x lb). Writers pass an exercise's contribution
+before and after a change to ``track`` and only the difference is upserted,
+so a write touches one rollup row regardless of history length. ``rebuild``
+recomputes a user's rollups from raw rows (backfill / repair).
+
+``analytics`` reads past weeks from the rollups and computes only the current
+week from ``workout_exercises``, so it stays correct even for writes that
+bypassed ``track``.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.progression import exercise_key
+
+FIELDS = ("exercises_planned", "exercises_completed", "sets_planned", "sets_done", "reps", "tonnage")
+
+_GROUPS = (
+    ("legs", ("squat", "leg ", "lunge", "rdl", "deadlift", "hip thrust", "calf", "glute", "step-up")),
+    ("core", ("plank", "woodchop", "crunch", "ab ", "carry", "dead bug", "bird dog", "twist")),
+    ("pull", ("row", "pull", "curl", "lat ", "chin", "face pull", "shrug")),
+    ("push", ("press", "push", "dip", "fly", "raise", "triceps", "extension")),
+)
+
+
+def movement_group(name: str) -> str:
+    key = exercise_key(name) + " "
+    for group, words in _GROUPS:
+        if any(w in key for w in words):
+            return group
+    return "other"
+
+
+def week_start(d: date | datetime) -> date:
+    if isinstance(d, datetime):
+        d = d.date()
+    return d - timedelta(days=d.weekday())
+
+
+def contribution(ex: Optional[Mapping[str, Any]]) -> Dict[str, float]:
+    """What one exercise row adds to its week. ``ex`` needs sets, reps,
+    target_weight, complete, actual_reps, actual_weight (None = no row)."""
+    out = dict.fromkeys(FIELDS, 0)
+    if not ex:
+        return out
+    sets = int(ex.get("sets") or 0)
+    out["exercises_planned"] = 1
+    out["sets_planned"] = sets
+    if ex.get("complete"):
+        reps = int(ex.get("actual_reps") if ex.get("actual_reps") is not None else (ex.get("reps") or 0))
+        weight = ex.get("actual_weight") if ex.get("actual_weight") is not None else ex.get("target_weight")
+        total_reps = max(1, sets) * reps
+        out["exercises_completed"] = 1
+        out["sets_done"] = sets
+        out["reps"] = total_reps
+        out["tonnage"] = float(total_reps * (weight or 0))
+    return out
+
+
+def snapshot(obj: Any) -> Dict[str, Any]:
+    """Contribution inputs from an ORM row / namespace / mapping."""
+    get = obj.get if isinstance(obj, Mapping) else (lambda k: getattr(obj, k, None))
+    return {k: get(k) for k in ("sets", "reps", "target_weight", "complete", "actual_reps", "actual_weight")}
+
+
+def track(
+    session: Session,
+    user_id: int,
+    when: date | datetime,
+    name: str,
+    before: Optional[Mapping[str, Any]],
+    after: Optional[Mapping[str, Any]],
+) -> None:
+    """Upsert the before->after delta for one exercise into its week; caller commits."""
+    a, b = contribution(before), contribution(after)
+    delta = {k: b[k] - a[k] for k in FIELDS}
+    if not any(delta.values()):
+        return
+    session.exec(
+        text("""
+            INSERT INTO workout_volume_weekly
+                (user_id, week_start, exercise_key, name, movement_group,
+                 exercises_planned, exercises_completed, sets_planned, sets_done, reps, tonnage)
+            VALUES (:uid, :wk, :key, :name, :grp, :ep, :ec, :sp, :sd, :r, :t)
+            ON CONFLICT (user_id, week_start, exercise_key) DO UPDATE SET
+                exercises_planned = workout_volume_weekly.exercises_planned + EXCLUDED.exercises_planned,
+                exercises_completed = workout_volume_weekly.exercises_completed + EXCLUDED.exercises_completed,
+                sets_planned = workout_volume_weekly.sets_planned + EXCLUDED.sets_planned,
+                sets_done = workout_volume_weekly.sets_done + EXCLUDED.sets_done,
+                reps = workout_volume_weekly.reps + EXCLUDED.reps,
+                tonnage = workout_volume_weekly.tonnage + EXCLUDED.tonnage
+        """).bindparams(
+            uid=user_id, wk=week_start(when), key=exercise_key(name), name=name[:160], grp=movement_group(name),
+            ep=int(delta["exercises_planned"]), ec=int(delta["exercises_completed"]),
+            sp=int(delta["sets_planned"]), sd=int(delta["sets_done"]), r=int(delta["reps"]), t=float(delta["tonnage"]),
+        )
+    )
+
+
+def _raw_rows(session: Session, user_id: int, start: Optional[date] = None, end: Optional[date] = None) -> Iterable[Mapping[str, Any]]:
+    where = ["s.user_id = :uid"]
+    params: Dict[str, Any] = {"uid": user_id}
+    if start is not None:
+        where.append("s.date >= :start")
+        params["start"] = datetime.combine(start, datetime.min.time())
+    if end is not None:
+        where.append("s.date < :end")
+        params["end"] = datetime.combine(end, datetime.min.time())
+    return session.exec(
+        text(f"""
+            SELECT s.date, e.name, e.sets, e.reps, e.target_weight, e.complete, e.actual_reps, e.actual_weight
+            FROM workout_exercises e
+            JOIN workout_sessions s ON s.id = e.session_id
+            WHERE {' AND '.join(where)}
+        """).bindparams(**params)
+    ).mappings().all()
+
+
+def _fold(rows: Iterable[Mapping[str, Any]]) -> Dict[tuple, Dict[str, Any]]:
+    acc: Dict[tuple, Dict[str, Any]] = {}
+    for r in rows:
+        k = (week_start(r["date"]), exercise_key(r["name"]))
+        cur = acc.get(k)
+        if cur is None:
+            cur = acc[k] = {"week_start": k[0], "exercise_key": k[1], "name": r["name"], "movement_group": movement_group(r["name"]), **dict.fromkeys(FIELDS, 0)}
+        for f, v in contribution(r).items():
+            cur[f] += v
+    return acc
+
+
+def rebuild(session: Session, user_id: int) -> int:
+    """Recompute every weekly rollup for ``user_id`` from raw rows; caller commits."""
+    session.exec(text("DELETE FROM workout_volume_weekly WHERE user_id=:uid").bindparams(uid=user_id))
+    acc = _fold(_raw_rows(session, user_id))
+    for r in acc.values():
+        session.exec(
+            text("""
+                INSERT INTO workout_volume_weekly
+                    (user_id, week_start, exercise_key, name, movement_group,
+                     exercises_planned, exercises_completed, sets_planned, sets_done, reps, tonnage)
+                VALUES (:uid, :wk, :key, :name, :grp, :ep, :ec, :sp, :sd, :r, :t)
+            """).bindparams(
+                uid=user_id, wk=r["week_start"], key=r["exercise_key"], name=r["name"][:160], grp=r["movement_group"],
+                ep=r["exercises_planned"], ec=r["exercises_completed"], sp=r["sets_planned"],
+                sd=r["sets_done"], r=r["reps"], t=float(r["tonnage"]),
+            )
+        )
+    return len(acc)
+
+
+def _summary(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    tot = {f: sum(i[f] for i in items) for f in FIELDS}
+    tot["tonnage"] = round(float(tot["tonnage"]), 1)
+    tot["completion_rate"] = round(tot["exercises_completed"] / tot["exercises_planned"], 3) if tot["exercises_planned"] else None
+    return tot
+
+
+def analytics(session: Session, user_id: int, weeks: int = 12, by: str = "group", today: Optional[date] = None) -> Dict[str, Any]:
+    """Weekly series for the last ``weeks`` weeks (current week included), broken
+    down by movement group or exercise."""
+    current = week_start(today or date.today())
+    first = current - timedelta(weeks=max(1, weeks) - 1)
+    past = session.exec(
+        text("""
+            SELECT week_start, exercise_key, name, movement_group,
+                   exercises_planned, exercises_completed, sets_planned, sets_done, reps, tonnage
+            FROM workout_volume_weekly
+            WHERE user_id = :uid AND week_start >= :first AND week_start < :cur
+        """).bindparams(uid=user_id, first=first, cur=current)
+    ).mappings().all()
+    live = _fold(_raw_rows(session, user_id, current, current + timedelta(days=7))).values()
+
+    by_week: Dict[date, List[Dict[str, Any]]] = {}
+    for r in list(past) + list(live):
+        by_week.setdefault(r["week_start"], []).append(dict(r))
+
+    dim = "exercise_key" if by == "exercise" else "movement_group"
+    series = []
+    wk = first
+    while wk <= current:
+        items = by_week.get(wk, [])
+        parts: Dict[str, List[Dict[str, Any]]] = {}
+        for i in items:
+            parts.setdefault(i[dim] if dim == "movement_group" else i["name"], []).append(i)
+        series.append({
+            "week_start": wk.isoformat(),
+            "live": wk == current,
+            **_summary(items),
+            "breakdown": {k: _summary(v) for k, v in sorted(parts.items())},
+        })
+        wk += timedelta(weeks=1)
+    return {"weeks": len(series), "by": "exercise" if dim == "exercise_key" else "group", "series": series}
@@ -1,6 +1,5 @@
 import time
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import RedirectResponse
+from fastapi import FastAPI, HTTPException
 from app.core.db import engine
 from sqlmodel import SQLModel
 import os
@@ -9,9 +8,22 @@ from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
 from .core.logging import init_logging
 from .core.db import init_db
+from .core import jobs as _jobs
+from .core import events as _events
+from .core import catalog as _catalog
+from .core import price_history as _price_history
+from .core.fastjson import FastJSONResponse
+from .core.compression import CompressionMiddleware
+from .core.static import PrecompressedStaticFiles
+from .core.middleware import HTMLRedirectMiddleware, LazySessionMiddleware
+from .core.admission import AdmissionMiddleware, configure as _configure_admission
+from .core.timing import TimingMiddleware, install as _install_timing
 from .api.routes import router as api_router
 from .api.diet import router as diet_router
 from .api.auth import router as auth_router
+from .api.jobs import router as jobs_router
+from .api.batch import router as batch_router
+from .api.events import router as events_router
 
 init_logging(settings.LOG_LEVEL)
 ALLOW_ORIGINS = [
@@ -25,9 +37,14 @@ app = FastAPI(
     docs_url=("/docs" if settings.ENABLE_DOCS else None),
     redoc_url=None,
     openapi_url=("/openapi.json" if settings.ENABLE_DOCS else None),
+    default_response_class=FastJSONResponse,
 )
 
 
+# Innermost: sees the session user (fairness) and its 429s still get CORS headers
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, limiters=_configure_admission())
+
 # --- Unified DEV CORS (localhost + LAN) ---
 app.add_middleware(
     CORSMiddleware,
@@ -36,8 +53,21 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-from starlette.middleware.sessions import SessionMiddleware
-app.add_middleware(SessionMiddleware, secret_key=settings.SESSION_SECRET, max_age=settings.SESSION_MAX_AGE)
+# Cookie is only unsigned when a handler reads request.session; probes skip the layer
+app.add_middleware(
+    LazySessionMiddleware,
+    secret_key=settings.SESSION_SECRET,
+    max_age=settings.SESSION_MAX_AGE,
+    skip_paths=("/health", "/api/v1/status"),
+)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_enabled=settings.COMPRESSION_BROTLI,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
 # --- /Unified DEV CORS ---
 # CORS
 allow_origins = ["*"] if settings.CORS_ORIGINS == ["*"] else settings.CORS_ORIGINS
@@ -112,6 +142,21 @@ def _startup():
     init_db()
     _ensure_dev_user()
     _ensure_schema()
+    if settings.JOBS_ENABLED:
+        _jobs.start()
+    if settings.EVENTS_ENABLED:
+        _events.start()
+    if settings.PRICE_HISTORY_ENABLED:
+        import threading
+        threading.Thread(
+            target=lambda: _price_history.record_catalog(_catalog.get_catalog()),
+            name="price-history", daemon=True,
+        ).start()
+
+@app.on_event("shutdown")
+def _shutdown():
+    _jobs.stop()
+    _events.stop()
 
 @app.get("/")
 def read_root():
@@ -125,6 +170,9 @@ def health():
 app.include_router(api_router, prefix="/api/v1")
 app.include_router(auth_router, prefix="/api/v1/auth")
 app.include_router(diet_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
+app.include_router(batch_router, prefix="/api/v1")
+app.include_router(events_router, prefix="/api/v1")
 
 # --- Minimal landing page (served by FastAPI) ---
 from fastapi.responses import HTMLResponse
@@ -163,24 +211,18 @@ def app_page():
 </body>
 </html>"""
 
+# --- Built UI bundle (precompressed variants, immutable hashed assets) ---
+_ui_files = None
+if settings.UI_DIST_DIR and os.path.isdir(settings.UI_DIST_DIR):
+    _ui_files = PrecompressedStaticFiles(directory=settings.UI_DIST_DIR)
+
 # --- Redirect any HTML requests to the UI front page ---
-@app.middleware("http")
-async def _redirect_html_to_ui(request: Request, call_next):
-    try:
-        accept = request.headers.get("accept", "").lower()
-        path = request.url.path
-        if "text/html" in accept and not path.startswith("/api"):
-            # Build UI base target
-            ui_base = settings.UI_BASE
-            if not ui_base:
-                scheme = request.url.scheme or "http"
-                host = request.url.hostname or "localhost"
-                port = settings.UI_PORT
-                ui_base = f"{scheme}://{host}:{port}"
-            return RedirectResponse(url=ui_base, status_code=302)
-    except Exception:
-        pass
-    return await call_next(request)
+app.add_middleware(HTMLRedirectMiddleware, ui_base=settings.UI_BASE, ui_port=settings.UI_PORT, ui_files=_ui_files)
+
+# --- Server-Timing: outermost, so "total" covers every layer ---
+if settings.SERVER_TIMING_ENABLED:
+    _install_timing(engine)
+    app.add_middleware(TimingMiddleware, log_min_ms=settings.TIMING_LOG_MIN_MS)
 
 # --- Simple interactive UI at /ui ---
 from fastapi.responses import HTMLResponse
@@ -282,3 +324,7 @@ async function listGroceries(){
 </html>"""
 
 # Removed legacy intake endpoints; use app/api/diet.py for intake, meals, etc.
+
+# Mounted last so every API and page route above takes precedence
+if _ui_files is not None:
+    app.mount("/", _ui_files, name="ui")
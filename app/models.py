@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 import sqlalchemy as sa
 from sqlmodel import SQLModel, Field
@@ -150,3 +150,104 @@ class MealCheck(SQLModel, table=True):
     title: str = Field(sa_column=sa.Column(sa.String(160), nullable=False))
     complete: bool = Field(default=False, sa_column=sa.Column(sa.Boolean, index=True, nullable=False))
     completed_at: Optional[datetime] = Field(default=None, sa_column=sa.Column(sa.DateTime))
+
+class Job(SQLModel, table=True):
+    __tablename__ = 'jobs'
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(sa_column=sa.Column(sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), index=True, nullable=False))
+    kind: str = Field(sa_column=sa.Column(sa.String(32), nullable=False))
+    # queued -> running -> done | failed
+    status: str = Field(default='queued', sa_column=sa.Column(sa.String(16), index=True, nullable=False))
+    payload: Optional[str] = Field(default=None, sa_column=sa.Column(sa.Text))
+    result: Optional[str] = Field(default=None, sa_column=sa.Column(sa.Text))
+    error: Optional[str] = Field(default=None, sa_column=sa.Column(sa.Text))
+    attempts: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_column=sa.Column(sa.DateTime, index=True, nullable=False))
+    started_at: Optional[datetime] = Field(default=None, sa_column=sa.Column(sa.DateTime))
+    finished_at: Optional[datetime] = Field(default=None, sa_column=sa.Column(sa.DateTime))
+
+class LLMCacheEntry(SQLModel, table=True):
+    __tablename__ = 'llm_cache'
+    # sha256 of canonical (system, model, temperature, payload)
+    key: str = Field(sa_column=sa.Column(sa.String(64), primary_key=True))
+    kind: str = Field(sa_column=sa.Column(sa.String(32), nullable=False))
+    value: str = Field(sa_column=sa.Column(sa.Text, nullable=False))
+    size_bytes: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    hits: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_column=sa.Column(sa.DateTime, index=True, nullable=False))
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, sa_column=sa.Column(sa.DateTime, index=True, nullable=False))
+
+class ExerciseProgress(SQLModel, table=True):
+    __tablename__ = 'exercise_progress'
+    __table_args__ = (sa.UniqueConstraint('user_id', 'exercise_key', name='uq_exercise_progress_user_key'),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(sa_column=sa.Column(sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), index=True, nullable=False))
+    # lowercased, whitespace-collapsed exercise name
+    exercise_key: str = Field(sa_column=sa.Column(sa.String(160), nullable=False))
+    name: str = Field(sa_column=sa.Column(sa.String(160), nullable=False))
+    # running aggregates over every completed entry
+    entries: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    total_reps: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    tonnage: float = Field(default=0.0, sa_column=sa.Column(sa.Float, nullable=False))
+    best_e1rm: Optional[float] = Field(default=None, sa_column=sa.Column(sa.Float))
+    ewma_e1rm: Optional[float] = Field(default=None, sa_column=sa.Column(sa.Float))
+    last_weight: Optional[int] = Field(default=None, sa_column=sa.Column(sa.Integer))
+    last_reps: Optional[int] = Field(default=None, sa_column=sa.Column(sa.Integer))
+    hit_streak: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    miss_streak: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    # precomputed next-session targets
+    next_weight: Optional[int] = Field(default=None, sa_column=sa.Column(sa.Integer))
+    next_reps: Optional[int] = Field(default=None, sa_column=sa.Column(sa.Integer))
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column=sa.Column(sa.DateTime, nullable=False))
+
+class ExerciseProgressEntry(SQLModel, table=True):
+    __tablename__ = 'exercise_progress_entries'
+    __table_args__ = (sa.Index('ix_exercise_progress_entries_user_key', 'user_id', 'exercise_key', 'session_date', 'session_id', 'order_index'),)
+    # one row per completed workout exercise folded into exercise_progress
+    exercise_id: int = Field(sa_column=sa.Column(sa.Integer, sa.ForeignKey('workout_exercises.id', ondelete='CASCADE'), primary_key=True))
+    user_id: int = Field(sa_column=sa.Column(sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False))
+    exercise_key: str = Field(sa_column=sa.Column(sa.String(160), nullable=False))
+    session_date: datetime = Field(sa_column=sa.Column(sa.DateTime, nullable=False))
+    session_id: int = Field(sa_column=sa.Column(sa.Integer, nullable=False))
+    order_index: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    # what the entry added to the totals
+    reps: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    weight: Optional[int] = Field(default=None, sa_column=sa.Column(sa.Integer))
+    e1rm: Optional[float] = Field(default=None, sa_column=sa.Column(sa.Float))
+    # JSON of the order-dependent progress fields before this entry was folded;
+    # NULL when the entry arrived behind a later one and only added to the totals
+    prev_state: Optional[str] = Field(default=None, sa_column=sa.Column(sa.Text))
+
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__ = 'idempotency_keys'
+    user_id: int = Field(sa_column=sa.Column(sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True))
+    key: str = Field(sa_column=sa.Column(sa.String(128), primary_key=True))
+    scope: str = Field(sa_column=sa.Column(sa.String(64), nullable=False))
+    # sha256 of the canonical request body; a reused key with a different body is rejected
+    fingerprint: str = Field(sa_column=sa.Column(sa.String(64), nullable=False))
+    response: Optional[str] = Field(default=None, sa_column=sa.Column(sa.Text))
+    created_at: datetime = Field(default_factory=datetime.utcnow, sa_column=sa.Column(sa.DateTime, index=True, nullable=False))
+
+class WorkoutVolumeWeekly(SQLModel, table=True):
+    __tablename__ = 'workout_volume_weekly'
+    user_id: int = Field(sa_column=sa.Column(sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True))
+    # Monday of the ISO week the session falls in
+    week_start: date = Field(sa_column=sa.Column(sa.Date, primary_key=True))
+    exercise_key: str = Field(sa_column=sa.Column(sa.String(160), primary_key=True))
+    name: str = Field(sa_column=sa.Column(sa.String(160), nullable=False))
+    movement_group: str = Field(sa_column=sa.Column(sa.String(16), index=True, nullable=False))
+    exercises_planned: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    exercises_completed: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    sets_planned: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    sets_done: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    reps: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False))
+    tonnage: float = Field(default=0.0, sa_column=sa.Column(sa.Float, nullable=False))
+
+class UserVersion(SQLModel, table=True):
+    __tablename__ = 'user_versions'
+    # per-user monotonically increasing counter per data scope (e.g. 'groceries'),
+    # bumped in the same transaction as every write to that scope
+    user_id: int = Field(sa_column=sa.Column(sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True))
+    scope: str = Field(sa_column=sa.Column(sa.String(32), primary_key=True))
+    version: int = Field(default=0, sa_column=sa.Column(sa.BigInteger, nullable=False))
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column=sa.Column(sa.DateTime, nullable=False))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Requests-per-second benchmark for the per-request middleware layers.
+
+In-process (default): builds the same tiny app twice and drives it with raw
+ASGI calls (no sockets, so only framework overhead is measured):
+  before  Starlette SessionMiddleware + the old ``@app.middleware("http")``
+          HTML redirect (BaseHTTPMiddleware / call_next)
+  after   LazySessionMiddleware + HTMLRedirectMiddleware (app.core.middleware)
+Every request carries a valid session cookie, as a logged-in browser would.
+Paths: /health (probe), /api/v1/status (poll), /api/v1/auth/me (reads the
+session, so both stacks unsign the cookie).
+
+Live (--base): GETs the given paths on a running API with N threads, to
+compare two deployments.
+
+Usage:
+  PYTHONPATH=. python scripts/bench_asgi.py --requests 20000
+  python scripts/bench_asgi.py --base http://127.0.0.1:8010 --paths /health,/api/v1/status
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import RedirectResponse
+
+PATHS = ("/health", "/api/v1/status", "/api/v1/auth/me")
+SECRET = "bench-secret"
+
+
+def log(msg: str) -> None:
+    print(f"[bench] {msg}", flush=True)
+
+
+def build(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+
+    @app.get("/api/v1/status")
+    def status():
+        return {"ok": True, "version": "bench"}
+
+    @app.get("/api/v1/auth/me")
+    def me(request: Request):
+        return {"id": request.session.get("user_id")}
+
+    if stack == "before":
+        from starlette.middleware.sessions import SessionMiddleware
+
+        app.add_middleware(SessionMiddleware, secret_key=SECRET, max_age=3600)
+
+        @app.middleware("http")
+        async def _redirect_html_to_ui(request: Request, call_next):
+            try:
+                accept = request.headers.get("accept", "").lower()
+                if "text/html" in accept and not request.url.path.startswith("/api"):
+                    return RedirectResponse(url=f"http://{request.url.hostname}:8080", status_code=302)
+            except Exception:
+                pass
+            return await call_next(request)
+    else:
+        from app.core.middleware import HTMLRedirectMiddleware, LazySessionMiddleware
+
+        app.add_middleware(LazySessionMiddleware, secret_key=SECRET, max_age=3600, skip_paths=("/health", "/api/v1/status"))
+        app.add_middleware(HTMLRedirectMiddleware, ui_base=None, ui_port=8080)
+    return app
+
+
+def session_cookie() -> str:
+    from base64 import b64encode
+    import itsdangerous
+
+    signer = itsdangerous.TimestampSigner(SECRET)
+    return signer.sign(b64encode(json.dumps({"user_id": 1, "started_at": int(time.time())}).encode())).decode()
+
+
+async def drive(app: Any, path: str, n: int, cookie: str) -> float:
+    scope_base = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "server": ("127.0.0.1", 8010), "client": ("127.0.0.1", 50000),
+        "headers": [(b"host", b"127.0.0.1:8010"), (b"accept", b"application/json"), (b"cookie", f"session={cookie}".encode())],
+    }
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    status: List[int] = []
+
+    async def send(message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope_base), receive, send)
+    wall = time.perf_counter() - t0
+    bad = sum(1 for s in status if s >= 400)
+    if bad:
+        log(f"{path}: {bad} error responses")
+    return n / wall
+
+
+def in_process(n: int) -> List[Dict[str, Any]]:
+    cookie = session_cookie()
+    apps = {name: build(name) for name in ("before", "after")}
+    rows = []
+    header = f"{'path':<18} {'before_rps':>11} {'after_rps':>10} {'speedup':>8}"
+    print(header)
+    print("-" * len(header))
+    for path in PATHS:
+        rps = {}
+        for name, app in apps.items():
+            asyncio.run(drive(app, path, min(n, 500), cookie))  # warm-up
+            rps[name] = asyncio.run(drive(app, path, n, cookie))
+        rows.append({"path": path, "before_rps": round(rps["before"]), "after_rps": round(rps["after"])})
+        print(f"{path:<18} {rps['before']:>11.0f} {rps['after']:>10.0f} {rps['after'] / rps['before']:>7.2f}x")
+    return rows
+
+
+def live(base: str, paths: List[str], n: int, conc: int) -> List[Dict[str, Any]]:
+    try:
+        import httpx
+    except Exception:
+        print("[bench] httpx is required for --base (pip install httpx)")
+        raise SystemExit(2)
+    rows = []
+    with httpx.Client(base_url=base, limits=httpx.Limits(max_connections=conc, max_keepalive_connections=conc)) as client:
+        for path in paths:
+            def one(_: int) -> bool:
+                try:
+                    return client.get(path).status_code < 400
+                except Exception:
+                    return False
+            with ThreadPoolExecutor(max_workers=conc) as ex:
+                list(ex.map(one, range(min(n, 200))))  # warm-up
+                t0 = time.perf_counter()
+                ok = sum(ex.map(one, range(n)))
+                wall = time.perf_counter() - t0
+            rows.append({"path": path, "ok": ok, "errors": n - ok, "rps": round(ok / wall, 1)})
+            print(f"{path:<24} ok={ok:<6} err={n - ok:<4} rps={ok / wall:.1f}")
+    return rows
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark middleware overhead (requests per second)")
+    ap.add_argument("--requests", type=int, default=20000, help="requests per path")
+    ap.add_argument("--base", default=None, help="benchmark a running API instead of the in-process stacks")
+    ap.add_argument("--paths", default="/health,/api/v1/status", help="paths for --base")
+    ap.add_argument("--concurrency", type=int, default=8, help="client threads for --base")
+    ap.add_argument("--json", dest="json_out", default=None, help="also write results to this file")
+    args = ap.parse_args(argv)
+
+    if args.base:
+        log(f"target {args.base}, {args.requests} requests per path, {args.concurrency} threads")
+        rows = live(args.base, [p.strip() for p in args.paths.split(",") if p.strip()], args.requests, args.concurrency)
+    else:
+        log(f"in-process, {args.requests} sequential requests per path")
+        rows = in_process(args.requests)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"results": rows}, f, indent=2)
+        log(f"wrote {args.json_out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for the LLM-backed endpoints.
+
+Drives POST /plans/generate and POST /workouts/generate on a running API at
+several concurrency levels and reports p50/p95/p99 latency, throughput,
+errors and worker saturation. Run the API against the stand-in
+(scripts/llm_standin.py) so numbers are repeatable.
+
+Saturation columns:
+  eff_conc  Little's law (throughput x mean latency): requests actually in
+            flight on the server. Flat eff_conc while latency grows means
+            requests are queueing, not running.
+  llm_busy  calls that found no LLM slot (fell back) during the level
+  llm_wait  p95 LLM slot wait (ms) from /api/v1/status after the level
+  upstream  peak in-flight calls seen by the stand-in (if --standin given)
+
+Usage:
+  python scripts/bench_llm.py --base http://127.0.0.1:8010/api/v1 \\
+      --concurrency 1,2,4,8,16 --requests 32 --days 7 --standin http://127.0.0.1:8099
+
+Signs up (or logs in) a bench user; pass --email/--password to reuse one.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import sys
+import time
+
+try:
+    import httpx
+except Exception:  # pragma: no cover
+    print("[bench] httpx is required (pip install httpx)")
+    raise SystemExit(2)
+
+
+def log(msg: str) -> None:
+    print(f"[bench] {msg}", flush=True)
+
+
+def pct(xs: List[float], p: float) -> Optional[float]:
+    if not xs:
+        return None
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))]
+
+
+def login(client: httpx.Client, email: str, password: str) -> None:
+    r = client.post("/auth/signup", json={"email": email, "password": password})
+    if r.status_code not in (201, 409):
+        raise SystemExit(f"signup failed: {r.status_code} {r.text[:200]}")
+    if r.status_code == 409:
+        r = client.post("/auth/login", json={"email": email, "password": password})
+        if r.status_code != 200:
+            raise SystemExit(f"login failed: {r.status_code} {r.text[:200]}")
+
+
+def status(client: httpx.Client) -> Dict[str, Any]:
+    try:
+        return client.get("/status").json()
+    except Exception:
+        return {}
+
+
+def standin_stats(url: Optional[str]) -> Dict[str, Any]:
+    if not url:
+        return {}
+    try:
+        return httpx.get(url.rstrip("/") + "/stats", timeout=5).json()
+    except Exception:
+        return {}
+
+
+def run_level(client: httpx.Client, path: str, body: Dict[str, Any], conc: int, n: int) -> Tuple[List[float], int, float]:
+    def one(_: int) -> Tuple[float, bool]:
+        t0 = time.perf_counter()
+        try:
+            ok = client.post(path, json=body).status_code < 400
+        except Exception:
+            ok = False
+        return (time.perf_counter() - t0) * 1000.0, ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=conc) as ex:
+        results = list(ex.map(one, range(n)))
+    wall = time.perf_counter() - t0
+    lat = [ms for ms, ok in results if ok]
+    errors = sum(1 for _, ok in results if not ok)
+    return lat, errors, wall
+
+
+def fmt(x: Optional[float]) -> str:
+    return "-" if x is None else f"{x:.0f}"
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark LLM-backed endpoints")
+    ap.add_argument("--base", default="http://127.0.0.1:8010/api/v1")
+    ap.add_argument("--endpoints", default="plans,workouts", help="comma list of plans,workouts")
+    ap.add_argument("--concurrency", default="1,2,4,8,16")
+    ap.add_argument("--requests", type=int, default=32, help="requests per level")
+    ap.add_argument("--days", type=int, default=7)
+    ap.add_argument("--persist", action="store_true", help="persist generated rows (default: off)")
+    ap.add_argument("--email", default=f"bench+{int(time.time())}@example.com")
+    ap.add_argument("--password", default="Bench-Passw0rd!x")
+    ap.add_argument("--standin", default=None, help="stand-in base URL for upstream in-flight stats")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--json", dest="json_out", default=None, help="also write results to this file")
+    args = ap.parse_args(argv)
+
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    paths = {
+        "plans": ("/plans/generate", {"days": args.days, "persist": args.persist, "include_recipes": True}),
+        "workouts": ("/workouts/generate", {"days": args.days, "persist": args.persist}),
+    }
+    limits = httpx.Limits(max_connections=max(levels) + 4, max_keepalive_connections=max(levels) + 4)
+    client = httpx.Client(base_url=args.base, timeout=args.timeout, limits=limits)
+    login(client, args.email, args.password)
+    st = status(client)
+    log(f"target {args.base} version={st.get('version')} llm_enabled={st.get('llm_enabled')}")
+
+    rows: List[Dict[str, Any]] = []
+    header = f"{'endpoint':<9} {'conc':>4} {'ok':>4} {'err':>4} {'p50':>7} {'p95':>7} {'p99':>7} {'rps':>6} {'eff_conc':>8} {'llm_busy':>8} {'llm_wait':>8} {'upstream':>8}"
+    print(header)
+    print("-" * len(header))
+    for name in [e.strip() for e in args.endpoints.split(",") if e.strip()]:
+        path, body = paths[name]
+        for conc in levels:
+            before = status(client).get("llm_metrics", {}).get("outcomes", {})
+            up_before = standin_stats(args.standin)
+            lat, errors, wall = run_level(client, path, body, conc, args.requests)
+            after_status = status(client).get("llm_metrics", {})
+            after = after_status.get("outcomes", {})
+            up_after = standin_stats(args.standin)
+            ok = len(lat)
+            rps = ok / wall if wall > 0 else 0.0
+            mean_s = (sum(lat) / ok / 1000.0) if ok else 0.0
+            row = {
+                "endpoint": name,
+                "concurrency": conc,
+                "ok": ok,
+                "errors": errors,
+                "p50_ms": pct(lat, 0.50),
+                "p95_ms": pct(lat, 0.95),
+                "p99_ms": pct(lat, 0.99),
+                "rps": round(rps, 2),
+                "effective_concurrency": round(rps * mean_s, 2),
+                "llm_busy": after.get("busy", 0) - before.get("busy", 0),
+                "llm_wait_p95_ms": (after_status.get("queue_wait") or {}).get("p95_ms"),
+                "upstream_peak_inflight": up_after.get("peak_inflight") if up_before else None,
+            }
+            rows.append(row)
+            print(
+                f"{name:<9} {conc:>4} {ok:>4} {errors:>4} {fmt(row['p50_ms']):>7} {fmt(row['p95_ms']):>7} "
+                f"{fmt(row['p99_ms']):>7} {rps:>6.2f} {row['effective_concurrency']:>8.2f} {row['llm_busy']:>8} "
+                f"{fmt(row['llm_wait_p95_ms']):>8} {('-' if row['upstream_peak_inflight'] is None else row['upstream_peak_inflight']):>8}"
+            )
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"base": args.base, "results": rows}, f, indent=2)
+        log(f"wrote {args.json_out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in for load-testing the LLM paths.
+
+Serves POST /v1/chat/completions (plain and stream=true) with canned JSON
+diet/workout plans shaped like the PhD Coach prompts expect, after a sampled
+latency, and fails a configurable fraction of calls.
+
+Usage:
+  python scripts/llm_standin.py --port 8099 --latency lognormal:2500:0.5 --error-rate 0.05
+
+Then point the API at it (the OpenAI SDK reads OPENAI_BASE_URL):
+  OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=standin ./scripts/dev.sh
+
+Latency specs (milliseconds):
+  fixed:MS | uniform:LO:HI | lognormal:MEDIAN:SIGMA
+Streaming responses spread the sampled latency across chunks, with the first
+chunk after --ttft-ms.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+import uuid
+
+
+def log(msg: str) -> None:
+    print(f"[llm-standin] {msg}", flush=True)
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    parts = spec.split(":")
+    kind = parts[0].lower()
+    try:
+        if kind == "fixed":
+            ms = float(parts[1])
+            return lambda: ms
+        if kind == "uniform":
+            lo, hi = float(parts[1]), float(parts[2])
+            return lambda: random.uniform(lo, hi)
+        if kind == "lognormal":
+            median, sigma = float(parts[1]), float(parts[2])
+            mu = math.log(max(1.0, median))
+            return lambda: random.lognormvariate(mu, sigma)
+    except (IndexError, ValueError):
+        pass
+    raise SystemExit(f"bad --latency spec: {spec!r}")
+
+
+_MEALS = [
+    ("Grilled Chicken Salad", ["6 oz chicken breast", "3 cups mixed greens", "1 tbsp olive oil", "0.5 each avocado"]),
+    ("Salmon and Broccoli", ["6 oz salmon", "2 cups broccoli florets", "1 tbsp olive oil", "0.5 each lemon"]),
+    ("Eggs and Spinach", ["3 each eggs", "2 cups spinach", "1 tsp olive oil"]),
+    ("Turkey Lettuce Wraps", ["6 oz ground turkey", "4 each romaine leaves", "1 tbsp soy sauce or tamari"]),
+    ("Greek Yogurt Bowl", ["1 cup Greek yogurt", "0.25 cup oats", "0.5 cup berries"]),
+]
+
+_WORKOUTS = {
+    "Upper": [("Lat Pulldown", "Lat Pulldown"), ("Seated Row", "Row Machine"), ("Shoulder Press", "Machine Press")],
+    "Lower": [("Leg Press", "Leg Press"), ("Leg Curl", "Hamstring Curl"), ("Leg Extension", "Quad Extension")],
+    "Push": [("Incline Press", "Machine/Dumbbells"), ("Lateral Raise", "Dumbbells"), ("Triceps Pushdown", "Cable")],
+    "Pull": [("Assisted Pull-Up", "Assisted Pull-Up"), ("Cable Row", "Row Machine"), ("Biceps Curl", "Cable/Dumbbells")],
+}
+
+
+def canned_diet(payload: Dict[str, Any]) -> Dict[str, Any]:
+    days = max(1, min(31, int(payload.get("days") or 7)))
+    mpd = max(1, min(8, int(payload.get("meals_per_day") or 3)))
+    kcal = int(round((payload.get("calorie_target") or 1800) / mpd))
+    start = date.today()
+    out: List[Dict[str, Any]] = []
+    for i in range(days):
+        meals = []
+        for j in range(mpd):
+            title, ings = _MEALS[(i * mpd + j) % len(_MEALS)]
+            hour = 8 + (12 * j) // (mpd - 1) if mpd > 1 else 12
+            meals.append({
+                "time": f"{hour:02d}:00",
+                "title": title,
+                "kcal": kcal,
+                "ingredients": ings,
+                "steps": [f"Prep ingredients for {title}.", f"Cook {title} and plate."],
+            })
+        out.append({"date": (start + timedelta(days=i)).isoformat(), "meals": meals})
+    return {"days": out}
+
+
+def canned_workouts(prefs: Dict[str, Any]) -> Dict[str, Any]:
+    days = max(1, min(31, int(prefs.get("days") or 7)))
+    per_week = max(1, min(7, int(prefs.get("sessions_per_week") or 4)))
+    start = date.fromisoformat(prefs.get("start") or date.today().isoformat())
+    titles = list(_WORKOUTS)
+    step = max(1, days // max(1, min(days, per_week)))
+    sessions = []
+    for n, i in enumerate(range(0, days, step)):
+        title = titles[n % len(titles)]
+        sessions.append({
+            "date": (start + timedelta(days=i)).isoformat(),
+            "title": title,
+            "exercises": [
+                {"name": name, "machine": machine, "sets": 3, "reps": 12, "rpe": 7, "rest_sec": 60}
+                for name, machine in _WORKOUTS[title]
+            ],
+        })
+    return {"sessions": sessions}
+
+
+def canned_for(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    system = str(messages[0].get("content") or "") if messages else ""
+    user = str(messages[-1].get("content") or "{}") if messages else "{}"
+    if user.startswith("Preferences:"):
+        user = user.split(":", 1)[1]
+    try:
+        payload = json.loads(user)
+    except Exception:
+        payload = {}
+    if '"sessions"' in system:
+        return canned_workouts(payload)
+    return canned_diet(payload)
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.inflight = 0
+        self.peak_inflight = 0
+
+    def enter(self) -> None:
+        with self.lock:
+            self.calls += 1
+            self.inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self.inflight)
+
+    def leave(self, ok: bool) -> None:
+        with self.lock:
+            self.inflight -= 1
+            if not ok:
+                self.errors += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {"calls": self.calls, "errors": self.errors, "inflight": self.inflight, "peak_inflight": self.peak_inflight}
+
+
+def make_handler(args: argparse.Namespace, sample: Callable[[], float], stats: Stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt: str, *a: Any) -> None:
+            if args.verbose:
+                log(fmt % a)
+
+        def _json(self, code: int, body: Dict[str, Any]) -> None:
+            raw = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") in ("/stats", "/v1/stats"):
+                self._json(200, stats.snapshot())
+            elif self.path.rstrip("/") in ("/v1/models",):
+                self._json(200, {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}]})
+            else:
+                self._json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self) -> None:
+            if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions"):
+                self._json(404, {"error": {"message": "not found"}})
+                return
+            n = int(self.headers.get("Content-Length") or 0)
+            try:
+                req = json.loads(self.rfile.read(n) or b"{}")
+            except Exception:
+                self._json(400, {"error": {"message": "bad json"}})
+                return
+            stats.enter()
+            ok = False
+            try:
+                delay = max(0.0, sample()) / 1000.0
+                if random.random() < args.error_rate:
+                    time.sleep(delay * random.random())
+                    code = random.choice((429, 500, 503))
+                    self._json(code, {"error": {"message": "stand-in injected failure", "type": "server_error"}})
+                    return
+                content = json.dumps(canned_for(req.get("messages") or []))
+                cid = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+                model = req.get("model") or "gpt-4o-mini"
+                if req.get("stream"):
+                    self._stream(cid, model, content, delay)
+                else:
+                    time.sleep(delay)
+                    self._json(200, {
+                        "id": cid,
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": len(content) // 4, "total_tokens": len(content) // 4},
+                    })
+                ok = True
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                stats.leave(ok)
+
+        def _stream(self, cid: str, model: str, content: str, delay: float) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def emit(obj: Any) -> None:
+                data = (f"data: {obj}\n\n" if isinstance(obj, str) else f"data: {json.dumps(obj)}\n\n").encode("utf-8")
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            pieces = [content[i:i + args.chunk_chars] for i in range(0, len(content), args.chunk_chars)] or [""]
+            ttft = min(delay, args.ttft_ms / 1000.0)
+            per = (delay - ttft) / max(1, len(pieces))
+            time.sleep(ttft)
+            for k, piece in enumerate(pieces):
+                if k:
+                    time.sleep(per)
+                emit({
+                    "id": cid, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                })
+            emit({
+                "id": cid, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            })
+            emit("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="OpenAI-compatible LLM stand-in")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--latency", default="lognormal:2500:0.5", help="fixed:MS | uniform:LO:HI | lognormal:MEDIAN:SIGMA")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 429/5xx")
+    ap.add_argument("--ttft-ms", type=float, default=300.0, help="time to first streamed chunk")
+    ap.add_argument("--chunk-chars", type=int, default=64, help="characters per streamed chunk")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+    sample = parse_latency(args.latency)
+    stats = Stats()
+    srv = ThreadingHTTPServer((args.host, args.port), make_handler(args, sample, stats))
+    srv.daemon_threads = True
+    log(f"listening on http://{args.host}:{args.port}/v1 latency={args.latency} error_rate={args.error_rate}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        log(f"stopped; {stats.snapshot()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
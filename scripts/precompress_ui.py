@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Write .br and .gz siblings for the built UI bundle.
+
+Run after ``npm run build`` (in ui/); the API serves these variants as-is when
+UI_DIST_DIR points at the bundle, so assets are compressed once at maximum
+level instead of on every request. Only text-like files of at least --min
+bytes are compressed, and a variant is kept only if it is smaller.
+
+Usage:
+  python scripts/precompress_ui.py ui/dist
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+import argparse
+import gzip
+import sys
+
+try:
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover
+    try:
+        import brotlicffi as brotli  # type: ignore
+    except Exception:
+        brotli = None  # type: ignore
+
+EXTS = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".webmanifest", ".ico"}
+
+
+def log(msg: str) -> None:
+    print(f"[precompress] {msg}", flush=True)
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description="Precompress a built UI bundle")
+    ap.add_argument("dist", nargs="?", default="ui/dist")
+    ap.add_argument("--min", type=int, default=512, help="skip files smaller than this (bytes)")
+    args = ap.parse_args(argv)
+
+    root = Path(args.dist)
+    if not root.is_dir():
+        log(f"{root} not found (run npm run build in ui/ first)")
+        return 1
+    if brotli is None:
+        log("brotli not installed; writing .gz only (pip install brotli)")
+
+    files = written = 0
+    raw_total = br_total = gz_total = 0
+    for f in sorted(p for p in root.rglob("*") if p.is_file() and p.suffix in EXTS):
+        data = f.read_bytes()
+        if len(data) < args.min:
+            continue
+        files += 1
+        raw_total += len(data)
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(gz) < len(data):
+            f.with_name(f.name + ".gz").write_bytes(gz)
+            gz_total += len(gz)
+            written += 1
+        if brotli is not None:
+            br = brotli.compress(data, quality=11)
+            if len(br) < len(data):
+                f.with_name(f.name + ".br").write_bytes(br)
+                br_total += len(br)
+                written += 1
+    log(f"{files} files, {raw_total} bytes -> gzip {gz_total} / brotli {br_total} ({written} variants written)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import FairLimiter, Rejected
+
+
+def test_per_user_cap_and_release():
+    async def run():
+        lim = FairLimiter("t", limit=2, queue=4, per_user=1, max_wait=1.0)
+        await lim.acquire("u1")
+        with pytest.raises(Rejected) as exc:
+            await lim.acquire("u1")
+        assert exc.value.reason == "per_user"
+        lim.release("u1")
+        await lim.acquire("u1")
+        assert lim.active == 1
+
+    asyncio.run(run())
+
+
+def test_queue_full_and_timeout():
+    async def run():
+        lim = FairLimiter("t", limit=1, queue=1, per_user=5, max_wait=0.05)
+        await lim.acquire("a")
+        waiter = asyncio.ensure_future(lim.acquire("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as full:
+            await lim.acquire("c")
+        assert full.value.reason == "queue_full"
+        with pytest.raises(Rejected) as late:
+            await waiter
+        assert late.value.reason == "timeout"
+        assert lim.waiting == 0 and lim.active == 1
+        assert lim.retry_after() >= 1
+
+    asyncio.run(run())
+
+
+def test_freed_slots_go_round_robin():
+    async def run():
+        lim = FairLimiter("t", limit=1, queue=10, per_user=5, max_wait=1.0)
+        await lim.acquire("busy")
+        order = []
+
+        async def take(user):
+            await lim.acquire(user)
+            order.append(user)
+
+        tasks = [asyncio.ensure_future(take(u)) for u in ("a", "a", "b")]
+        await asyncio.sleep(0)
+        for _ in range(3):
+            lim.release(order[-1] if order else "busy")
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "a"]
+
+    asyncio.run(run())
@@ -0,0 +1,38 @@
+from app.core.basket import optimize
+
+
+def test_exact_picks_cheapest_covering_subset():
+    costs = [[1.0, 2.0], [5.0, 1.0]]
+    out = optimize(costs, ["A", "B"], visit_penalty=0.5)
+    assert out["stores"] == ["A", "B"]
+    assert out["total"] == 3.0
+    assert out["uncovered"] == []
+
+
+def test_visit_penalty_favours_single_store():
+    out = optimize([[1.0, 2.0], [5.0, 1.0]], ["A", "B"], visit_penalty=10.0)
+    assert out["stores"] == ["B"]
+    assert out["single_store"]["best"] == "B"
+
+
+def test_uncarried_item_does_not_force_every_store():
+    out = optimize([[1.0, 5.0, 5.0], [None, None, None]], ["A", "B", "C"], visit_penalty=3.0)
+    assert out["stores"] == ["A"]
+    assert out["total"] == 4.0
+    assert out["uncovered"] == [1]
+    assert out["assignment"] == ["A", None]
+
+
+def test_max_stores_partial_cover():
+    costs = [[1.0, None, None], [None, 1.0, None], [None, None, 1.0]]
+    out = optimize(costs, ["A", "B", "C"], visit_penalty=0.0, max_stores=2)
+    assert len(out["stores"]) == 2
+    assert len(out["uncovered"]) == 1
+
+
+def test_greedy_respects_max_stores():
+    costs = [[1.0 if j == i else None for j in range(4)] for i in range(4)]
+    out = optimize(costs, list("ABCD"), visit_penalty=0.0, exact_max_stores=2, max_stores=3)
+    assert out["method"] == "greedy"
+    assert len(out["stores"]) == 3
+    assert len(out["uncovered"]) == 1
@@ -0,0 +1,46 @@
+import pytest
+
+from app.core import units
+
+
+@pytest.mark.parametrize("line, ingredient, unit, base", [
+    ("1 1/2 tbsp olive oil", "olive oil", "tbsp", 1.5 * 14.7868),
+    ("6 oz chicken breast", "chicken breast", "oz", 6 * 28.3495),
+    ("½ cup oats", "oats", "cup", 0.5 * 236.588),
+    ("3 each eggs", "egg", "each", 3.0),
+    ("4 each romaine leaves", "romaine", "leaf", 0.5),
+    ("2 cloves garlic", "garlic", "clove", 0.2),
+])
+def test_parse(line, ingredient, unit, base):
+    p = units.parse(line)
+    assert (p.ingredient, p.unit) == (ingredient, unit)
+    assert p.base == pytest.approx(base)
+
+
+def test_parse_without_quantity_or_unit():
+    p = units.parse("salt to taste")
+    assert p.ingredient == "salt"
+    assert p.base is None and p.dimension is None
+
+
+def test_aggregate_sums_across_units():
+    agg = units.aggregate(["1 tbsp olive oil", "1 tsp olive oil", "6 oz chicken breast", "6 oz chicken breast"])
+    assert set(agg) == {"olive oil", "chicken breast"}
+    assert agg["olive oil"].base == pytest.approx(14.7868 + 4.92892)
+    assert agg["olive oil"].uses == 2
+    assert agg["chicken breast"].display() == (12.0, "oz")
+
+
+def test_aggregate_converts_mass_to_volume_with_density():
+    agg = units.aggregate({"2 cups spinach": 1.0, "100 g spinach": 1.0})
+    line = agg["spinach"]
+    assert line.dimension == "volume"
+    assert line.base == pytest.approx(2 * 236.588 + 100 / 0.127)
+
+
+def test_packages():
+    one_lb = units.Line("chicken breast", "mass", 453.592, 1)
+    assert units.packages(one_lb, 1, "lb") == 1
+    assert units.packages(one_lb, 12, "oz") == 2
+    assert units.packages(one_lb, 1, "each") is None
+    assert units.packages(units.Line("salt", None, 0.0, 1), 1, "oz") is None
@@ -0,0 +1,30 @@
+from datetime import date, datetime
+
+from app.core import volume
+
+
+def test_planned_only():
+    c = volume.contribution({"sets": 3, "reps": 10, "target_weight": 50, "complete": False})
+    assert c["exercises_planned"] == 1 and c["sets_planned"] == 3
+    assert c["exercises_completed"] == 0 and c["tonnage"] == 0
+
+
+def test_completed_uses_actuals():
+    c = volume.contribution({"sets": 3, "reps": 10, "target_weight": 50, "complete": True, "actual_reps": 8, "actual_weight": 60})
+    assert c["reps"] == 24
+    assert c["tonnage"] == 24 * 60
+
+
+def test_no_row_contributes_nothing():
+    assert not any(volume.contribution(None).values())
+
+
+def test_snapshot_and_groups():
+    class Row:
+        sets, reps, target_weight, complete, actual_reps, actual_weight = 3, 5, 100, True, None, None
+
+    assert volume.snapshot(Row()) == volume.snapshot({"sets": 3, "reps": 5, "target_weight": 100, "complete": True})
+    assert volume.movement_group("Back Squat") == "legs"
+    assert volume.movement_group("Lat Pulldown") == "pull"
+    assert volume.movement_group("Jumping Jacks") == "other"
+    assert volume.week_start(datetime(2026, 10, 18, 9)) == date(2026, 10, 12)